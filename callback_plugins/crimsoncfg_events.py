@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Events Callback
+Ansible notification callback that writes one JSON event per line to the
+file descriptor named in CRIMSONCFG_EVENTS_FD (set up by the installer)
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+DOCUMENTATION = '''
+    name: crimsoncfg_events
+    type: notification
+    short_description: JSON event stream for the CrimsonCFG installer
+    description:
+      - Emits playbook, play, task, host result and stats events as JSON lines.
+      - Does nothing unless CRIMSONCFG_EVENTS_FD names an open, writable file descriptor.
+    requirements:
+      - enabled in callbacks_enabled (ANSIBLE_CALLBACKS_ENABLED)
+'''
+
+EVENTS_FD_ENV = "CRIMSONCFG_EVENTS_FD"
+
+class CallbackModule(CallbackBase):
+    """Events:
+
+    playbook_start {playbook}, play_start {play}, task_start {task, action},
+    task_end {task, duration}, host_result {host, task, status, changed,
+    duration, msg}, stats {hosts: {host: {ok, changed, failures,
+    unreachable, skipped, rescued, ignored}}}. Every event carries `event`
+    and `time`.
+    """
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "notification"
+    CALLBACK_NAME = "crimsoncfg_events"
+    CALLBACK_NEEDS_ENABLED = True
+    CALLBACK_NEEDS_WHITELIST = True  # ansible < 2.11
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._out = None
+        fd = os.environ.get(EVENTS_FD_ENV)
+        if fd:
+            try:
+                self._out = os.fdopen(int(fd), "w", buffering=1, encoding="utf-8")
+            except (OSError, ValueError):
+                self._out = None
+        self._task = None
+        self._task_started = None
+
+    def _emit(self, event: str, **data):
+        if self._out is None:
+            return
+        data["event"] = event
+        data["time"] = time.time()
+        try:
+            self._out.write(json.dumps(data, default=str) + "\n")
+        except (OSError, ValueError):
+            # The installer went away; keep the playbook running
+            self._out = None
+
+    def _end_task(self):
+        if self._task is not None:
+            self._emit("task_end", task=self._task, duration=round(time.monotonic() - self._task_started, 3))
+            self._task = None
+
+    def _start_task(self, task):
+        self._end_task()
+        self._task = task.get_name().strip()
+        self._task_started = time.monotonic()
+        self._emit("task_start", task=self._task, action=task.action)
+
+    def _host_result(self, result, status: str):
+        data = result._result if isinstance(result._result, dict) else {}
+        duration = round(time.monotonic() - self._task_started, 3) if self._task_started else None
+        self._emit("host_result", host=result._host.get_name(), task=result._task.get_name().strip(),
+                   status=status, changed=bool(data.get("changed", False)), duration=duration,
+                   msg=data.get("msg") if status in ("failed", "unreachable") else None)
+
+    def v2_playbook_on_start(self, playbook):
+        self._emit("playbook_start", playbook=getattr(playbook, "_file_name", None))
+
+    def v2_playbook_on_play_start(self, play):
+        self._end_task()
+        self._emit("play_start", play=play.get_name().strip())
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._start_task(task)
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._start_task(task)
+
+    def v2_runner_on_ok(self, result):
+        self._host_result(result, "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._host_result(result, "ignored" if ignore_errors else "failed")
+
+    def v2_runner_on_skipped(self, result):
+        self._host_result(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result):
+        self._host_result(result, "unreachable")
+
+    def v2_playbook_on_stats(self, stats):
+        self._end_task()
+        hosts = {}
+        for host in sorted(stats.processed.keys()):
+            hosts[host] = stats.summarize(host)
+        self._emit("stats", hosts=hosts)
+        if self._out is not None:
+            self._out.close()
+            self._out = None
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Playbook Scanner Benchmark
+Synthesises playbook trees and measures parse_metadata, scan_playbooks and generate_config.
+Runs headless (no GTK required).
+"""
+
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    from functions.playbook_scanner import PlaybookScanner, MANIFEST_FILENAME
+except ImportError:
+    # Standalone execution from within functions/
+    from playbook_scanner import PlaybookScanner, MANIFEST_FILENAME
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# Metrics compared against the baseline (lower is better)
+TIMED_METRICS = ["parse_us_per_file", "cold_scan_s", "warm_scan_s", "generate_s"]
+
+CATEGORIES = ["apps", "basics", "security", "essentials", "tools"]
+DEPARTMENTS = ["dev", "ops", "sales"]
+
+def synthesize_tree(root: Path, count: int, seed: int = 42):
+    """Create `count` playbooks split over built-in, external and department folders.
+
+    Returns (base_dir, external_dir). Roughly 60% built-in, 30% external and
+    10% department playbooks; header sizes vary from the minimal name line to
+    a full header plus filler comments, and ~5% of files carry no metadata.
+    """
+    rng = random.Random(seed)
+    base_dir = root / "base"
+    external_dir = root / "external"
+    for i in range(count):
+        roll = rng.random()
+        top = base_dir if roll < 0.6 or 0.9 <= roll < 0.95 else external_dir
+        if roll >= 0.9:
+            folder = top / "playbooks" / "departments" / rng.choice(DEPARTMENTS)
+        else:
+            folder = top / "playbooks" / rng.choice(CATEGORIES)
+        folder.mkdir(parents=True, exist_ok=True)
+        lines = []
+        if rng.random() >= 0.05:
+            lines.append(f"# CrimsonCFG-Name: Benchmark Playbook {i}")
+            if rng.random() < 0.8:
+                lines.append(f"# CrimsonCFG-Description: {'Synthetic playbook used for scanner benchmarks. ' * rng.randint(1, 6)}")
+            if rng.random() < 0.3:
+                lines.append("# CrimsonCFG-Essential: true")
+                lines.append(f"# CrimsonCFG-Essential-Order: {rng.randint(1, 20)}")
+            if rng.random() < 0.2:
+                lines.append("# CrimsonCFG-RequiredVars: true")
+            lines.extend(f"# filler comment {n}" for n in range(rng.randint(0, 6)))
+        lines.append("---")
+        lines.append(f"- name: Benchmark play {i}\n  hosts: all\n  tasks:")
+        for task in range(rng.randint(1, 40)):
+            lines.append(f"    - name: Task {task}\n      ansible.builtin.debug:\n        msg: \"{i}-{task}\"")
+        (folder / f"playbook_{i:05d}.yml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return base_dir, external_dir
+
+def _run_size(count: int, workdir: str, repeat: int) -> Dict:
+    """Benchmark one tree size (runs in a fresh process so peak RSS is per size).
+
+    Timings are the best of `repeat` runs to keep noise out of the baseline check.
+    """
+    root = Path(workdir) / f"tree_{count}"
+    base_dir, external_dir = synthesize_tree(root, count)
+    output = root / "gui_config.json"
+    manifest = root / MANIFEST_FILENAME
+    files = sorted(Path(base_dir).rglob("*.yml")) + sorted(Path(external_dir).rglob("*.yml"))
+
+    def best_of(func, prepare=None):
+        timings = []
+        for _ in range(repeat):
+            if prepare:
+                prepare()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def drop_manifest():
+        if manifest.exists():
+            manifest.unlink()
+
+    def parse_all():
+        scanner = PlaybookScanner(base_dir, external_dir)
+        for yml_file in files:
+            scanner.parse_metadata(yml_file, rel_base=base_dir if yml_file.is_relative_to(base_dir) else external_dir)
+
+    def scan():
+        PlaybookScanner(base_dir, external_dir, manifest_path=str(manifest)).scan_playbooks()
+
+    parse_s = best_of(parse_all)
+    # Cold: no manifest, every file is opened and parsed (the OS page cache may still be warm)
+    cold_s = best_of(scan, prepare=drop_manifest)
+    # Warm: manifest from the previous scan, unchanged tree
+    warm_s = best_of(scan)
+    generate_s = best_of(lambda: PlaybookScanner(base_dir).generate_config(str(output), external_repo_path=str(external_dir)),
+                         prepare=lambda: output.with_name(MANIFEST_FILENAME).unlink(missing_ok=True))
+    output_bytes = output.stat().st_size if output.exists() else 0
+
+    shutil.rmtree(root, ignore_errors=True)
+    return {
+        "files": len(files),
+        "parse_us_per_file": parse_s / max(len(files), 1) * 1e6,
+        "cold_scan_s": cold_s,
+        "warm_scan_s": warm_s,
+        "generate_s": generate_s,
+        "cold_files_per_s": len(files) / cold_s if cold_s else 0.0,
+        "warm_files_per_s": len(files) / warm_s if warm_s else 0.0,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "output_bytes": output_bytes,
+    }
+
+def run_benchmarks(sizes: List[int], repeat: int = 3) -> Dict[str, Dict]:
+    """Run every size in its own spawned process and collect the results."""
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="crimson_bench_") as workdir:
+        for count in sizes:
+            with context.Pool(1) as pool:
+                results[str(count)] = pool.apply(_run_size, (count, workdir, repeat))
+    return results
+
+def compare_with_baseline(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return a message for every timed metric that regressed by more than threshold."""
+    regressions = []
+    for size, metrics in results.items():
+        base = baseline.get(size)
+        if not base:
+            continue
+        for metric in TIMED_METRICS:
+            if metric in base and base[metric] > 0 and metrics[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{size} files: {metric} {metrics[metric]:.4f} vs baseline {base[metric]:.4f} "
+                                   f"(+{(metrics[metric] / base[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+def print_report(results: Dict):
+    print(f"{'files':>8} {'parse us/f':>11} {'cold s':>9} {'warm s':>9} {'gen s':>9} "
+          f"{'cold f/s':>10} {'warm f/s':>10} {'RSS MB':>8} {'out KB':>8}")
+    for metrics in results.values():
+        print(f"{metrics['files']:>8} {metrics['parse_us_per_file']:>11.1f} {metrics['cold_scan_s']:>9.3f} "
+              f"{metrics['warm_scan_s']:>9.3f} {metrics['generate_s']:>9.3f} {metrics['cold_files_per_s']:>10.0f} "
+              f"{metrics['warm_files_per_s']:>10.0f} {metrics['peak_rss_mb']:>8.1f} {metrics['output_bytes'] / 1024:>8.1f}")
+
+def main():
+    """Main function for standalone execution."""
+    parser = argparse.ArgumentParser(description="Benchmark the CrimsonCFG playbook scanner")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma separated playbook counts (e.g. 100,1000,10000,50000)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown against the baseline before failing (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = run_benchmarks(sizes, max(1, args.repeat))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline = {}
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if baseline_path.exists():
+        regressions = compare_with_baseline(results, json.loads(baseline_path.read_text()), args.threshold)
+        if regressions:
+            print("Regressions against baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"No regressions against {baseline_path} (threshold {args.threshold:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Playbook Catalog
+Optional SQLite backend for the playbook catalog generated by PlaybookScanner.
+"""
+
+import json
+import sqlite3
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+CATALOG_FILENAME = "gui_config.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS playbooks (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    source_id INTEGER NOT NULL REFERENCES sources(id),
+    name TEXT NOT NULL,
+    description TEXT,
+    path TEXT NOT NULL,
+    essential INTEGER NOT NULL DEFAULT 0,
+    essential_order INTEGER,
+    required_vars INTEGER NOT NULL DEFAULT 0,
+    position INTEGER NOT NULL,
+    meta TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    playbook_id INTEGER NOT NULL REFERENCES playbooks(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_playbooks_category ON playbooks(category_id, position);
+CREATE INDEX IF NOT EXISTS idx_playbooks_name ON playbooks(name);
+CREATE INDEX IF NOT EXISTS idx_playbooks_essential ON playbooks(essential);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+"""
+
+class PlaybookCatalog:
+    """SQLite store of categories and playbooks, written by the scanner and queried by the GUI."""
+
+    def __init__(self, path: str, debug: bool = False):
+        self.path = Path(path)
+        self.debug = debug
+        self._conn = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # The GUI reads from the main thread, the scanner may write from a worker
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def digest(self) -> Optional[str]:
+        """sha256 of the gui_config.json payload the catalog was last written from, or None."""
+        row = self.connect().execute("SELECT value FROM meta WHERE key = 'config_digest'").fetchone()
+        return row[0] if row else None
+
+    def write(self, config: Dict, digest: str = None):
+        """Replace the catalog contents with the categories of a scanned config.
+
+        digest identifies the JSON payload it was written from (see digest()).
+        """
+        conn = self.connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('config_digest', ?)", (digest,))
+            conn.execute("DELETE FROM tags")
+            conn.execute("DELETE FROM playbooks")
+            conn.execute("DELETE FROM categories")
+            sources = {}
+            for cat_position, (category, cat_info) in enumerate(config.get("categories", {}).items()):
+                category_id = conn.execute(
+                    "INSERT INTO categories (name, description, position) VALUES (?, ?, ?)",
+                    (category, cat_info.get("description"), cat_position)).lastrowid
+                for position, playbook in enumerate(cat_info.get("playbooks", [])):
+                    source = playbook.get("source", "Built-in")
+                    if source not in sources:
+                        conn.execute("INSERT OR IGNORE INTO sources (name) VALUES (?)", (source,))
+                        sources[source] = conn.execute("SELECT id FROM sources WHERE name = ?", (source,)).fetchone()[0]
+                    playbook_id = conn.execute(
+                        "INSERT INTO playbooks (category_id, source_id, name, description, path, essential,"
+                        " essential_order, required_vars, position, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (category_id, sources[source], playbook["name"], playbook.get("description"),
+                         playbook["path"], int(bool(playbook.get("essential", False))),
+                         playbook.get("essential_order"), int(bool(playbook.get("required_vars", False))),
+                         position, json.dumps(playbook, ensure_ascii=False))).lastrowid
+                    conn.executemany("INSERT INTO tags (playbook_id, tag) VALUES (?, ?)",
+                                     [(playbook_id, tag) for tag in playbook.get("tags", [])])
+        if self.debug:
+            print(f"App: Wrote playbook catalog {self.path}")
+
+    def category_names(self) -> List[str]:
+        return [row[0] for row in self.connect().execute("SELECT name FROM categories ORDER BY position")]
+
+    def category_info(self, category: str) -> Optional[Dict]:
+        """Return one category in the gui_config.json shape, or None if it does not exist."""
+        conn = self.connect()
+        row = conn.execute("SELECT id, description FROM categories WHERE name = ?", (category,)).fetchone()
+        if row is None:
+            return None
+        playbooks = [json.loads(meta) for (meta,) in conn.execute(
+            "SELECT meta FROM playbooks WHERE category_id = ? ORDER BY position", (row[0],))]
+        return {"description": row[1], "playbooks": playbooks}
+
+    def playbook_paths(self) -> List[tuple]:
+        """Return (source, path) of every playbook without loading their metadata."""
+        return list(self.connect().execute(
+            "SELECT s.name, p.path FROM playbooks p JOIN sources s ON s.id = p.source_id"
+            " JOIN categories c ON c.id = p.category_id ORDER BY c.position, p.position"))
+
+    def find(self, category: str, name: str) -> Optional[Dict]:
+        """Look up a single playbook by category and name."""
+        row = self.connect().execute(
+            "SELECT p.meta FROM playbooks p JOIN categories c ON c.id = p.category_id"
+            " WHERE c.name = ? AND p.name = ? ORDER BY p.position LIMIT 1", (category, name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def essential_playbooks(self) -> List[tuple]:
+        """Return (category, playbook) pairs for all essential playbooks."""
+        return [(category, json.loads(meta)) for category, meta in self.connect().execute(
+            "SELECT c.name, p.meta FROM playbooks p JOIN categories c ON c.id = p.category_id"
+            " WHERE p.essential = 1 ORDER BY c.position, p.position")]
+
+    def playbooks_with_tag(self, tag: str) -> List[tuple]:
+        """Return (category, playbook) pairs carrying a CrimsonCFG-Tags entry."""
+        return [(category, json.loads(meta)) for category, meta in self.connect().execute(
+            "SELECT c.name, p.meta FROM tags t JOIN playbooks p ON p.id = t.playbook_id"
+            " JOIN categories c ON c.id = p.category_id WHERE t.tag = ? ORDER BY c.position, p.position", (tag,))]
+
+class CatalogCategories(Mapping):
+    """Read-only, lazily loaded view of the catalog shaped like config["categories"].
+
+    Category names are read up front; the playbooks of a category are only
+    queried the first time that category is accessed.
+    """
+
+    def __init__(self, catalog: PlaybookCatalog):
+        self.catalog = catalog
+        self._names = catalog.category_names()
+        self._loaded = {}
+
+    def __getitem__(self, category: str) -> Dict:
+        if category not in self._loaded:
+            info = self.catalog.category_info(category) if category in self._names else None
+            if info is None:
+                raise KeyError(category)
+            self._loaded[category] = info
+        return self._loaded[category]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, category) -> bool:
+        return category in self._names
+
+    def find(self, category: str, name: str) -> Optional[Dict]:
+        if category in self._loaded:
+            for playbook in self._loaded[category]["playbooks"]:
+                if playbook["name"] == name:
+                    return playbook
+            return None
+        return self.catalog.find(category, name)
+
+    def essential_playbooks(self) -> List[tuple]:
+        return self.catalog.essential_playbooks()
@@ -7,17 +7,243 @@ Scans playbook directories and generates gui_config.json from metadata comments.
 import os
 import re
 import json
+import fnmatch
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+
+try:
+    from functions.playbook_catalog import PlaybookCatalog
+except ImportError:
+    # Standalone execution from within functions/
+    from playbook_catalog import PlaybookCatalog
+
+MANIFEST_FILENAME = "playbook_manifest.json"
+MANIFEST_VERSION = 2
+
+# Playbook scanning is I/O bound, so threads help even with the GIL
+DEFAULT_SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 4)
+
+# One directory whose *.yml files belong to a single category
+ScanGroup = namedtuple("ScanGroup", ["category", "directory", "rel_base", "is_external", "department"])
+
+# Nested folders below a category folder that are still searched for playbooks
+DEFAULT_MAX_DEPTH = 4
+IGNORE_FILENAME = ".crimsonignore"
+
+# A playbook found by iter_playbooks(), with the category it belongs to
+PlaybookRecord = namedtuple("PlaybookRecord", ["category", "department", "meta"])
+
+# One entry changed by an incremental update; old/new are None for additions/removals
+CatalogChange = namedtuple("CatalogChange", ["old_category", "old", "new_category", "new"])
+
+class CatalogSummary(namedtuple("CatalogSummary", ["added", "removed", "modified", "written"])):
+    """Outcome of writing gui_config.json.
+
+    added/removed/modified are lists of (category, playbook name); written is
+    False when the serialized output matched the existing file byte for byte.
+    """
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.written or self.added or self.removed or self.modified)
+
+def _playbook_index(config: Dict) -> Dict:
+    """Map (source, path) of every playbook in a config to (category, meta)."""
+    index = {}
+    for category, cat_info in config.get("categories", {}).items():
+        for playbook in cat_info.get("playbooks", []):
+            index[(playbook.get("source", "Built-in"), playbook.get("path"))] = (category, playbook)
+    return index
+
+def summarize_configs(old_config: Dict, new_config: Dict, written: bool) -> CatalogSummary:
+    """Compare two generated configs playbook by playbook."""
+    old_index, new_index = _playbook_index(old_config), _playbook_index(new_config)
+    added = [(category, meta.get("name")) for key, (category, meta) in new_index.items() if key not in old_index]
+    removed = [(category, meta.get("name")) for key, (category, meta) in old_index.items() if key not in new_index]
+    modified = [(category, meta.get("name")) for key, (category, meta) in new_index.items()
+                if key in old_index and old_index[key] != (category, meta)]
+    return CatalogSummary(added, removed, modified, written)
+
+def summarize_changes(changes: List[CatalogChange], written: bool) -> CatalogSummary:
+    """Build a summary from the CatalogChange list of an incremental update."""
+    added = [(c.new_category, c.new.get("name")) for c in changes if c.old is None and c.new is not None]
+    removed = [(c.old_category, c.old.get("name")) for c in changes if c.new is None and c.old is not None]
+    modified = [(c.new_category, c.new.get("name")) for c in changes if c.old is not None and c.new is not None]
+    return CatalogSummary(added, removed, modified, written)
+
+def serialize_config(config: Dict) -> bytes:
+    """Serialize a config exactly as it is stored in gui_config.json."""
+    return json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Atomically replace path with data unless its content is already identical.
+
+    The data is written to a temp file in the same directory, fsync'ed and
+    moved into place with os.replace(), so readers never see a partial file.
+    Returns True if the file was written.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        with open(path, 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() == digest:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+def load_config_file(path: str) -> Dict:
+    """Read an existing gui_config.json, returning an empty config if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def category_description(category: str, department: bool) -> str:
+    """Description used for generated categories."""
+    if department:
+        return f"{category[len('Dep: '):]} department specific playbooks"
+    return f"{category} applications and configurations"
+
+class PlaybookManifest:
+    """Persisted per-file fingerprints (inode, size, mtime_ns, sha256) and parsed metadata."""
+
+    def __init__(self, path: Path, debug: bool = False):
+        self.path = Path(path)
+        self.debug = debug
+        self.entries = {}
+        self.seen = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load the manifest from disk, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("files", {})
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            if self.debug:
+                print(f"App: Ignoring unreadable manifest {self.path}: {e}")
+            self.entries = {}
+
+    def lookup(self, key: str, st: os.stat_result) -> Optional[Dict]:
+        """Return the entry for key if its stat fingerprint still matches."""
+        entry = self.entries.get(key)
+        if (entry and entry.get("inode") == st.st_ino and entry.get("size") == st.st_size
+                and entry.get("mtime_ns") == st.st_mtime_ns):
+            return entry
+        return None
+
+    def lookup_hash(self, key: str, digest: str) -> Optional[Dict]:
+        """Return the entry for key if only its stat changed but the content did not."""
+        entry = self.entries.get(key)
+        if entry and entry.get("sha256") == digest:
+            return entry
+        return None
+
+    def keep(self, key: str, entry: Dict):
+        """Carry an unchanged entry over into this scan."""
+        with self._lock:
+            self.seen[key] = entry
+
+    def record(self, key: str, st: os.stat_result, digest: str, meta: Optional[Dict]):
+        """Store a fresh fingerprint for a new or changed file."""
+        with self._lock:
+            self.seen[key] = {
+                "inode": st.st_ino,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": digest,
+                "meta": meta
+            }
+            self.dirty = True
+
+    def begin_scan(self):
+        """Start tracking which files a full scan visits."""
+        self.seen = {}
+        self.dirty = False
+
+    def finish_scan(self):
+        """Drop entries for files no longer present and persist if anything changed."""
+        if self.dirty or set(self.seen) != set(self.entries):
+            self.entries = self.seen
+            self.save()
+        self.seen = {}
+
+    def finish_partial(self, removed: List[str]):
+        """Merge entries touched by an incremental update and drop removed files."""
+        changed = self.dirty
+        for key in removed:
+            if self.entries.pop(key, None) is not None:
+                changed = True
+        for key, entry in self.seen.items():
+            if self.entries.get(key) is not entry:
+                self.entries[key] = entry
+                changed = True
+        if changed:
+            self.save()
+        self.seen = {}
+        self.dirty = False
+
+    def save(self):
+        """Write the manifest next to gui_config.json."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            if self.debug:
+                print(f"App: Saved playbook manifest with {len(self.entries)} entries to {self.path}")
+        except Exception as e:
+            print(f"App: Error saving playbook manifest {self.path}: {e}")
 
 class PlaybookScanner:
-    def __init__(self, base_dir: str = ".", external_repo_path: str = None, debug: bool = False):
+    def __init__(self, base_dir: str = ".", external_repo_path: str = None, debug: bool = False, manifest_path: str = None,
+                 max_workers: int = DEFAULT_SCAN_WORKERS, max_depth: int = DEFAULT_MAX_DEPTH, follow_symlinks: bool = False):
         self.base_dir = Path(base_dir)
         self.external_repo_path = Path(external_repo_path) if external_repo_path else None
         self.debug = debug
+        self.max_workers = max(1, max_workers)
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+        self._ignore_cache = {}
+        self.changes = []  # CatalogChange list of the last update_config() call
+        self.summary = None  # CatalogSummary of the last generate_config()/update_config() call
+        self.manifest = PlaybookManifest(manifest_path, debug) if manifest_path else None
         
     def parse_metadata(self, filepath: Path, rel_base: Path = None, is_external: bool = False) -> Optional[Dict]:
         """Parse CrimsonCFG metadata comments from a playbook file."""
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                header = [line for _, line in zip(range(10), f)]  # Only scan first 10 lines
+        except Exception as e:
+            print(f"Error reading {filepath}: {e}")
+            return None
+        return self._parse_header(header, filepath, rel_base, is_external)
+
+    def _parse_header(self, lines: List[str], filepath: Path, rel_base: Path = None, is_external: bool = False) -> Optional[Dict]:
+        """Build a metadata record from the leading comment lines of a playbook."""
         if rel_base is None:
             rel_base = self.base_dir
         meta = {
@@ -29,128 +255,161 @@ class PlaybookScanner:
         }
         # Only set for essential playbooks
         essential_order = None
+        for i, line in enumerate(lines):
+            if i >= 10:  # Only scan first 10 lines
+                break
+            if not line.startswith('#'):
+                break
+            line = line.strip()
+            if "CrimsonCFG-Name:" in line:
+                meta["name"] = line.split(":", 1)[1].strip()
+            elif "CrimsonCFG-Description:" in line:
+                meta["description"] = line.split(":", 1)[1].strip()
+            elif "CrimsonCFG-Essential:" in line:
+                value = line.split(":", 1)[1].strip().lower()
+                meta["essential"] = value == "true"
+            elif "CrimsonCFG-Essential-Order:" in line:
+                try:
+                    essential_order = int(line.split(":", 1)[1].strip())
+                except Exception:
+                    essential_order = None
+            elif "CrimsonCFG-RequiredVars:" in line:
+                value = line.split(":", 1)[1].strip().lower()
+                meta["required_vars"] = value == "true"
+            elif "CrimsonCFG-Requires-Vars:" in line:
+                values = [value.strip() for value in line.split(":", 1)[1].split(",")]
+                meta["requires_vars"] = [value for value in values if value]
+            elif "CrimsonCFG-Requires-Files:" in line:
+                values = [value.strip() for value in line.split(":", 1)[1].split(",")]
+                meta["requires_files"] = [value for value in values if value]
+            elif "CrimsonCFG-After:" in line or "CrimsonCFG-Conflicts:" in line:
+                # "none" declares no dependencies (and drops the implicit essential ordering)
+                key = "after" if "CrimsonCFG-After:" in line else "conflicts"
+                values = [value.strip() for value in line.split(":", 1)[1].split(",")]
+                meta[key] = [value for value in values if value and value.lower() != "none"]
+            elif "CrimsonCFG-Resources:" in line:
+                values = [value.strip().lower() for value in line.split(":", 1)[1].split(",")]
+                meta["resources"] = [value for value in values if value and value != "none"]
+            elif "CrimsonCFG-Tags:" in line:
+                tags = [tag.strip().lower() for tag in line.split(":", 1)[1].split(",")]
+                meta["tags"] = [tag for tag in tags if tag]
+        if "required_vars" not in meta:
+            meta["required_vars"] = False
+        if meta["essential"] and essential_order is not None:
+            meta["essential_order"] = essential_order
+        # Only return if we have at least a name
+        return meta if meta["name"] else None
+
+    def load_metadata(self, filepath: Path, rel_base: Path = None, is_external: bool = False) -> Optional[Dict]:
+        """Return playbook metadata, reusing the manifest entry when the file is unchanged.
+
+        A file whose inode, size and mtime match its manifest entry costs a
+        single stat. Otherwise it is read once, hashed, and only re-parsed if
+        the content hash differs from the recorded one.
+        """
+        if self.manifest is None:
+            return self.parse_metadata(filepath, rel_base, is_external)
+        key = os.path.abspath(filepath)
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for i, line in enumerate(f):
-                    if i >= 10:  # Only scan first 10 lines
-                        break
-                    if not line.startswith('#'):
-                        break
-                    line = line.strip()
-                    if "CrimsonCFG-Name:" in line:
-                        meta["name"] = line.split(":", 1)[1].strip()
-                    elif "CrimsonCFG-Description:" in line:
-                        meta["description"] = line.split(":", 1)[1].strip()
-                    elif "CrimsonCFG-Essential:" in line:
-                        value = line.split(":", 1)[1].strip().lower()
-                        meta["essential"] = value == "true"
-                    elif "CrimsonCFG-Essential-Order:" in line:
-                        try:
-                            essential_order = int(line.split(":", 1)[1].strip())
-                        except Exception:
-                            essential_order = None
-                    elif "CrimsonCFG-RequiredVars:" in line:
-                        value = line.split(":", 1)[1].strip().lower()
-                        meta["required_vars"] = value == "true"
-            if "required_vars" not in meta:
-                meta["required_vars"] = False
-            if meta["essential"] and essential_order is not None:
-                meta["essential_order"] = essential_order
+            st = os.stat(filepath)
+        except OSError as e:
+            print(f"Error reading {filepath}: {e}")
+            return None
+        entry = self.manifest.lookup(key, st)
+        if entry is not None:
+            self.manifest.keep(key, entry)
+            return dict(entry["meta"]) if entry["meta"] else None
+        try:
+            with open(filepath, 'rb') as f:
+                content = f.read()
         except Exception as e:
             print(f"Error reading {filepath}: {e}")
             return None
-        # Only return if we have at least a name
-        return meta if meta["name"] else None
+        digest = hashlib.sha256(content).hexdigest()
+        entry = self.manifest.lookup_hash(key, digest)
+        if entry is not None:
+            meta = entry["meta"]
+        else:
+            if self.debug:
+                print(f"App: Parsing changed playbook {filepath}")
+            header = content.decode('utf-8', errors='replace').splitlines(keepends=True)[:10]
+            meta = self._parse_header(header, filepath, rel_base, is_external)
+        self.manifest.record(key, st, digest, meta)
+        return dict(meta) if meta else None
         
     def scan_playbooks(self) -> Dict:
-        """Scan all playbook directories and build configuration."""
+        """Scan all playbook directories and build configuration.
+
+        Directory listing and metadata parsing are fanned out over a thread
+        pool, but results are merged in the same order as a serial walk so the
+        generated config does not depend on the pool width.
+        """
         all_playbooks = {}
+        if self.manifest is not None:
+            self.manifest.begin_scan()
         
-        # Scan all subfolders in playbooks directory (both built-in and external)
-        self._scan_playbook_directories(all_playbooks)
+        # Built-in and external category folders first, then departments
+        groups = self._collect_category_groups() + self._collect_department_groups()
         
-        # Scan department playbooks
-        self._scan_department_playbooks(all_playbooks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            file_lists = list(pool.map(self._list_group_files, groups))
+            jobs = [(group, yml_file) for group, files in zip(groups, file_lists) for yml_file in files]
+            metas = list(pool.map(lambda job: self.load_metadata(job[1], rel_base=job[0].rel_base, is_external=job[0].is_external), jobs))
+        
+        results = iter(metas)
+        for group, files in zip(groups, file_lists):
+            self._merge_group(all_playbooks, group, [(yml_file, next(results)) for yml_file in files])
+        
+        if self.manifest is not None:
+            self.manifest.finish_scan()
         
         return {"categories": all_playbooks}
     
-    def _scan_playbook_directories(self, all_playbooks: Dict):
-        """Scan all subfolders in playbooks directory to create categories dynamically."""
-        # Get all subfolders in built-in playbooks directory
-        built_in_playbooks_dir = self.base_dir / "playbooks"
-        if built_in_playbooks_dir.exists():
-            for subdir in built_in_playbooks_dir.iterdir():
-                if subdir.is_dir() and subdir.name != "departments":  # Skip departments, handled separately
-                    category = subdir.name.capitalize()
-                    playbooks = []
-                    
-                    if self.debug:
-                        print(f"Scanning built-in playbooks in {subdir}")
-                    
-                    for yml_file in subdir.glob("*.yml"):
-                        meta = self.parse_metadata(yml_file, rel_base=self.base_dir, is_external=False)
-                        if meta:
-                            playbooks.append(meta)
-                            if self.debug:
-                                print(f"App: Found built-in playbook: {meta['name']} in {category}")
-                        else:
-                            if self.debug:
-                                print(f"App: Skipping built-in {yml_file.name} - no valid metadata")
-                    
-                    if playbooks:
-                        all_playbooks[category] = {
-                            "description": f"{category} applications and configurations",
-                            "playbooks": playbooks
-                        }
-        
-        # Scan external repository playbooks
+    def iter_playbooks(self) -> Iterator[PlaybookRecord]:
+        """Yield a PlaybookRecord for every playbook as soon as it is parsed.
+
+        Walks the same roots in the same order as scan_playbooks(), but one
+        file at a time, so callers can show the first category before the
+        whole tree has been walked and memory does not grow with catalog size.
+        """
+        if self.manifest is not None:
+            self.manifest.begin_scan()
+        for group in self._collect_category_groups() + self._collect_department_groups():
+            for yml_file in self._walk_group(group):
+                meta = self.load_metadata(yml_file, rel_base=group.rel_base, is_external=group.is_external)
+                if meta:
+                    yield PlaybookRecord(group.category, group.department, meta)
+        if self.manifest is not None:
+            self.manifest.finish_scan()
+
+    def _collect_category_groups(self) -> List[ScanGroup]:
+        """List all subfolders in built-in and external playbooks directories as categories."""
+        groups = []
+        roots = [(self.base_dir, False)]
         if self.external_repo_path:
-            external_playbooks_dir = self.external_repo_path / "playbooks"
-            if external_playbooks_dir.exists():
-                for subdir in external_playbooks_dir.iterdir():
-                    if subdir.is_dir() and subdir.name != "departments":  # Skip departments, handled separately
-                        category = subdir.name.capitalize()
-                        playbooks = []
-                        
-                        if self.debug:
-                            print(f"Scanning external playbooks in {subdir}")
-                        
-                        for yml_file in subdir.glob("*.yml"):
-                            meta = self.parse_metadata(yml_file, rel_base=self.external_repo_path, is_external=True)
-                            if meta:
-                                playbooks.append(meta)
-                                if self.debug:
-                                    print(f"App: Found external playbook: {meta['name']} in {category}")
-                            else:
-                                if self.debug:
-                                    print(f"App: Skipping external {yml_file.name} - no valid metadata")
-                        
-                        # Merge with existing category or create new one
-                        if playbooks:
-                            if category in all_playbooks:
-                                # Merge with existing built-in playbooks
-                                all_playbooks[category]["playbooks"].extend(playbooks)
-                                if self.debug:
-                                    print(f"App: Merged {len(playbooks)} external playbooks into existing {category} category")
-                            else:
-                                # Create new category
-                                all_playbooks[category] = {
-                                    "description": f"{category} applications and configurations",
-                                    "playbooks": playbooks
-                                }
+            roots.append((self.external_repo_path, True))
+        for root, is_external in roots:
+            playbooks_dir = root / "playbooks"
+            if not playbooks_dir.exists():
+                continue
+            for subdir in playbooks_dir.iterdir():
+                if subdir.is_dir() and subdir.name != "departments" and not self._is_ignored(subdir, root, True):  # Skip departments, handled separately
+                    groups.append(ScanGroup(subdir.name.capitalize(), subdir, root, is_external, False))
+        return groups
     
-    def _scan_department_playbooks(self, all_playbooks: Dict):
-        """Scan department playbooks from both built-in and external repositories."""
-        # Scan built-in department playbooks
+    def _collect_department_groups(self) -> List[ScanGroup]:
+        """List department folders from both built-in and external repositories."""
+        groups = []
+        # Built-in department playbooks
         built_in_dept_path = self.base_dir / "playbooks" / "departments"
         if built_in_dept_path.exists():
             if self.debug:
                 print(f"Scanning built-in department playbooks in {built_in_dept_path}")
-            self._scan_department_directory(built_in_dept_path, all_playbooks, is_external=False)
+            groups.extend(self._department_groups(built_in_dept_path, is_external=False))
         elif self.debug:
             print(f"Built-in department path does not exist: {built_in_dept_path}")
         
-        # Scan external department playbooks if external repo is set (deployment setup)
+        # External department playbooks if external repo is set (deployment setup)
         if self.external_repo_path:
             external_dept_path = self.external_repo_path / "playbooks" / "departments"
             if self.debug:
@@ -160,7 +419,7 @@ class PlaybookScanner:
             if external_dept_path.exists():
                 if self.debug:
                     print(f"Scanning external department playbooks in {external_dept_path}")
-                self._scan_department_directory(external_dept_path, all_playbooks, is_external=True)
+                groups.extend(self._department_groups(external_dept_path, is_external=True))
             elif self.debug:
                 print(f"External department path does not exist: {external_dept_path}")
                 # List contents of external repo to help debug
@@ -171,35 +430,132 @@ class PlaybookScanner:
                         print(f"Playbooks directory contents: {list(playbooks_dir.iterdir())}")
         elif self.debug:
             print("No external repository path configured")
+        return groups
     
-    def _scan_department_directory(self, dept_path: Path, all_playbooks: Dict, is_external: bool):
-        """Scan a department directory and add playbooks to the appropriate categories."""
+    def _department_groups(self, dept_path: Path, is_external: bool) -> List[ScanGroup]:
+        """Build scan groups for each department directory."""
         rel_base = self.external_repo_path if is_external else self.base_dir
+        return [
+            ScanGroup(f"Dep: {dept_dir.name.capitalize()}", dept_dir, rel_base, is_external, True)
+            for dept_dir in dept_path.iterdir() if dept_dir.is_dir() and not self._is_ignored(dept_dir, rel_base, True)
+        ]
+    
+    def _list_group_files(self, group: ScanGroup) -> List[Path]:
+        """List playbook files of one scan group (runs on the worker pool)."""
+        if self.debug and not group.department:
+            print(f"Scanning {'external' if group.is_external else 'built-in'} playbooks in {group.directory}")
+        return list(self._walk_group(group))
+    
+    def _walk_group(self, group: ScanGroup) -> Iterator[Path]:
+        """Yield *.yml files below a category folder, honouring ignore rules, depth and symlink policy.
+
+        Files of a folder come before its subfolders, each in directory order,
+        so a flat category yields exactly what glob("*.yml") used to.
+        """
+        visited = set()
+        stack = [(group.directory, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            try:
+                st = os.stat(directory)
+                if (st.st_dev, st.st_ino) in visited:
+                    continue  # Symlink loop
+                visited.add((st.st_dev, st.st_ino))
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError as e:
+                print(f"Error reading {directory}: {e}")
+                continue
+            subdirs = []
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue  # Hidden files and folders, as glob() skipped them
+                try:
+                    if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                        if depth < self.max_depth and not self._is_ignored(Path(entry.path), group.rel_base, True):
+                            subdirs.append(Path(entry.path))
+                    elif entry.name.endswith(".yml") and not self._is_ignored(Path(entry.path), group.rel_base, False):
+                        # Symlinked playbook files are always taken, as glob() did
+                        if entry.is_file():
+                            yield Path(entry.path)
+                except OSError:
+                    continue
+            stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+    
+    def _ignore_patterns(self, root: Path) -> List[str]:
+        """Read the .crimsonignore patterns of a playbooks root (cached)."""
+        key = str(root)
+        if key not in self._ignore_cache:
+            patterns = []
+            try:
+                with open(root / "playbooks" / IGNORE_FILENAME, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            patterns.append(line)
+            except OSError:
+                pass
+            self._ignore_cache[key] = patterns
+        return self._ignore_cache[key]
+    
+    def _is_ignored(self, path: Path, root: Path, is_dir: bool) -> bool:
+        """Match a path against .crimsonignore (fnmatch on the path below playbooks/ or the name; 'dir/' only matches folders)."""
+        patterns = self._ignore_patterns(root)
+        if not patterns:
+            return False
+        try:
+            rel_path = path.relative_to(root / "playbooks").as_posix()
+        except ValueError:
+            return False
+        for pattern in patterns:
+            if pattern.endswith("/"):
+                if not is_dir:
+                    continue
+                pattern = pattern.rstrip("/")
+            pattern = pattern.lstrip("/")
+            if fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(path.name, pattern):
+                return True
+        return False
+    
+    def _merge_group(self, all_playbooks: Dict, group: ScanGroup, results: List):
+        """Merge parsed playbooks of one scan group into the categories dict."""
+        kind = "department" if group.department else ("external" if group.is_external else "built-in")
+        playbooks = []
+        for yml_file, meta in results:
+            if meta:
+                playbooks.append(meta)
+                if self.debug:
+                    print(f"App: Found {kind} playbook: {meta['name']} in {group.category}")
+            elif self.debug:
+                print(f"App: Skipping {kind} {yml_file.name} - no valid metadata")
         
-        for dept_dir in dept_path.iterdir():
-            if dept_dir.is_dir():
-                dept_name = dept_dir.name.capitalize()
-                category_name = f"Dep: {dept_name}"
-                
-                if category_name not in all_playbooks:
-                    all_playbooks[category_name] = {
-                        "description": f"{dept_name} department specific playbooks",
-                        "playbooks": []
-                    }
-                
-                # Scan playbooks in this department directory
-                for yml_file in dept_dir.glob("*.yml"):
-                    meta = self.parse_metadata(yml_file, rel_base=rel_base, is_external=is_external)
-                    if meta:
-                        all_playbooks[category_name]["playbooks"].append(meta)
-                        if self.debug:
-                            print(f"App: Found department playbook: {meta['name']} in {category_name}")
-                    else:
-                        if self.debug:
-                            print(f"App: Skipping department {yml_file.name} - no valid metadata")
+        if group.department:
+            if group.category not in all_playbooks:
+                all_playbooks[group.category] = {
+                    "description": category_description(group.category, True),
+                    "playbooks": []
+                }
+            all_playbooks[group.category]["playbooks"].extend(playbooks)
+        elif playbooks:
+            if group.is_external and group.category in all_playbooks:
+                # Merge with existing built-in playbooks
+                all_playbooks[group.category]["playbooks"].extend(playbooks)
+                if self.debug:
+                    print(f"App: Merged {len(playbooks)} external playbooks into existing {group.category} category")
+            else:
+                all_playbooks[group.category] = {
+                    "description": category_description(group.category, False),
+                    "playbooks": playbooks
+                }
     
-    def generate_config(self, output_path: str = "", external_repo_path: str = None) -> bool:
-        """Generate gui_config.json from scanned playbooks, supporting external repo."""
+    def generate_config(self, output_path: str = "", external_repo_path: str = None, catalog_path: str = None) -> bool:
+        """Generate gui_config.json from scanned playbooks, supporting external repo.
+
+        The file is only replaced (atomically) if its content changed; what
+        changed is left in self.summary. If catalog_path is given the result
+        is also written to a SQLite catalog; gui_config.json is always kept
+        as the JSON export.
+        """
         try:
             import os
             import json
@@ -212,21 +568,168 @@ class PlaybookScanner:
             else:
                 if output_path.startswith("conf/"):
                     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # Keep the fingerprint manifest next to the generated config
+            manifest_path = str(Path(output_path).with_name(MANIFEST_FILENAME))
             # Use external repo if provided
             if external_repo_path:
-                scanner = PlaybookScanner(self.base_dir, external_repo_path)
+                scanner = PlaybookScanner(self.base_dir, external_repo_path, debug=self.debug, manifest_path=manifest_path,
+                                          max_workers=self.max_workers, max_depth=self.max_depth, follow_symlinks=self.follow_symlinks)
             else:
                 scanner = self
+                if scanner.manifest is None:
+                    scanner.manifest = PlaybookManifest(manifest_path, self.debug)
             config = scanner.scan_playbooks()
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            old_config = load_config_file(output_path)
+            written = write_if_changed(output_path, serialize_config(config))
+            self.summary = summarize_configs(old_config, config, written)
+            if catalog_path:
+                self._sync_catalog(catalog_path, config)
             if self.debug:
-                print(f"App: Generated {output_path} with {len(config['categories'])} categories")
+                if written:
+                    print(f"App: Generated {output_path} with {len(config['categories'])} categories")
+                else:
+                    print(f"App: {output_path} is up to date, not rewritten")
             return True
         except Exception as e:
             print(f"App:Error generating config: {e}")
             return False
 
+    def classify_path(self, filepath: Path) -> Optional[ScanGroup]:
+        """Return the scan group a playbook path belongs to, or None if it is not a playbook."""
+        filepath = Path(filepath)
+        if filepath.suffix != ".yml":
+            return None
+        roots = [(self.base_dir, False)]
+        if self.external_repo_path:
+            roots.append((self.external_repo_path, True))
+        for root, is_external in roots:
+            root = Path(os.path.abspath(root))
+            try:
+                parts = filepath.relative_to(root / "playbooks").parts
+            except ValueError:
+                continue
+            if any(part.startswith('.') for part in parts):
+                return None
+            ancestors = [root / "playbooks" / Path(*parts[:i]) for i in range(1, len(parts))]
+            if self._is_ignored(filepath, root, False) or any(self._is_ignored(a, root, True) for a in ancestors):
+                return None
+            if parts and parts[0] == "departments":
+                if 3 <= len(parts) <= self.max_depth + 3:
+                    return ScanGroup(f"Dep: {parts[1].capitalize()}", root / "playbooks" / parts[0] / parts[1], root, is_external, True)
+            elif 2 <= len(parts) <= self.max_depth + 2:
+                return ScanGroup(parts[0].capitalize(), root / "playbooks" / parts[0], root, is_external, False)
+        return None
+
+    def _sync_catalog(self, catalog_path: str, config: Dict):
+        """Mirror a config into the SQLite catalog unless it already holds exactly this config.
+
+        The catalog records the digest of the JSON payload, so it is also
+        rebuilt when gui_config.json changed while the json backend was
+        selected and the catalog was not kept up to date.
+        """
+        digest = hashlib.sha256(serialize_config(config)).hexdigest()
+        catalog = PlaybookCatalog(catalog_path, self.debug)
+        try:
+            if catalog.digest() != digest:
+                catalog.write(config, digest)
+        finally:
+            catalog.close()
+
+    def update_config(self, output_path: str, changed_paths: List[str], external_repo_path: str = None, catalog_path: str = None) -> bool:
+        """Apply a list of changed playbook paths to an existing gui_config.json.
+
+        Only the listed files are stat'ed and re-parsed; every other entry is
+        kept as is. An empty change list touches neither playbooks nor the
+        output file. Falls back to a full generate_config() if there is no
+        readable config to update yet.
+        """
+        if external_repo_path:
+            scanner = PlaybookScanner(self.base_dir, external_repo_path, debug=self.debug, max_workers=self.max_workers,
+                                      max_depth=self.max_depth, follow_symlinks=self.follow_symlinks)
+            success = scanner.update_config(output_path, changed_paths, catalog_path=catalog_path)
+            self.changes = scanner.changes
+            self.summary = scanner.summary
+            return success
+        self.changes = []
+        self.summary = None
+        config = load_config_file(output_path)
+        if not config:
+            # Missing or unreadable (e.g. written by an older, non-atomic version)
+            return self.generate_config(output_path, catalog_path=catalog_path)
+        if not changed_paths:
+            if self.debug:
+                print("App: No playbook changes, keeping existing config")
+            if catalog_path:
+                self._sync_catalog(catalog_path, config)
+            self.summary = summarize_changes([], False)
+            return True
+        try:
+            categories = config.setdefault("categories", {})
+            if self.manifest is None:
+                self.manifest = PlaybookManifest(Path(output_path).with_name(MANIFEST_FILENAME), self.debug)
+            removed = []
+            for changed_path in dict.fromkeys(os.path.abspath(p) for p in changed_paths):
+                group = self.classify_path(Path(changed_path))
+                if group is None:
+                    continue
+                self._apply_change(categories, group, Path(changed_path), removed)
+            self.manifest.finish_partial(removed)
+            if not self.changes:
+                if self.debug:
+                    print("App: Changed paths did not alter any catalog entry")
+                if catalog_path:
+                    self._sync_catalog(catalog_path, config)
+                self.summary = summarize_changes([], False)
+                return True
+            written = write_if_changed(output_path, serialize_config(config))
+            self.summary = summarize_changes(self.changes, written)
+            if catalog_path:
+                self._sync_catalog(catalog_path, config)
+            if self.debug:
+                print(f"App: Updated {output_path} for {len(self.changes)} changed playbooks")
+            return True
+        except Exception as e:
+            print(f"App:Error updating config: {e}")
+            return False
+
+    def _apply_change(self, categories: Dict, group: ScanGroup, filepath: Path, removed: List[str]):
+        """Replace, insert or remove the catalog entry for one changed playbook."""
+        rel_path = str(filepath.relative_to(group.rel_base))
+        source = "External" if group.is_external else "Built-in"
+        old_category, old_index = None, None
+        for category, cat_info in categories.items():
+            for index, playbook in enumerate(cat_info.get("playbooks", [])):
+                if playbook.get("path") == rel_path and playbook.get("source", "Built-in") == source:
+                    old_category, old_index = category, index
+                    break
+            if old_category is not None:
+                break
+        meta = None
+        if filepath.exists():
+            meta = self.load_metadata(filepath, rel_base=group.rel_base, is_external=group.is_external)
+        else:
+            removed.append(str(filepath))
+        old_meta = categories[old_category]["playbooks"][old_index] if old_category is not None else None
+        if old_meta is None and meta is None:
+            return
+        if old_meta == meta and old_category == group.category:
+            return
+        self.changes.append(CatalogChange(old_category, old_meta, group.category if meta else None, meta))
+        if self.debug:
+            action = "Updated" if meta and old_meta else ("Added" if meta else "Removed")
+            print(f"App: {action} playbook entry for {rel_path}")
+        if old_category == group.category and meta:
+            categories[old_category]["playbooks"][old_index] = meta
+            return
+        if old_category is not None:
+            del categories[old_category]["playbooks"][old_index]
+            if not categories[old_category]["playbooks"] and not old_category.startswith("Dep: "):
+                del categories[old_category]
+        if meta:
+            if group.category not in categories:
+                categories[group.category] = {"description": category_description(group.category, group.department), "playbooks": []}
+            categories[group.category]["playbooks"].append(meta)
+
 def main():
     """Main function for standalone execution."""
     scanner = PlaybookScanner()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Playbook Scheduler
+Orders selected playbooks as a dependency graph and runs independent ones concurrently.
+"""
+
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional, Sequence
+
+RESOURCE_APT = "apt-lock"
+RESOURCE_SNAP = "snap"
+
+DEFAULT_INSTALL_WORKERS = 3
+
+# Modules and commands that take the dpkg/apt lock or talk to snapd
+_APT_USAGE = re.compile(r"\b(?:apt|apt-get|aptitude|apt_repository|apt_key|deb822_repository|dpkg|dpkg_selections"
+                        r"|add-apt-repository|unattended-upgrade|package)\b")
+_SNAP_USAGE = re.compile(r"\bsnap\b")
+
+ScheduleResult = namedtuple("ScheduleResult", ["completed", "failed", "not_run"])
+
+def infer_resources(text: str) -> List[str]:
+    """Guess the locks a playbook needs from the modules and commands it mentions.
+
+    Used when a playbook has no `CrimsonCFG-Resources:` header. Comments
+    count as well, so this errs on the side of serialising.
+    """
+    resources = []
+    if _APT_USAGE.search(text):
+        resources.append(RESOURCE_APT)
+    if _SNAP_USAGE.search(text):
+        resources.append(RESOURCE_SNAP)
+    return resources
+
+def essential_sort_key(playbook: Dict):
+    """Essentials first, by CrimsonCFG-Essential-Order (unordered ones last among them)."""
+    if playbook.get("essential", False):
+        try:
+            return (0, int(playbook.get("essential_order") or 999))
+        except (TypeError, ValueError):
+            return (0, 999)
+    return (1, 0)
+
+def _names(playbook: Dict) -> List[str]:
+    """Names an After/Conflicts entry can use: the CrimsonCFG-Name or the file name without .yml"""
+    stem = os.path.splitext(os.path.basename(playbook.get("path", "")))[0]
+    return [name.lower() for name in (playbook.get("name"), stem) if name]
+
+class PlaybookPlan:
+    """Dependency graph of one installation.
+
+    Edges come from `CrimsonCFG-After:` (names of other selected playbooks)
+    and, for playbooks without that header, from the essential ordering:
+    an essential runs after every selected essential with a lower
+    Essential-Order, everything else after all essentials. Playbooks that
+    share a resource (`CrimsonCFG-Resources:`, otherwise inferred) or name
+    each other in `CrimsonCFG-Conflicts:` never run at the same time.
+    A dependency cycle makes the whole plan serial.
+    """
+
+    def __init__(self, playbooks: Sequence[Dict], texts: Optional[Dict[int, str]] = None,
+                 weights: Optional[Sequence[float]] = None):
+        # Stable: playbooks of equal rank keep the selection order
+        order = sorted(range(len(playbooks)), key=lambda i: essential_sort_key(playbooks[i]))
+        self.playbooks = [playbooks[i] for i in order]
+        texts = {order.index(i): text for i, text in (texts or {}).items()}
+        self.weights = [float(weights[i]) for i in order] if weights else [1.0] * len(order)
+        count = len(self.playbooks)
+
+        by_name = {}
+        for index, playbook in enumerate(self.playbooks):
+            for name in _names(playbook):
+                by_name.setdefault(name, index)
+
+        def lookup(names):
+            return {by_name[name.lower()] for name in names if name.lower() in by_name}
+
+        self.after = []
+        for index, playbook in enumerate(self.playbooks):
+            if "after" in playbook:
+                deps = lookup(playbook["after"])
+            else:
+                rank = essential_sort_key(playbook)
+                deps = {other for other in range(count)
+                        if self.playbooks[other].get("essential", False) and essential_sort_key(self.playbooks[other]) < rank}
+            deps.discard(index)
+            self.after.append(deps)
+
+        self.resources = []
+        for index, playbook in enumerate(self.playbooks):
+            if "resources" in playbook:
+                resources = playbook["resources"]
+            else:
+                resources = infer_resources(texts.get(index, ""))
+            self.resources.append(frozenset(resources))
+
+        self.conflicts = [set() for _ in range(count)]
+        for index, playbook in enumerate(self.playbooks):
+            for other in lookup(playbook.get("conflicts", [])):
+                if other != index:
+                    self.conflicts[index].add(other)
+                    self.conflicts[other].add(index)
+
+        self.cycle = self._topological_order() is None
+        if self.cycle:
+            print("PlaybookPlan: Dependency cycle in CrimsonCFG-After headers, running serially")
+            self.after = [set(range(index)) for index in range(count)]
+        self.priority = self._remaining_path()
+
+    def _topological_order(self) -> Optional[List[int]]:
+        pending = {index: set(deps) for index, deps in enumerate(self.after)}
+        order = []
+        while pending:
+            ready = sorted(index for index, deps in pending.items() if not deps)
+            if not ready:
+                return None
+            for index in ready:
+                del pending[index]
+                order.append(index)
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    def _remaining_path(self) -> List[float]:
+        """Longest weighted path from each playbook to the end of the run."""
+        dependents = [[] for _ in self.playbooks]
+        for index, deps in enumerate(self.after):
+            for dep in deps:
+                dependents[dep].append(index)
+        remaining = [0.0] * len(self.playbooks)
+        for index in reversed(self._topological_order()):
+            remaining[index] = self.weights[index] + max((remaining[child] for child in dependents[index]), default=0.0)
+        return remaining
+
+    def critical_path(self) -> float:
+        """Weight of the longest dependency chain, the lower bound of a parallel run."""
+        return max(self.priority, default=0.0)
+
+    def excludes(self, index: int, other: int) -> bool:
+        return other in self.conflicts[index] or bool(self.resources[index] & self.resources[other])
+
+    def chains(self) -> List[List[int]]:
+        """Group the playbooks into dependency chains that can run as one unit.
+
+        Along the transitive reduction of the graph, a playbook joins the
+        chain of its only direct dependency when it is that dependency's only
+        direct dependent. Nothing else waits for the middle of a chain, so
+        running it in one go (and one ansible-playbook process) keeps the
+        parallelism; the chain only holds the resources of all its playbooks
+        while it runs.
+        """
+        order = self._topological_order()
+        ancestors = {}
+        for index in order:
+            ancestors[index] = set(self.after[index])
+            for dep in self.after[index]:
+                ancestors[index] |= ancestors[dep]
+        direct = [{dep for dep in deps if not any(dep in ancestors[other] for other in deps)}
+                  for deps in self.after]
+        dependents = [0] * len(self.playbooks)
+        for deps in direct:
+            for dep in deps:
+                dependents[dep] += 1
+        chains, chain_of = [], {}
+        for index in order:
+            if len(direct[index]) == 1:
+                (dep,) = direct[index]
+                if dependents[dep] == 1:
+                    chain_of[index] = chain_of[dep]
+                    chain_of[index].append(index)
+                    continue
+            chain_of[index] = [index]
+            chains.append(chain_of[index])
+        return chains
+
+    def serial_order(self) -> List[Dict]:
+        """The playbooks in the order a single worker runs them."""
+        done, order = set(), []
+        while len(order) < len(self.playbooks):
+            index = next(index for index in range(len(self.playbooks))
+                         if index not in done and self.after[index] <= done)
+            done.add(index)
+            order.append(self.playbooks[index])
+        return order
+
+class PlaybookScheduler:
+    """Runs a PlaybookPlan with up to `workers` units at a time.
+
+    A unit is one playbook, or a chain from PlaybookPlan.chains() whose
+    playbooks run in order on the same worker. Of the units whose
+    dependencies completed and that don't contend with a running one, the
+    one with the longest remaining path starts first. After a failure no
+    new units are started; running ones are allowed to finish.
+    """
+
+    def __init__(self, plan: PlaybookPlan, workers: int = DEFAULT_INSTALL_WORKERS,
+                 chains: Optional[List[List[int]]] = None):
+        self.plan = plan
+        self.workers = max(1, workers)
+        self.units = chains if chains is not None else [[index] for index in range(len(plan.playbooks))]
+        self._condition = threading.Condition()
+
+    def run(self, execute: Callable[[List[Dict]], int], on_start: Callable[[List[Dict]], None] = None,
+            on_finish: Callable[[List[Dict], bool], None] = None) -> ScheduleResult:
+        """Call execute(playbooks) for every unit on worker threads; blocks until done.
+
+        execute runs the playbooks of a unit in order and returns how many
+        of them completed.
+        """
+        plan, units = self.plan, self.units
+        unit_of = {index: unit for unit, members in enumerate(units) for index in members}
+        after = [{unit_of[dep] for index in members for dep in plan.after[index]} - {unit}
+                 for unit, members in enumerate(units)]
+        priority = [plan.priority[members[0]] for members in units]
+        running, completed, failed = set(), set(), set()
+        started = set()
+        done, broken = set(), set()  # plan indices that completed / failed
+
+        def excludes(unit, other):
+            return any(plan.excludes(index, other_index) for index in units[unit] for other_index in units[other])
+
+        def candidates():
+            for unit in range(len(units)):
+                if unit in started or not after[unit] <= completed:
+                    continue
+                if any(excludes(unit, other) for other in running):
+                    continue
+                yield unit
+
+        def work(unit):
+            members = units[unit]
+            playbooks = [plan.playbooks[index] for index in members]
+            count = 0
+            try:
+                count = execute(playbooks)
+            except Exception as e:
+                print(f"PlaybookScheduler: {playbooks[0].get('name')} raised {e}")
+            ok = count >= len(members)
+            if on_finish is not None:
+                on_finish(playbooks, ok)
+            with self._condition:
+                running.discard(unit)
+                done.update(members[:count])
+                if ok:
+                    completed.add(unit)
+                else:
+                    failed.add(unit)
+                    broken.add(members[count])
+                self._condition.notify_all()
+
+        with self._condition:
+            while True:
+                while not failed and len(running) < self.workers:
+                    unit = max(candidates(), key=lambda u: (priority[u], -units[u][0]), default=None)
+                    if unit is None:
+                        break
+                    started.add(unit)
+                    running.add(unit)
+                    if on_start is not None:
+                        on_start([plan.playbooks[index] for index in units[unit]])
+                    threading.Thread(target=work, args=(unit,), daemon=True).start()
+                if not running:
+                    break
+                self._condition.wait()
+
+        return ScheduleResult(
+            [plan.playbooks[i] for i in sorted(done)],
+            [plan.playbooks[i] for i in sorted(broken)],
+            [plan.playbooks[i] for i in range(len(plan.playbooks)) if i not in done and i not in broken],
+        )
+
+def main():
+    """Print the plan for the given playbooks: dependencies, resources and critical path."""
+    if len(sys.argv) < 2:
+        print("Usage: playbook_scheduler.py <playbook.yml>...")
+        return 1
+    try:
+        from functions.playbook_scanner import PlaybookScanner
+    except ImportError:
+        from playbook_scanner import PlaybookScanner
+    from pathlib import Path
+    scanner = PlaybookScanner(os.getcwd())
+    playbooks, texts = [], {}
+    for path in sys.argv[1:]:
+        meta = scanner.parse_metadata(Path(path).resolve(), Path(path).resolve().parent)
+        if meta is None:
+            print(f"Skipping {path}: no CrimsonCFG-Name header")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            texts[len(playbooks)] = f.read()
+        playbooks.append(meta)
+    plan = PlaybookPlan(playbooks, texts)
+    for index, playbook in enumerate(plan.playbooks):
+        after = ", ".join(plan.playbooks[dep]["name"] for dep in sorted(plan.after[index])) or "-"
+        resources = ", ".join(sorted(plan.resources[index])) or "-"
+        print(f"{playbook['name']}\n    after: {after}\n    resources: {resources}")
+    for chain in plan.chains():
+        if len(chain) > 1:
+            print("Chain: " + " -> ".join(plan.playbooks[index]["name"] for index in chain))
+    print(f"Critical path: {plan.critical_path():.0f} of {len(plan.playbooks)} playbooks")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
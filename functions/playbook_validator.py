@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Playbook Validator
+Parses complete playbooks in a process pool and caches the analysis by content hash.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+try:
+    from functions.yaml_io import FastLoader
+except ImportError:
+    # Standalone execution from within functions/
+    from yaml_io import FastLoader
+
+VALIDATION_FILENAME = "playbook_validation.json"
+VALIDATION_VERSION = 4
+
+DEFAULT_VALIDATION_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Keys of a task that are not the module it calls
+TASK_KEYWORDS = {
+    "name", "when", "loop", "with_items", "with_dict", "with_fileglob", "with_lines", "loop_control",
+    "register", "become", "become_user", "become_method", "changed_when", "failed_when", "ignore_errors",
+    "ignore_unreachable", "tags", "notify", "listen", "vars", "environment", "args", "delegate_to",
+    "run_once", "until", "retries", "delay", "no_log", "check_mode", "diff", "async", "poll", "timeout",
+    "any_errors_fatal", "throttle", "local_action", "collections", "module_defaults", "debugger",
+    "block", "rescue", "always",
+}
+TASK_SECTIONS = ("pre_tasks", "tasks", "post_tasks", "handlers")
+TEMPLATE_MODULES = {"template", "ansible.builtin.template", "ansible.legacy.template"}
+SET_FACT_MODULES = {"set_fact", "ansible.builtin.set_fact", "ansible.legacy.set_fact"}
+# A vars_files entry that loads the user's local.yml
+_LOCAL_CONFIG_FILE = re.compile(r"com\.crimson\.cfg/local\.yml")
+
+VERDICT_OK = "ok"
+VERDICT_WARNING = "warning"  # Parses, but references templates that do not exist
+VERDICT_INVALID = "invalid"  # YAML or playbook structure errors
+
+_VAR_PATTERN = re.compile(r"{{-?\s*([A-Za-z_][A-Za-z0-9_]*)\s*(\()?")
+# Names that are Jinja/Ansible builtins rather than playbook variables
+_BUILTIN_NAMES = {"item", "lookup", "query", "q", "omit", "true", "false", "none", "True", "False", "None",
+                  "hostvars", "groups", "inventory_hostname", "playbook_dir", "role_path"}
+
+# Jinja expressions and statements, plus the bare expressions of conditional keywords
+_EXPRESSION = re.compile(r"{{(.*?)}}|{%(.*?)%}", re.S)
+_CONDITION = re.compile(r"^\s*-?\s*(?:when|changed_when|failed_when|until)\s*:\s*(.+)$", re.M)
+_CONDITION_ITEM = re.compile(r"^\s*-\s*([^:#]+)$")
+# An identifier that is not an attribute (`.name`), filter/test (`| name`, `is name`) or string content
+_NAME = re.compile(r"(?<![\w.|'\"])\s*([A-Za-z_][A-Za-z0-9_]*)")
+_STRING = re.compile(r"'[^']*'|\"[^\"]*\"")
+
+def referenced_names(text: str) -> Set[str]:
+    """Return every identifier used in Jinja expressions or conditionals of a playbook or template.
+
+    This over-approximates (Jinja keywords, loop variables, facts are
+    included); callers intersect the result with the names they care about.
+    """
+    expressions = [a or b for a, b in _EXPRESSION.findall(text)]
+    for match in _CONDITION.finditer(text):
+        expressions.append(match.group(1))
+    for line in text.splitlines():
+        # List form of `when:`; harmless for other lists since unknown names are dropped later
+        item = _CONDITION_ITEM.match(line)
+        if item:
+            expressions.append(item.group(1))
+    names = set()
+    for expression in expressions:
+        expression = _STRING.sub("''", expression)
+        expression = re.sub(r"\|\s*[A-Za-z_]\w*|\bis\s+(?:not\s+)?[A-Za-z_]\w*", " ", expression)
+        names.update(match.group(1) for match in _NAME.finditer(expression))
+    return names
+
+class _PlaybookLoader(FastLoader):
+    """SafeLoader that accepts Ansible specific tags such as !vault and !unsafe."""
+
+def _construct_tagged(loader, tag_suffix, node):
+    if isinstance(node, yaml.ScalarNode):
+        return loader.construct_scalar(node)
+    if isinstance(node, yaml.SequenceNode):
+        return loader.construct_sequence(node)
+    return loader.construct_mapping(node)
+
+_PlaybookLoader.add_multi_constructor("!", _construct_tagged)
+
+def analyze_playbook(text: str) -> Dict:
+    """Parse a playbook and describe it; depends on the content only, so it can be cached.
+
+    Returns valid, error, task_count, modules, templates (raw src values of
+    template tasks), vars (referenced Jinja variables), names (every
+    identifier of its expressions and conditionals, see referenced_names),
+    loads_local_config (a play's vars_files loads local.yml), defined_vars
+    (names the playbook sets itself: play/task vars, set_fact, register,
+    loop_var), host_facts (the set_fact and register names among them,
+    which stay set on the host after the play ends) and uses_playbook_dir.
+    """
+    result = {"valid": True, "error": None, "task_count": 0, "modules": [], "templates": [], "vars": [],
+              "names": [], "loads_local_config": False, "defined_vars": [], "host_facts": [],
+              "uses_playbook_dir": False}
+    try:
+        plays = yaml.load(text, Loader=_PlaybookLoader)
+    except yaml.YAMLError as e:
+        result.update(valid=False, error=" ".join(str(e).split()))
+        return result
+    if not isinstance(plays, list):
+        result.update(valid=False, error="A playbook must be a list of plays")
+        return result
+    modules, templates, defined, facts = set(), [], set(), set()
+    for index, play in enumerate(plays):
+        if not isinstance(play, dict):
+            result.update(valid=False, error=f"Play {index + 1} is not a mapping")
+            return result
+        if "import_playbook" in play or "ansible.builtin.import_playbook" in play:
+            continue
+        if "hosts" not in play:
+            result.update(valid=False, error=f"Play {index + 1} has no hosts")
+            return result
+        vars_files = play.get("vars_files") or []
+        if isinstance(vars_files, str):
+            vars_files = [vars_files]
+        if isinstance(vars_files, list) and any(_LOCAL_CONFIG_FILE.search(str(entry)) for entry in vars_files):
+            result["loads_local_config"] = True
+        _collect_vars(play.get("vars"), defined)
+        for prompt in play.get("vars_prompt") or []:
+            if isinstance(prompt, dict) and prompt.get("name"):
+                defined.add(str(prompt["name"]))
+        for section in TASK_SECTIONS:
+            tasks = play.get(section) or []
+            if not isinstance(tasks, list):
+                result.update(valid=False, error=f"Play {index + 1}: {section} is not a list")
+                return result
+            error = _walk_tasks(tasks, result, modules, templates, defined, facts)
+            if error:
+                result.update(valid=False, error=f"Play {index + 1}: {error}")
+                return result
+    result["modules"] = sorted(modules)
+    result["defined_vars"] = sorted(defined | facts)
+    result["host_facts"] = sorted(facts)
+    result["templates"] = templates
+    result["vars"] = sorted({match.group(1) for match in _VAR_PATTERN.finditer(text)
+                             if not match.group(2) and match.group(1) not in _BUILTIN_NAMES})
+    result["names"] = sorted(referenced_names(text))
+    result["uses_playbook_dir"] = "playbook_dir" in result["names"]
+    return result
+
+def _collect_vars(variables, defined: set):
+    if isinstance(variables, dict):
+        defined.update(str(name) for name in variables)
+
+def _walk_tasks(tasks: List, result: Dict, modules: set, templates: List, defined: set, facts: set) -> Optional[str]:
+    """Count tasks (including blocks) and collect modules, template sources and defined variables."""
+    for task in tasks:
+        if not isinstance(task, dict):
+            return f"task {task!r} is not a mapping"
+        _collect_vars(task.get("vars"), defined)
+        if task.get("register"):
+            facts.add(str(task["register"]))
+        loop_control = task.get("loop_control")
+        if isinstance(loop_control, dict) and loop_control.get("loop_var"):
+            defined.add(str(loop_control["loop_var"]))
+        if "block" in task:
+            for section in ("block", "rescue", "always"):
+                error = _walk_tasks(task.get(section) or [], result, modules, templates, defined, facts)
+                if error:
+                    return error
+            continue
+        candidates = [key for key in task if key not in TASK_KEYWORDS]
+        if not candidates:
+            return f"task '{task.get('name', '?')}' does not call a module"
+        module = candidates[0]
+        modules.add(module)
+        result["task_count"] += 1
+        if module in SET_FACT_MODULES:
+            args = task[module]
+            if isinstance(args, str):
+                args = dict(part.split("=", 1) for part in args.split() if "=" in part)
+            if isinstance(args, dict):
+                facts.update(str(name) for name in args if name != "cacheable")
+        if module in TEMPLATE_MODULES:
+            args = task[module]
+            if isinstance(args, str):
+                args = dict(part.split("=", 1) for part in args.split() if "=" in part)
+            if isinstance(args, dict) and args.get("src"):
+                templates.append(str(args["src"]))
+    return None
+
+def _analyze_job(job: Tuple[str, str]) -> Tuple[str, Dict]:
+    digest, text = job
+    return digest, analyze_playbook(text)
+
+def missing_templates(templates: Iterable[str], playbook_path: str, templates_dir: str) -> List[str]:
+    """Return template sources that cannot be resolved on disk.
+
+    `{{ templates_directory }}` is replaced with templates_dir; sources that
+    still contain Jinja expressions cannot be checked and are skipped.
+    """
+    missing = []
+    templates_dir = os.path.abspath(templates_dir)
+    playbook_dir = os.path.dirname(os.path.abspath(playbook_path))
+    for src in templates:
+        path = re.sub(r"{{\s*templates_directory\s*}}", templates_dir, src)
+        if "{{" in path:
+            continue
+        if os.path.isabs(path):
+            candidates = [path]
+        else:
+            candidates = [os.path.join(playbook_dir, "templates", path), os.path.join(playbook_dir, path)]
+        if not any(os.path.exists(candidate) for candidate in candidates):
+            missing.append(src)
+    return missing
+
+class PlaybookValidator:
+    """Validates playbooks in a process pool, caching analyses by sha256 of the file content."""
+
+    def __init__(self, cache_path: str = None, debug: bool = False, max_workers: int = DEFAULT_VALIDATION_WORKERS):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.debug = debug
+        self.max_workers = max(1, max_workers)
+        self.entries = {}  # sha256 -> analyze_playbook() result
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load cached analyses, starting empty if the cache is missing or unreadable."""
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == VALIDATION_VERSION:
+                self.entries = data.get("results", {})
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            if self.debug:
+                print(f"App: Ignoring unreadable validation cache {self.cache_path}: {e}")
+            self.entries = {}
+
+    def save(self, used: Iterable[str]):
+        """Persist the analyses of the given digests, dropping everything else."""
+        if self.cache_path is None:
+            return
+        with self._lock:
+            self.entries = {digest: self.entries[digest] for digest in used if digest in self.entries}
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"version": VALIDATION_VERSION, "results": self.entries}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_path)
+            except Exception as e:
+                print(f"App: Error saving validation cache {self.cache_path}: {e}")
+
+    def validate(self, playbooks: Iterable[Tuple[str, str]], prune: bool = True) -> Dict[str, Dict]:
+        """Validate (playbook_path, templates_dir) pairs and return results keyed by playbook path.
+
+        Each result is the cached content analysis plus missing_templates and
+        a verdict (ok, warning or invalid). Only files whose content hash is
+        not cached yet are parsed, in a spawned process pool. With prune the
+        cache keeps only the playbooks of this call.
+        """
+        files = {}
+        pending = {}
+        for playbook_path, templates_dir in playbooks:
+            try:
+                with open(playbook_path, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                files[playbook_path] = (None, templates_dir, str(e))
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            files[playbook_path] = (digest, templates_dir, None)
+            if digest not in self.entries and digest not in pending:
+                pending[digest] = data.decode('utf-8', errors='replace')
+        if pending:
+            if self.debug:
+                print(f"App: Validating {len(pending)} playbooks ({len(files) - len(pending)} cached)")
+            if len(pending) == 1 or self.max_workers == 1:
+                analyzed = map(_analyze_job, pending.items())
+                self._store(analyzed)
+            else:
+                # Spawn rather than fork: the GUI process has GTK state and threads
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending)), mp_context=context) as pool:
+                    self._store(pool.map(_analyze_job, pending.items(), chunksize=8))
+        results = {}
+        for playbook_path, (digest, templates_dir, error) in files.items():
+            if digest is None:
+                results[playbook_path] = {"valid": False, "error": error, "task_count": 0, "modules": [],
+                                          "templates": [], "vars": [], "names": [], "loads_local_config": False,
+                                          "defined_vars": [], "host_facts": [], "uses_playbook_dir": False,
+                                          "missing_templates": [],
+                                          "verdict": VERDICT_INVALID}
+                continue
+            result = dict(self.entries[digest])
+            result["missing_templates"] = missing_templates(result["templates"], playbook_path, templates_dir)
+            if not result["valid"]:
+                result["verdict"] = VERDICT_INVALID
+            elif result["missing_templates"]:
+                result["verdict"] = VERDICT_WARNING
+            else:
+                result["verdict"] = VERDICT_OK
+            results[playbook_path] = result
+        if pending or prune:
+            used = {digest for digest, _, _ in files.values() if digest}
+            self.save(used if prune else set(self.entries) | used)
+        return results
+
+    def _store(self, analyzed):
+        for digest, analysis in analyzed:
+            with self._lock:
+                self.entries[digest] = analysis
+
+def describe(result: Dict) -> str:
+    """One line summary of a validation result for tooltips and logs."""
+    if result["verdict"] == VERDICT_INVALID:
+        return f"Invalid playbook: {result['error']}"
+    if result["verdict"] == VERDICT_WARNING:
+        return f"Missing templates: {', '.join(result['missing_templates'])}"
+    return f"{result['task_count']} tasks"
+
+def main():
+    """Main function for standalone execution."""
+    if len(sys.argv) < 2:
+        print("Usage: playbook_validator.py <playbook.yml>... [--templates DIR]")
+        return 1
+    args = sys.argv[1:]
+    templates_dir = "templates"
+    if "--templates" in args:
+        index = args.index("--templates")
+        templates_dir = args[index + 1]
+        del args[index:index + 2]
+    validator = PlaybookValidator(debug=True)
+    exit_code = 0
+    for playbook_path, result in validator.validate((path, templates_dir) for path in args).items():
+        print(f"{result['verdict'].upper():8} {playbook_path}: {describe(result)}")
+        if result["verdict"] == VERDICT_INVALID:
+            exit_code = 1
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Playbook Variables
+Finds the local.yml variables a playbook (and its templates) reference and writes
+the minimal, already resolved extra-vars file passed to ansible-playbook with -e @file.
+"""
+
+import os
+import re
+import sys
+import json
+from typing import Dict, Iterable, Mapping, Set
+
+try:
+    from functions.playbook_validator import analyze_playbook, referenced_names
+except ImportError:
+    # Standalone execution from within functions/
+    from playbook_validator import analyze_playbook, referenced_names
+
+def _template_paths(templates: Iterable[str], playbook_path: str, templates_dir: str):
+    playbook_dir = os.path.dirname(os.path.abspath(playbook_path))
+    for src in templates:
+        path = re.sub(r"{{\s*templates_directory\s*}}", templates_dir, src)
+        if "{{" in path:
+            continue
+        candidates = [path] if os.path.isabs(path) else [
+            os.path.join(playbook_dir, "templates", path), os.path.join(playbook_dir, path)]
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                yield candidate
+                break
+
+def template_names(templates: Iterable[str], playbook_path: str, templates_dir: str) -> Set[str]:
+    """Identifiers referenced by the templates a playbook's template tasks render."""
+    names = set()
+    for template in _template_paths(templates, playbook_path, templates_dir):
+        try:
+            with open(template, "r", encoding="utf-8") as f:
+                names |= referenced_names(f.read())
+        except (OSError, UnicodeDecodeError):
+            continue
+    return names
+
+def playbook_variables(playbook_path: str, templates_dir: str) -> Set[str]:
+    """local.yml candidates a playbook and the templates its template tasks render reference.
+
+    Extra vars outrank every other variable source, so only playbooks that
+    load local.yml through vars_files get any, and names the playbook sets
+    itself (vars, set_fact, register, loop_var) are left out: those must
+    keep overriding the local.yml value as they did with vars_files.
+    """
+    with open(playbook_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    analysis = analyze_playbook(text)
+    if not analysis.get("loads_local_config"):
+        return set()
+    names = set(analysis["names"]) | template_names(analysis["templates"], playbook_path, templates_dir)
+    return names - set(analysis.get("defined_vars", []))
+
+def _plain(value):
+    """Convert frozen settings values (mappingproxy, tuple) back to JSON types."""
+    if isinstance(value, Mapping):
+        return {str(key): _plain(child) for key, child in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(child) for child in value]
+    return value
+
+def select_vars(names: Iterable[str], values: Mapping) -> Dict:
+    """The subset of the resolved local config that is actually referenced."""
+    return {name: _plain(values[name]) for name in sorted(names) if name in values}
+
+def write_vars_file(path: str, data: Dict):
+    """Write an extra-vars file readable only by the current user (it may hold secrets)."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+
+def main():
+    """Print the local.yml variables each given playbook references."""
+    if len(sys.argv) < 2:
+        print("Usage: playbook_vars.py PLAYBOOK [PLAYBOOK ...] [--templates DIR]")
+        return 1
+    args = sys.argv[1:]
+    templates_dir = "templates"
+    if "--templates" in args:
+        index = args.index("--templates")
+        templates_dir = args[index + 1]
+        del args[index:index + 2]
+    for path in args:
+        print(f"{path}: {', '.join(sorted(playbook_variables(path, os.path.abspath(templates_dir))))}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG YAML Backend Benchmark
+Compares libyaml, pure PyYAML and ruamel.yaml on local.yml sized documents.
+Runs headless (no GTK required).
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import yaml
+
+try:
+    from functions import yaml_io
+except ImportError:
+    # Standalone execution from within functions/
+    import yaml_io
+
+DEFAULT_SIZES = [1, 10, 100]
+TEMPLATE_PATH = Path(__file__).resolve().parent.parent / "templates" / "local.yml.j2"
+
+def build_document(scale: int) -> str:
+    """Return the rendered local.yml template, repeated `scale` times with unique keys."""
+    template = TEMPLATE_PATH.read_text(encoding="utf-8").replace("{{ ", "").replace(" }}", "")
+    if scale <= 1:
+        return template
+    blocks = [template]
+    for copy in range(1, scale):
+        lines = []
+        for line in template.splitlines():
+            if line and not line.startswith((" ", "#")) and ":" in line:
+                key, rest = line.split(":", 1)
+                line = f"{key}_{copy}:{rest}"
+            lines.append(line)
+        blocks.append("\n".join(lines))
+    return "\n".join(blocks) + "\n"
+
+def _time(func: Callable, repeat: int, number: int) -> float:
+    """Best average seconds per call over `repeat` rounds of `number` calls."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmarks(sizes: List[int], repeat: int = 5, number: int = 20) -> Dict[str, Dict]:
+    results = {}
+    for scale in sizes:
+        text = build_document(scale)
+        document = yaml_io.load_round_trip(text)
+        loads = max(1, number // scale)
+        metrics = {
+            "bytes": len(text.encode("utf-8")),
+            "keys": len(document),
+            "pyyaml_safe_us": _time(lambda: yaml.load(text, Loader=yaml.SafeLoader), repeat, loads) * 1e6,
+            "ruamel_rt_load_us": _time(lambda: yaml_io.load_round_trip(text), repeat, loads) * 1e6,
+            "ruamel_rt_dump_us": _time(lambda: yaml_io.dumps_round_trip(document), repeat, loads) * 1e6,
+        }
+        if getattr(yaml, "CSafeLoader", None) is not None:
+            metrics["libyaml_csafe_us"] = _time(lambda: yaml.load(text, Loader=yaml.CSafeLoader), repeat, loads) * 1e6
+        results[str(scale)] = metrics
+    return results
+
+def print_report(results: Dict):
+    print(f"Read backend in use: {yaml_io.fast_backend()}")
+    print(f"{'scale':>6} {'keys':>6} {'KB':>7} {'libyaml us':>11} {'pyyaml us':>11} {'ruamel rd us':>13} {'ruamel wr us':>13} {'speedup':>8}")
+    for scale, m in results.items():
+        fast = m.get("libyaml_csafe_us")
+        speedup = f"{m['ruamel_rt_load_us'] / fast:>7.1f}x" if fast else f"{'n/a':>8}"
+        print(f"{scale:>6} {m['keys']:>6} {m['bytes'] / 1024:>7.1f} {fast if fast else float('nan'):>11.0f} "
+              f"{m['pyyaml_safe_us']:>11.0f} {m['ruamel_rt_load_us']:>13.0f} {m['ruamel_rt_dump_us']:>13.0f} {speedup}")
+
+def main():
+    """Main function for standalone execution."""
+    parser = argparse.ArgumentParser(description="Benchmark YAML backends on local.yml sized documents")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma separated multiples of the local.yml template (e.g. 1,10,100)")
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds per measurement, the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = run_benchmarks(sizes, max(1, args.repeat))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG YAML I/O
+Fast reads through libyaml (PyYAML CSafeLoader), comment-preserving writes through ruamel.yaml.
+"""
+
+import io
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import yaml
+    try:
+        from yaml import CSafeLoader as FastLoader
+    except ImportError:
+        # PyYAML built without libyaml
+        from yaml import SafeLoader as FastLoader
+except ImportError:
+    yaml = None
+    FastLoader = None
+
+try:
+    from ruamel.yaml import YAML
+    from ruamel.yaml.comments import CommentedMap
+except ImportError:
+    YAML = None
+    CommentedMap = dict
+
+def fast_backend() -> str:
+    """Name of the loader used by load(): libyaml, pyyaml or ruamel."""
+    if FastLoader is None:
+        return "ruamel"
+    return "libyaml" if FastLoader.__name__ == "CSafeLoader" else "pyyaml"
+
+def load(source: Union[str, bytes, io.IOBase]) -> Any:
+    """Parse YAML for reading only; returns plain dicts and lists.
+
+    This is the same (YAML 1.1) view ansible-playbook gets of the file.
+    """
+    if FastLoader is not None:
+        return yaml.load(source, Loader=FastLoader)
+    return YAML(typ='safe', pure=True).load(source)
+
+def load_file(path: Union[str, Path], default: Any = None) -> Any:
+    """Read a YAML file with load(); returns default if it is missing or empty."""
+    try:
+        with open(path, 'rb') as f:
+            data = load(f)
+    except FileNotFoundError:
+        return default
+    return default if data is None else data
+
+def round_trip() -> "YAML":
+    """ruamel.yaml instance for comment and quote preserving edits."""
+    rt = YAML()
+    rt.preserve_quotes = True
+    return rt
+
+def load_round_trip(source: Union[str, io.IOBase]) -> CommentedMap:
+    """Parse YAML into a round-trip document that can be changed and dumped back."""
+    return round_trip().load(source) or CommentedMap()
+
+def dump_round_trip(data: Any, stream: io.IOBase):
+    """Write a round-trip document, keeping its comments, quoting and key order."""
+    round_trip().dump(data, stream)
+
+def dumps_round_trip(data: Any) -> str:
+    buffer = io.StringIO()
+    dump_round_trip(data, buffer)
+    return buffer.getvalue()
@@ -6,7 +6,6 @@ Main entry point that ties together the sudo handler and UI
 
 import os
 import sys
-import yaml
 import argparse
 from pathlib import Path
 
@@ -15,8 +14,8 @@ from pathlib import Path
 script_dir = os.path.dirname(os.path.abspath(__file__))
 os.chdir(script_dir)
 
-# Import config_manager early to use its template rendering
-from ui.config_manager import ConfigManager
+# Import the config session early to use its template rendering
+from ui.config_session import ConfigSession
 from ui.debug_manager import DebugManager
 
 # Import the UI module from the modular structure
@@ -59,43 +58,24 @@ Examples:
     
     return parser.parse_args()
 
-def ensure_local_config_exists():
-    """Ensure local.yml exists before starting the application"""
-    # Use config_manager to create the initial config
-    config_manager = ConfigManager()
+def create_config_session(force_debug=False):
+    """Build the startup config session (creates local.yml from the template if needed)"""
+    session = ConfigSession(force_debug=force_debug)
     
-    # This will create local.yml if it doesn't exist
-    initial_config = config_manager.load_config()
-    
-    # Create debug manager
-    debug_manager = DebugManager(initial_config)
-    debug_manager.print("Ensuring local.yml exists")
-    debug_manager.print("Initial config ensured")
-
-def load_initial_config(force_debug=False):
-    """Load initial configuration from local.yml"""
-    # Use config_manager to load the config
-    config_manager = ConfigManager()
-    
-    # Load the config (this will also create it if needed)
-    config = config_manager.load_config()
-    
-    # Override debug setting if --debug was specified
-    if force_debug:
-        config['settings']['debug'] = 1
-        config['local_config']['debug'] = 1
+    # Loads local.yml and gui_config.json once; everything after startup reuses this config
+    config = session.config
     
     # Create debug manager
     debug_manager = DebugManager(config)
     debug_manager.print("Load initial configuration")
-    debug_manager.log_variable("working_directory", config['settings']['working_directory'])
+    debug_manager.log_variable("working_directory", session.settings.working_directory)
     
-    return config
+    return session
 
 class CrimsonCFGApplication(Gtk.Application):
-    def __init__(self, initial_config):
+    def __init__(self, session):
         # Create debug manager
-        self.debug_manager = DebugManager(initial_config)
+        self.debug_manager = DebugManager(session.config)
         
         self.debug_manager.print("Initializing Application...")
         Gtk.Application.__init__(
@@ -103,7 +83,7 @@ class CrimsonCFGApplication(Gtk.Application):
             application_id="com.crimson.cfg",
             flags=Gio.ApplicationFlags.FLAGS_NONE
         )
-        self.initial_config = initial_config
+        self.session = session
         self.debug_manager.print("Application initialized")
         # Note: Gtk.Application does not support set_icon_name or set_icon_from_file.
         # The icon must be set on the main window (Gtk.ApplicationWindow) for dock/taskbar icon.
@@ -124,7 +104,7 @@ class CrimsonCFGApplication(Gtk.Application):
         self.debug_manager.log_application_lifecycle("do_activate")
         try:
             self.debug_manager.print("Creating GUI...")
-            self.main_ui = CrimsonCFGGUI(self, self.initial_config)
+            self.main_ui = CrimsonCFGGUI(self, self.session)
             self.debug_manager.print("GUI created successfully")
             self.debug_manager.print("Presenting window...")
             self.main_ui.window.present()
@@ -158,22 +138,19 @@ def main():
         # Parse command line arguments
         args = parse_arguments()
         
-        # 1. Create local.yml first using config_manager
-        ensure_local_config_exists()
-        
-        # 2. Load initial config using config_manager
-        initial_config = load_initial_config(force_debug=args.debug)
+        # 1. Create local.yml if needed and load the config once for the whole session
+        session = create_config_session(force_debug=args.debug)
         
         # Create debug manager
-        debug_manager = DebugManager(initial_config)
+        debug_manager = DebugManager(session.config)
         debug_manager.log_application_lifecycle("main")
         
         # Log command line arguments if debug is enabled
         if args.debug:
             debug_manager.print("Debug mode enabled via command line argument")
         
-        # 3. Start application with config
-        app = CrimsonCFGApplication(initial_config)
+        # 2. Start application with the config session
+        app = CrimsonCFGApplication(session)
         debug_manager.print("CrimsonCFGApplication created")
         debug_manager.print("Starting GTK application...")
         # Check if we're running in a headless environment
@@ -4,10 +4,9 @@ AdminTab: Encapsulates the Administration tab UI and logic for CrimsonCFG
 """
 from gi.repository import Gtk, GLib
 import getpass
-import yaml
 import os
 from pathlib import Path
-from ruamel.yaml import YAML
+from .local_config_store import get_local_config_store
 
 class AdminTab(Gtk.Box):
     def __init__(self, main_window):
@@ -31,14 +30,8 @@ class AdminTab(Gtk.Box):
         def show_admin_content():
             for child in self.get_children():
                 self.remove(child)
-            local_config = {}
-            config_dir = Path.home() / ".config/com.crimson.cfg"
-            local_file = config_dir / "local.yml"
-            if local_file.exists():
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'r') as f:
-                    local_config = yaml_ruamel.load(f) or {}
+            store = get_local_config_store()
+            settings = self.main_window.settings
             admin_notebook = Gtk.Notebook()
             self.pack_start(admin_notebook, True, True, 0)
             # --- Default Apps Tab (APT) ---
@@ -50,7 +43,7 @@ class AdminTab(Gtk.Box):
             apt_label = Gtk.Label(label="APT Packages:")
             default_apps_box.pack_start(apt_label, False, False, 0)
             apt_store = Gtk.ListStore(str)
-            for pkg in local_config.get('apt_packages', []):
+            for pkg in settings.apt_packages:
                 apt_store.append([pkg])
             apt_view = Gtk.TreeView(model=apt_store)
             renderer = Gtk.CellRendererText()
@@ -83,14 +76,7 @@ class AdminTab(Gtk.Box):
                 for row in apt_store:
                     if row[0].strip():  # Only add non-empty packages
                         apt_packages.append(row[0].strip())
-                local_config['apt_packages'] = apt_packages
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
-                # Refresh playbook list to update requirement status
-                if hasattr(self.main_window, 'playbook_manager'):
-                    self.main_window.playbook_manager.update_playbook_list()
+                store.set('apt_packages', apt_packages)
             save_apt_btn.connect("clicked", on_save_apt)
             default_apps_box.pack_start(save_apt_btn, False, False, 0)
             admin_notebook.append_page(default_apps_box, Gtk.Label(label="APT Packages"))
@@ -106,34 +92,29 @@ class AdminTab(Gtk.Box):
             # App Title
             title_label = Gtk.Label(label="App Title:")
             title_entry = Gtk.Entry()
-            title_entry.set_text(local_config.get('app_name', 'CrimsonCFG'))
+            title_entry.set_text(settings.branding.app_name)
             ci_box.pack_start(title_label, False, False, 0)
             ci_box.pack_start(title_entry, False, False, 0)
             # App Subtitle
             subtitle_label = Gtk.Label(label="App Subtitle:")
             subtitle_entry = Gtk.Entry()
-            subtitle_entry.set_text(local_config.get('app_subtitle', 'System Configuration Manager'))
+            subtitle_entry.set_text(settings.branding.app_subtitle)
             ci_box.pack_start(subtitle_label, False, False, 0)
             ci_box.pack_start(subtitle_entry, False, False, 0)
             # App Logo
             logo_label = Gtk.Label(label="App Logo:")
             logo_chooser = Gtk.FileChooserButton(title="Select App Logo", action=Gtk.FileChooserAction.OPEN)
-            logo_chooser.set_filename(local_config.get('app_logo', ''))
+            logo_chooser.set_filename(settings.branding.app_logo)
             ci_box.pack_start(logo_label, False, False, 0)
             ci_box.pack_start(logo_chooser, False, False, 0)
             # Save Button
             save_btn = Gtk.Button(label="Save Corporate Identity")
             def on_save_ci(btn):
-                local_config['app_name'] = title_entry.get_text()
-                local_config['app_subtitle'] = subtitle_entry.get_text()
-                local_config['app_logo'] = logo_chooser.get_filename() or ''
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
-                # Refresh playbook list to update requirement status
-                if hasattr(self.main_window, 'playbook_manager'):
-                    self.main_window.playbook_manager.update_playbook_list()
+                store.update({
+                    'app_name': title_entry.get_text(),
+                    'app_subtitle': subtitle_entry.get_text(),
+                    'app_logo': logo_chooser.get_filename() or ''
+                })
             save_btn.connect("clicked", on_save_ci)
             ci_box.pack_start(save_btn, False, False, 0)
             admin_notebook.append_page(ci_box, Gtk.Label(label="Corporate Identity"))
@@ -154,7 +135,7 @@ class AdminTab(Gtk.Box):
             
             current_password_entry = Gtk.Entry()
             current_password_entry.set_visibility(False)
-            current_password_entry.set_text(local_config.get('admin_password', ''))
+            current_password_entry.set_text(settings.admin_password)
             current_password_entry.set_editable(False)
             current_password_entry.set_can_focus(False)
             password_box.pack_start(current_password_entry, False, False, 0)
@@ -200,11 +181,7 @@ class AdminTab(Gtk.Box):
                     return
                 
                 # Update local.yml with new password
-                local_config['admin_password'] = new_password
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
+                store.set('admin_password', new_password)
                 
                 # Update the current password display
                 current_password_entry.set_text(new_password)
@@ -236,7 +213,7 @@ class AdminTab(Gtk.Box):
             external_repo_box.pack_start(repo_url_label, False, False, 0)
             
             repo_url_entry = Gtk.Entry()
-            repo_url_entry.set_text(local_config.get('external_playbook_repo_url', ''))
+            repo_url_entry.set_text(settings.external_playbook_repo_url)
             repo_url_entry.set_placeholder_text("https://github.com/crimsonclyde/CrimsonCFG-Playbooks.git")
             repo_url_entry.set_tooltip_text("ℹ️ Enter the URL of your external playbook repository (e.g., https://github.com/username/repo.git)")
             external_repo_box.pack_start(repo_url_entry, False, False, 0)
@@ -250,12 +227,6 @@ class AdminTab(Gtk.Box):
             save_repo_btn.set_tooltip_text("ℹ️ Save the repository URL and clone the external repository")
             def on_save_repo(btn):
                 repo_url = repo_url_entry.get_text().strip()
-                local_config['external_playbook_repo_url'] = repo_url
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
-                
                 # Update external repository using authenticated sudo password
                 from . import external_repo_manager
                 external_repo_manager.set_external_repo_url(repo_url)
@@ -282,10 +253,19 @@ class AdminTab(Gtk.Box):
                     sudo_password = getattr(self.main_window, 'sudo_password', None)
                     external_repo_manager.update_external_repo_sync(sudo_password, self.main_window.logger)
                     
-                    # Regenerate config and update playbook list
-                    self.main_window.config_manager.regenerate_gui_config()
-                    self.main_window.config = self.main_window.config_manager.load_config()
+                    # Update config from the repo delta and refresh playbook list
+                    config = self.main_window.config_manager.regenerate_gui_config(
+                        external_changes=external_repo_manager.get_last_sync_changes())
+                    if config is not None:
+                        self.main_window.config = config
+                    # The sync may have added or removed required templates and files
+                    self.main_window.playbook_manager.refresh_requirement_files(update_list=False)
+                    if not self.main_window.config_manager.catalog_changed():
+                        self.main_window.update_playbook_list()
+                        repo_status_label.set_text("Playbooks are already up to date.")
+                        return
                     self.main_window.update_playbook_list()
+                    self.main_window.playbook_manager.start_validation()
                     repo_status_label.set_text("Playbooks refreshed successfully!")
                 except Exception as e:
                     repo_status_label.set_text(f"Error refreshing playbooks: {e}")
@@ -311,7 +291,7 @@ class AdminTab(Gtk.Box):
             landscape_box.pack_start(reg_key_label, False, False, 0)
             
             reg_key_entry = Gtk.Entry()
-            reg_key_entry.set_text(local_config.get('landscape_registration_key', ''))
+            reg_key_entry.set_text(settings.landscape_registration_key)
             reg_key_entry.set_placeholder_text("YOUR-REGISTRATION-KEY")
             reg_key_entry.set_tooltip_text("ℹ️ Enter your Ubuntu Landscape registration key")
             landscape_box.pack_start(reg_key_entry, False, False, 0)
@@ -322,7 +302,7 @@ class AdminTab(Gtk.Box):
             landscape_box.pack_start(account_name_label, False, False, 0)
             
             account_name_entry = Gtk.Entry()
-            account_name_entry.set_text(local_config.get('landscape_account_name', 'standalone'))
+            account_name_entry.set_text(settings.landscape_account_name)
             account_name_entry.set_placeholder_text("standalone")
             account_name_entry.set_tooltip_text("ℹ️ Enter your Landscape account name (default: standalone)")
             landscape_box.pack_start(account_name_entry, False, False, 0)
@@ -333,7 +313,7 @@ class AdminTab(Gtk.Box):
             landscape_box.pack_start(ping_url_label, False, False, 0)
             
             ping_url_entry = Gtk.Entry()
-            ping_url_entry.set_text(local_config.get('landscape_ping_url', 'https://landscape.canonical.com/ping'))
+            ping_url_entry.set_text(settings.landscape_ping_url)
             ping_url_entry.set_placeholder_text("https://landscape.canonical.com/ping")
             ping_url_entry.set_tooltip_text("ℹ️ Enter the Landscape ping URL (default: https://landscape.canonical.com/ping)")
             landscape_box.pack_start(ping_url_entry, False, False, 0)
@@ -351,22 +331,14 @@ class AdminTab(Gtk.Box):
                 ping_url = ping_url_entry.get_text().strip()
                 
                 # Update local config with Landscape settings
-                local_config['landscape_registration_key'] = reg_key
-                local_config['landscape_account_name'] = account_name or 'standalone'
-                local_config['landscape_ping_url'] = ping_url or 'https://landscape.canonical.com/ping'
-                
-                # Use proper config manager to save
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
+                store.update({
+                    'landscape_registration_key': reg_key,
+                    'landscape_account_name': account_name or 'standalone',
+                    'landscape_ping_url': ping_url or 'https://landscape.canonical.com/ping'
+                })
                 
                 landscape_status_label.set_text("Landscape configuration saved successfully!")
                 
-                # Refresh playbook list to update requirement status
-                if hasattr(self.main_window, 'playbook_manager'):
-                    self.main_window.playbook_manager.update_playbook_list()
-                
             save_landscape_btn.connect("clicked", on_save_landscape)
             landscape_box.pack_start(save_landscape_btn, False, False, 0)
             
@@ -394,18 +366,14 @@ class AdminTab(Gtk.Box):
             wd_label = Gtk.Label(label="Working Directory (user override, see docs):")
             wd_label.set_xalign(0)
             wd_entry = Gtk.Entry()
-            wd_entry.set_text(local_config.get('working_directory', '/opt/CrimsonCFG'))
+            wd_entry.set_text(settings.working_directory)
             
             # Add changed signal to save working directory instantly
             def on_wd_changed(widget):
                 new_wd = widget.get_text()
                 if self.main_window.debug:
                     print(f"AdminTab: Working directory changed to: '{new_wd}'")
-                local_config['working_directory'] = new_wd
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
+                store.set('working_directory', new_wd)
             wd_entry.connect("changed", on_wd_changed)
             
             working_dir_box.pack_start(wd_label, False, False, 0)
@@ -471,7 +439,16 @@ class AdminTab(Gtk.Box):
                     os.system(f"xdg-open '{local_file}'")
             edit_local_btn.connect("clicked", on_edit_local_settings)
             buttons_grid.attach(edit_local_btn, 2, 0, 1, 1)
-            
+
+            # Clear fact cache button
+            clear_facts_btn = Gtk.Button(label="Clear Fact Cache")
+            clear_facts_btn.set_tooltip_text("ℹ️ Forget cached Ansible facts; the next playbook gathers them again")
+            def on_clear_fact_cache(btn):
+                removed = self.main_window.installer.clear_fact_cache("cleared from the Admin tab")
+                self.main_window.logger.log_message(f"Fact cache cleared ({removed} host(s))")
+            clear_facts_btn.connect("clicked", on_clear_fact_cache)
+            buttons_grid.attach(clear_facts_btn, 0, 1, 1, 1)
+
             app_management_box.pack_start(buttons_grid, False, False, 0)
             app_management_frame.add(app_management_box)
             application_box.pack_start(app_management_frame, False, False, 0)
@@ -705,15 +682,7 @@ class AdminTab(Gtk.Box):
             prompt_box.pack_start(status_label, False, False, 0)
             btn = Gtk.Button(label="Unlock")
             def on_unlock(_btn=None):
-                config_dir = Path.home() / ".config/com.crimson.cfg"
-                local_file = config_dir / "local.yml"
-                admin_password = None
-                if local_file.exists():
-                    yaml_ruamel = YAML()
-                    yaml_ruamel.preserve_quotes = True
-                    with open(local_file, 'r') as f:
-                        local_config = yaml_ruamel.load(f) or {}
-                        admin_password = local_config.get('admin_password', None)
+                admin_password = get_local_config_store().get('admin_password', None)
                 if entry.get_text() == (admin_password or ""):
                     self._admin_authenticated = True
                     show_admin_content()
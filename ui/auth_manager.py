@@ -9,12 +9,11 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GdkPixbuf, Gdk  # type: ignore
 import os
 import subprocess
-import yaml
 from pathlib import Path
 import threading
 import secrets
 import string
-from ruamel.yaml import YAML
+from .local_config_store import get_local_config_store
 
 class AuthManager:
     def __init__(self, main_window, on_success=None):
@@ -28,38 +27,30 @@ class AuthManager:
             print("check_and_create_admin_password: Starting...")
             
         # Load local.yml
-        config_dir = Path.home() / ".config/com.crimson.cfg"
-        local_file = config_dir / "local.yml"
+        store = get_local_config_store()
         
-        if not local_file.exists():
+        if not store.exists():
             if self.debug:
                 print("check_and_create_admin_password: local.yml does not exist")
             return False
             
         try:
-            # Use ruamel.yaml to preserve comments and formatting
-            yaml_ruamel = YAML()
-            yaml_ruamel.preserve_quotes = True
-            
-            with open(local_file, 'r') as f:
-                local_config = yaml_ruamel.load(f) or {}
-                
-            admin_password = local_config.get('admin_password', '')
-            
-            # Check if admin_password is set and not the default
-            if not admin_password or admin_password == '3HeaddedMonkey':
+            new_password = None
+
+            def create_password(local_config):
+                nonlocal new_password
+                admin_password = local_config.get('admin_password', '')
+                # Check if admin_password is set and not the default
+                if admin_password and admin_password != '3HeaddedMonkey':
+                    return None
                 if self.debug:
                     print("check_and_create_admin_password: Admin password not set or is default, creating new one")
-                
                 # Generate a secure password
                 new_password = self._generate_secure_password()
-                
-                # Update local.yml with new password, preserving existing configuration
-                local_config['admin_password'] = new_password
-                
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(local_config, f)
-                
+                return {'admin_password': new_password}
+
+            # Compare-and-swap: if another writer set a password meanwhile, re-check instead of overwriting it
+            if store.modify(create_password):
                 if self.debug:
                     print("check_and_create_admin_password: New admin password saved to local.yml")
                 
@@ -223,23 +214,10 @@ class AuthManager:
         title_box.set_valign(Gtk.Align.CENTER)
         
         # Main title - CrimsonCFG
-        try:
-            # Load local.yml
-            local_config = {}
-            config_dir = Path.home() / ".config/com.crimson.cfg"
-            local_file = config_dir / "local.yml"
-            if local_file.exists():
-                with open(local_file, 'r') as f:
-                    local_config = yaml.safe_load(f) or {}
-            
-            # Use only local_config
-            app_name = local_config.get('app_name', 'CrimsonCFG')
-            app_subtitle = local_config.get('app_subtitle', 'System Configuration Manager')
-            app_logo = local_config.get('app_logo', os.path.join("files", "app", "com.crimson.cfg.icon.png"))
-        except Exception:
-            app_name = 'CrimsonCFG'
-            app_subtitle = 'System Configuration Manager'
-            app_logo = os.path.join("files", "app", "com.crimson.cfg.icon.png")
+        branding = self.main_window.settings.branding
+        app_name = branding.app_name
+        app_subtitle = branding.app_subtitle
+        app_logo = branding.app_logo or os.path.join("files", "app", "com.crimson.cfg.icon.png")
         title_label = Gtk.Label()
         title_label.set_markup(f"<span size='x-large' weight='bold'>{app_name}</span>")
         title_label.set_halign(Gtk.Align.START)
@@ -416,9 +394,15 @@ class AuthManager:
                     self.status_label.set_text("Password validated successfully!")
                     self.main_window.window.queue_draw()
                     self.main_window.sudo_password = password
-                    # Regenerate GUI config from playbooks
-                    self.main_window.config_manager.regenerate_gui_config()
-                    self.main_window.config = self.main_window.config_manager.load_config()
+                    if self.main_window.config_manager.has_gui_config():
+                        # Regenerate GUI config from playbooks
+                        # Keeps the startup session config if the catalog could not be regenerated
+                        config = self.main_window.config_manager.regenerate_gui_config()
+                        if config is not None:
+                            self.main_window.config = config
+                    else:
+                        # First run: show the interface right away and stream the catalog into it
+                        self.main_window.stream_catalog_on_start = True
                     # Transition to main interface
                     if self.debug:
                         print("Transitioning to main interface...")
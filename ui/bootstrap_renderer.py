@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Bootstrap Renderer
+Renders templates/local.yml.j2 into the user's first local.yml
+"""
+
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from .template_resolver import TemplateResolver
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+LOCAL_CONFIG_TEMPLATE = "local.yml.j2"
+BYTECODE_CACHE_DIR = Path.home() / ".cache/com.crimson.cfg/jinja2"
+
+class BootstrapRenderer:
+    """The one code path that creates local.yml from its template.
+
+    The jinja2 Environment is built once and keeps compiled templates in
+    memory and as bytecode under ~/.cache, and the render context (user,
+    paths, git identity) is computed once per process: `git config` runs a
+    single time instead of once per key and render.
+    """
+
+    def __init__(self, templates_dir: Path = TEMPLATES_DIR, debug: bool = False):
+        self.templates_dir = Path(templates_dir)
+        self.debug = debug
+        self._environment = None
+        self._context = None
+        self._lock = threading.Lock()
+
+    @property
+    def environment(self) -> Environment:
+        if self._environment is None:
+            bytecode_cache = None
+            try:
+                BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR))
+            except OSError as e:
+                print(f"BootstrapRenderer: No bytecode cache ({e})")
+            self._environment = Environment(
+                loader=FileSystemLoader(str(self.templates_dir)),
+                bytecode_cache=bytecode_cache,
+                keep_trailing_newline=True,
+            )
+        return self._environment
+
+    @staticmethod
+    def _git_identity() -> Dict[str, str]:
+        """user.name and user.email from the global git config, in one call."""
+        try:
+            output = subprocess.check_output(
+                ["git", "config", "--global", "--get-regexp", r"^user\.(name|email)$"],
+                stderr=subprocess.DEVNULL, text=True)
+        except Exception:
+            return {}
+        identity = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(" ")
+            if value.strip():
+                identity[key] = value.strip()
+        return identity
+
+    def context(self) -> Dict[str, str]:
+        """Variables the template is rendered with (same defaults the TemplateResolver uses)."""
+        with self._lock:
+            if self._context is None:
+                identity = self._git_identity()
+                overrides = {}
+                if identity.get("user.name"):
+                    overrides["git_username"] = identity["user.name"]
+                if identity.get("user.email"):
+                    overrides["git_email"] = identity["user.email"]
+                resolver = TemplateResolver()
+                resolver.compile(overrides)
+                self._context = dict(resolver.variables)
+                if self.debug:
+                    print(f"BootstrapRenderer: Render context {sorted(self._context)}")
+            return self._context
+
+    def render(self, name: str = LOCAL_CONFIG_TEMPLATE) -> str:
+        return self.environment.get_template(name).render(**self.context())
+
+    def ensure_local_config(self, store) -> bool:
+        """Create local.yml from the template if it doesn't exist; False if there is no template."""
+        if store.exists():
+            return True
+        if not (self.templates_dir / LOCAL_CONFIG_TEMPLATE).exists():
+            return False
+        if store.create(self.render()) and self.debug:
+            print(f"BootstrapRenderer: Created {store.path} from {LOCAL_CONFIG_TEMPLATE}")
+        return True
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+def get_bootstrap_renderer() -> BootstrapRenderer:
+    """Return the process-wide BootstrapRenderer."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = BootstrapRenderer()
+        return _renderer
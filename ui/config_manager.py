@@ -5,19 +5,22 @@ Handles loading and managing configuration files
 """
 
 import json
-from ruamel.yaml import YAML
 import getpass
 from pathlib import Path
 from typing import Dict
 import shutil
 import os
-from jinja2 import Template
 from . import external_repo_manager
 from .debug_manager import DebugManager
+from .local_config_store import get_local_config_store
+from .template_resolver import TemplateResolver
+from .bootstrap_renderer import get_bootstrap_renderer, LOCAL_CONFIG_TEMPLATE
+from .settings import Settings
 
 # Import the playbook scanner
 try:
     from functions.playbook_scanner import PlaybookScanner  # type: ignore
+    from functions.playbook_catalog import PlaybookCatalog, CatalogCategories, CATALOG_FILENAME  # type: ignore
     # Note: DebugManager not available yet during import, so we'll log this later
     _playbook_scanner_imported = True
 except ImportError as e:
@@ -25,14 +28,17 @@ except ImportError as e:
     _playbook_scanner_imported = False
     _playbook_scanner_error = str(e)
     PlaybookScanner = None
+    PlaybookCatalog = None
 
 class ConfigManager:
     def __init__(self):
         self.debug_manager = DebugManager()
-        self.yaml = YAML()
-        self.yaml.preserve_quotes = True
-        self.yaml.indent(mapping=2, sequence=4, offset=2)
         self.debug = False  # Debug flag that can be set externally
+        self.catalog_backend = "json"  # "json" or "sqlite", from local.yml catalog_backend
+        self._catalog = None
+        self.last_summary = None  # CatalogSummary of the last regenerate_gui_config()
+        self._categories_cache = None  # (stat stamp of gui_config.json, categories)
+        self.resolver = TemplateResolver()  # The one place {{ variable }} substitution happens
         
     def load_config(self) -> Dict:
         """Load configuration from YAML files"""
@@ -46,45 +52,23 @@ class ConfigManager:
             self.debug_manager.log_file_operation("created directory", str(config_dir))
         
         if not local_file.exists():
-            # Load template and render with variables
-            template_file = Path("templates/local.yml.j2")
-            if template_file.exists():
-                with open(template_file, 'r') as f:
-                    template_content = f.read()
-                
-                # Prepare context with resolved values - use environment variables or defaults
-                context = {
-                    "system_user": getpass.getuser(),
-                    "user_home": os.path.expanduser("~"),
-                    "git_username": self.get_git_config_value("user.name") or os.environ.get("GIT_USERNAME", getpass.getuser()),
-                    "git_email": self.get_git_config_value("user.email") or os.environ.get("GIT_EMAIL", "user@example.com"),
-                    "working_directory": os.environ.get("CRIMSON_WORKING_DIR", "/opt/CrimsonCFG"),
-                    "appimg_directory": f"/home/{getpass.getuser()}/AppImages",
-                    "app_directory": os.environ.get("CRIMSON_APP_DIR", "/opt/CrimsonCFG/app")
-                }
-                
-                # Render template
-                template = Template(template_content)
-                rendered = template.render(**context)
-                
-                # Save as local.yml
-                with open(local_file, 'w') as f:
-                    f.write(rendered)
-                
+            # First run: render the template through the shared bootstrap renderer
+            renderer = get_bootstrap_renderer()
+            renderer.debug = self.debug
+            template_file = renderer.templates_dir / LOCAL_CONFIG_TEMPLATE
+            if renderer.ensure_local_config(get_local_config_store()):
                 self.debug_manager.log_template_rendering(str(template_file), True)
                 self.debug_manager.log_file_operation("created", str(local_file), True)
             else:
-                # Fallback to empty config if template doesn't exist
-                initial_local_config = {}
                 self.debug_manager.log_template_rendering(str(template_file), False)
         
         # local.yml should now exist
         if local_file.exists():
-            with open(local_file, 'r') as f:
-                local_config = self.yaml.load(f) or {}
+            store = get_local_config_store()
+            local_config = store.load()
             
             # Process the loaded configuration to resolve any remaining template variables
-            local_config = self._process_config_variables(local_config)
+            local_config = self._process_config_variables(local_config, store.digest)
             self.debug_manager.log_config_loading(str(local_file), True)
         else:
             # Fallback if local.yml doesn't exist (shouldn't happen with new startup flow)
@@ -97,21 +81,14 @@ class ConfigManager:
         else:
             self.debug_manager.print_warning(f"App: PlaybookScanner import failed: {_playbook_scanner_error}")
         
-        # Get actual system user
-        system_user = getpass.getuser()
+        # Validate once and fill in defaults; call sites use the typed model
+        model = Settings.from_local_config(local_config, getpass.getuser())
+        self.catalog_backend = model.catalog_backend
         
-        # Convert to expected format - use template variables
         config = {
             "categories": self.load_categories_from_yaml(),
-            "settings": {
-                "default_user": system_user,
-                "working_directory": local_config.get("working_directory", "/opt/CrimsonCFG"),
-                "inventory_file": local_config.get("inventory_file", "/opt/CrimsonCFG/hosts.ini"),
-                "log_directory": local_config.get("log_directory", "/opt/CrimsonCFG/log"),
-                "debug": local_config.get("debug", 0),
-                "git_username": local_config.get("git_username", system_user),
-                "git_email": local_config.get("git_email", f"{system_user}@example.com")
-            },
+            "settings": model.legacy_dict(),
+            "model": model,
             "local_config": local_config  # Include the full local config
         }
         
@@ -120,8 +97,15 @@ class ConfigManager:
         
         return config
             
-    def regenerate_gui_config(self):
-        """Regenerate gui_config.json from playbook metadata, supporting external repo."""
+    def regenerate_gui_config(self, external_changes=None):
+        """Regenerate gui_config.json from playbook metadata, supporting external repo.
+
+        If external_changes is a list of changed external playbook paths (from
+        the last repo sync), only those entries are updated instead of
+        rescanning every playbook. The resulting CatalogSummary is kept in
+        self.last_summary, see catalog_changed().
+        """
+        self.last_summary = None
         try:
             if PlaybookScanner is not None:
                 config_dir = Path.home() / ".config/com.crimson.cfg"
@@ -138,8 +122,14 @@ class ConfigManager:
                         self.debug_manager.print(f"External repo path: {external_repo_path}")
                 
                 # Use the debug setting from the config manager (set by main window)
-                success = PlaybookScanner(debug=self.debug).generate_config(str(user_gui_config), external_repo_path=external_repo_path)
+                scanner = PlaybookScanner(debug=self.debug)
+                catalog_path = self._catalog_path()
+                if external_changes is not None and external_repo_path:
+                    success = scanner.update_config(str(user_gui_config), external_changes, external_repo_path=external_repo_path, catalog_path=catalog_path)
+                else:
+                    success = scanner.generate_config(str(user_gui_config), external_repo_path=external_repo_path, catalog_path=catalog_path)
                 if success:
+                    self.last_summary = scanner.summary
                     # Reload the config
                     return self.load_config()
                 else:
@@ -150,65 +140,92 @@ class ConfigManager:
             self.debug_manager.print_error(f"Error regenerating GUI config: {e}")
         return None
             
+    def catalog_changed(self) -> bool:
+        """Return False only if the last regeneration left the playbook catalog untouched."""
+        return self.last_summary is None or self.last_summary.changed
+
+    def has_gui_config(self) -> bool:
+        """Return True if a generated gui_config.json exists."""
+        return (Path.home() / ".config/com.crimson.cfg" / "gui_config.json").exists()
+
+    def iter_playbooks(self):
+        """Stream PlaybookRecords from all playbook sources as they are scanned."""
+        if PlaybookScanner is None:
+            self.debug_manager.print_warning("PlaybookScanner not available, nothing to stream")
+            return iter(())
+        external_repo_path = None
+        if external_repo_manager.get_external_repo_url():
+            external_repo_path = external_repo_manager.get_external_playbooks_path()
+        manifest_path = Path.home() / ".config/com.crimson.cfg" / "playbook_manifest.json"
+        scanner = PlaybookScanner(external_repo_path=external_repo_path, debug=self.debug, manifest_path=str(manifest_path))
+        return scanner.iter_playbooks()
+
+    def update_gui_config(self, changed_paths):
+        """Apply changed playbook paths to gui_config.json.
+
+        Returns the list of catalog changes (possibly empty), or None if the
+        update failed and a full regeneration is needed.
+        """
+        if PlaybookScanner is None:
+            self.debug_manager.print_warning("PlaybookScanner not available, skipping config update")
+            return None
+        try:
+            user_gui_config = Path.home() / ".config/com.crimson.cfg" / "gui_config.json"
+            external_repo_path = None
+            if external_repo_manager.get_external_repo_url():
+                external_repo_path = external_repo_manager.get_external_playbooks_path()
+            scanner = PlaybookScanner(external_repo_path=external_repo_path, debug=self.debug)
+            if scanner.update_config(str(user_gui_config), changed_paths, catalog_path=self._catalog_path()):
+                return scanner.changes
+        except Exception as e:
+            self.debug_manager.print_error(f"Error updating GUI config: {e}")
+        return None
+
+    def _catalog_path(self):
+        """Return the SQLite catalog path if the sqlite backend is enabled, else None."""
+        if self.catalog_backend != "sqlite" or PlaybookCatalog is None:
+            return None
+        return str(Path.home() / ".config/com.crimson.cfg" / CATALOG_FILENAME)
+
     def load_categories_from_yaml(self) -> Dict:
-        """Load categories from gui_config.json (dynamically generated from playbook metadata)"""
+        """Load categories from gui_config.json (dynamically generated from playbook metadata)
+
+        With the sqlite backend enabled, a lazy view is returned instead that
+        only queries a category's playbooks when it is first accessed.
+        """
         config_dir = Path.home() / ".config/com.crimson.cfg"
         user_gui_config = config_dir / "gui_config.json"
         if not config_dir.exists():
             config_dir.mkdir(parents=True, exist_ok=True)
+        catalog_path = self._catalog_path()
+        if catalog_path and os.path.exists(catalog_path):
+            try:
+                if self._catalog is None:
+                    self._catalog = PlaybookCatalog(catalog_path, self.debug)
+                return CatalogCategories(self._catalog)
+            except Exception as e:
+                self.debug_manager.print_warning(f"Could not open playbook catalog, using gui_config.json: {e}")
         if user_gui_config.exists():
-            with open(user_gui_config, 'r') as f:
-                json_config = json.load(f)
-                return json_config.get("categories", {})
+            try:
+                # gui_config.json is replaced atomically, so an unchanged stat means unchanged content
+                st = user_gui_config.stat()
+                stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+                if self._categories_cache is not None and self._categories_cache[0] == stamp:
+                    return self._categories_cache[1]
+                with open(user_gui_config, 'r') as f:
+                    json_config = json.load(f)
+                categories = json_config.get("categories", {})
+                self._categories_cache = (stamp, categories)
+                return categories
+            except ValueError as e:
+                self.debug_manager.print_warning(f"gui_config.json is unreadable, regenerate playbooks: {e}")
+                return {}
         else:
             # No fallback - if gui_config.json doesn't exist, the app should regenerate it
             # or fail gracefully rather than using outdated config
             return {} 
 
-    def _process_config_variables(self, config: Dict) -> Dict:
-        """Process configuration to resolve any remaining template variables."""
-        import getpass
-        system_user = getpass.getuser()
-        user_home = os.path.expanduser("~")
-        working_directory = "/opt/CrimsonCFG"
-        appimg_directory = f"/home/{system_user}/AppImages"
-        app_directory = f"{working_directory}/app"
-        
-        # Define replacements
-        replacements = {
-            "{{ system_user }}": system_user,
-            "{{ user_home }}": user_home,
-            "{{ working_directory }}": working_directory,
-            "{{ appimg_directory }}": appimg_directory,
-            "{{ app_directory }}": app_directory,
-            "{{ git_username }}": os.environ.get("GIT_USERNAME", system_user),
-            "{{ git_email }}": os.environ.get("GIT_EMAIL", f"{system_user}@example.com")
-        }
-        
-        def process_value(value):
-            """Recursively process values to replace template variables."""
-            if isinstance(value, dict):
-                return {k: process_value(v) for k, v in value.items()}
-            elif isinstance(value, list):
-                return [process_value(v) for v in value]
-            elif isinstance(value, str):
-                result = value
-                for template_var, replacement in replacements.items():
-                    if template_var in result:
-                        result = result.replace(template_var, str(replacement))
-                return result
-            else:
-                return value
-        
-        return process_value(config)
-
-    def get_git_config_value(self, key: str) -> str:
-        """Get a git config --global value for a given key, or None if not set."""
-        import subprocess
-        try:
-            value = subprocess.check_output([
-                "git", "config", "--global", key
-            ], stderr=subprocess.DEVNULL, text=True).strip()
-            return value if value else None
-        except Exception:
-            return None 
\ No newline at end of file
+    def _process_config_variables(self, config: Dict, digest: str = None) -> Dict:
+        """Resolve {{ variable }} references in the local config (see TemplateResolver)."""
+        self.resolver.debug = self.debug
+        return self.resolver.resolve(config, digest)
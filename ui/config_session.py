@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Config Session
+The configuration built once at startup and shared by the application, the window and its managers
+"""
+
+from typing import Dict, Optional
+
+from .config_manager import ConfigManager
+from .settings import Settings
+
+class ConfigSession:
+    """Owns the single ConfigManager and the config dict it produced.
+
+    main.py builds the session before the GTK application starts; the
+    application hands it to CrimsonCFGGUI, which uses its ConfigManager and
+    config instead of loading its own. The config is only rebuilt after
+    invalidate(), i.e. when local.yml or the playbook catalog really changed.
+    """
+
+    def __init__(self, force_debug: bool = False, config_manager: Optional[ConfigManager] = None):
+        self.force_debug = force_debug
+        self.config_manager = config_manager or ConfigManager()
+        self._config = None
+        self.streamed_categories = None  # Catalog a playbook stream is filling; survives reloads
+
+    @property
+    def config(self) -> Dict:
+        """The session config, loaded on first access."""
+        if self._config is None:
+            self.adopt(self.config_manager.load_config())
+        return self._config
+
+    def adopt(self, config: Dict):
+        """Make a config loaded elsewhere (e.g. after regenerating the catalog) the session config."""
+        if self.force_debug:
+            # --debug overrides the local.yml setting for the whole session
+            config['settings']['debug'] = 1
+            config['local_config'] = dict(config['local_config'], debug=1)
+            config['model'] = config['model'].with_debug()
+        if self.streamed_categories is not None:
+            # A local.yml write during first-run discovery must not drop what was streamed so far
+            config['categories'] = self.streamed_categories
+        self.config_manager.debug = config['model'].debug
+        self._config = config
+
+    @property
+    def settings(self) -> Settings:
+        """Typed, immutable settings of the current config; safe to pass to worker threads."""
+        return self.config['model']
+
+    @property
+    def debug(self) -> bool:
+        return self.settings.debug
+
+    def invalidate(self):
+        """Drop the cached config; the next access loads it again."""
+        self._config = None
+
+    def reload(self) -> Dict:
+        """Reload the config after a real change and return it."""
+        self.invalidate()
+        return self.config
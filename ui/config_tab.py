@@ -3,16 +3,19 @@
 ConfigTab: Refactored for new structure and instant/apply/save logic
 """
 from gi.repository import Gtk, Gdk, GLib
-from ruamel.yaml import YAML
+from .local_config_store import get_local_config_store
+from .bootstrap_renderer import get_bootstrap_renderer
 import getpass
 from pathlib import Path
 import os
-import yaml
 import requests
 from gi.repository import GdkPixbuf
 import hashlib
 
 class ConfigTab(Gtk.Box):
+    # Quiet period after the last edit before pending values are written
+    WRITE_DELAY_MS = 500
+
     def __init__(self, main_window):
         super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=15)
         self.main_window = main_window
@@ -24,6 +27,10 @@ class ConfigTab(Gtk.Box):
         self.ssh_key_box = None
         self.ssh_keys_flowbox = None
         
+        # Write-behind state for edits made while typing
+        self._pending_values = {}
+        self._write_source = None
+        
         self._build_tab()
 
     def _apply_gnome_wallpaper(self, wallpaper_path):
@@ -140,7 +147,7 @@ class ConfigTab(Gtk.Box):
             icon.set_tooltip_text("Instantly applied")
             row.pack_start(icon, False, False, 0)
             def on_changed(widget):
-                self._set_config_value(key, widget.get_text())
+                self._queue_config_value(key, widget.get_text())
             entry.connect("changed", on_changed)
             user_tab.pack_start(row, False, False, 0)
         add_instant_row("System User:", "user", getpass.getuser())
@@ -330,10 +337,6 @@ class ConfigTab(Gtk.Box):
                 else:
                     btn.get_style_context().remove_class("selected")
             
-            # Reload config and apply CSS
-            self._reload_main_config()
-            self.main_window.gui_builder.apply_css()
-            
             print(f"Selected background image: {bg_path}")
         
         # Also handle FlowBox selection changes
@@ -410,8 +413,6 @@ class ConfigTab(Gtk.Box):
             if self.main_window.debug:
                 print(f"ConfigTab: Clearing background image")
             self._set_config_value("app_background_image", "")
-            self._reload_main_config()
-            self.main_window.gui_builder.apply_css()
         bg_clear_btn.connect("clicked", on_clear_bg)
         app_tab.pack_start(bg_clear_btn, False, False, 0)
         # Background Color
@@ -433,8 +434,6 @@ class ConfigTab(Gtk.Box):
             if self.main_window.debug:
                 print(f"ConfigTab: Color changed to: '{hex_color}'")
             self._set_config_value("background_color", hex_color)
-            self._reload_main_config()
-            self.main_window.gui_builder.apply_css()
         color_btn.connect("color-set", on_color_set)
         
         app_tab.pack_start(color_label, False, False, 0)
@@ -448,8 +447,6 @@ class ConfigTab(Gtk.Box):
             if self.main_window.debug:
                 print(f"ConfigTab: Resetting color to default")
             self._set_config_value("background_color", "#181a20")
-            self._reload_main_config()
-            self.main_window.gui_builder.apply_css()
         color_reset_btn.connect("clicked", on_reset_color)
         app_tab.pack_start(color_reset_btn, False, False, 0)
 
@@ -480,7 +477,7 @@ class ConfigTab(Gtk.Box):
         browser_tab.pack_start(chromium_label, False, False, 0)
         browser_tab.pack_start(chromium_entry, False, False, 0)
         def on_browser_changed(widget):
-            self._set_config_value("chromium_homepage_url", chromium_entry.get_text())
+            self._queue_config_value("chromium_homepage_url", chromium_entry.get_text())
         chromium_entry.connect("changed", on_browser_changed)
         
         # Chromium Profile 1 Name
@@ -491,7 +488,7 @@ class ConfigTab(Gtk.Box):
         browser_tab.pack_start(profile1_label, False, False, 0)
         browser_tab.pack_start(profile1_entry, False, False, 0)
         def on_profile1_changed(widget):
-            self._set_config_value("chromium_profile1_name", profile1_entry.get_text())
+            self._queue_config_value("chromium_profile1_name", profile1_entry.get_text())
         profile1_entry.connect("changed", on_profile1_changed)
         
         # Configure Chromium Policies (Collapsible)
@@ -1190,95 +1187,51 @@ class ConfigTab(Gtk.Box):
         
         threading.Thread(target=run_auth, daemon=True).start()
 
+    def _ensure_local_config(self, store):
+        """Create local.yml from the template if it does not exist yet; returns False if it can't"""
+        return get_bootstrap_renderer().ensure_local_config(store)
+
     def _get_config_value(self, key, default=None):
-        config_dir = Path.home() / ".config/com.crimson.cfg"
-        local_file = config_dir / "local.yml"
-        if not local_file.exists():
-            # If the file doesn't exist, create it from the template using ruamel.yaml to preserve comments
-            template_path = os.path.join(os.path.dirname(__file__), '../templates/local.yml.j2')
-            if os.path.exists(template_path):
-                from jinja2 import Template
-                with open(template_path, 'r') as f:
-                    template_content = f.read()
-                # Render the template with all required variables
-                template = Template(template_content)
-                context = {
-                    "system_user": getpass.getuser(),
-                    "user_home": os.path.expanduser("~"),
-                    "git_username": os.environ.get("GIT_USERNAME", getpass.getuser()),
-                    "git_email": os.environ.get("GIT_EMAIL", "user@example.com"),
-                    "working_directory": "/opt/CrimsonCFG",
-                    "appimg_directory": f"/home/{getpass.getuser()}/AppImages",
-                    "app_directory": "/opt/CrimsonCFG/app"
-                }
-                rendered = template.render(**context)
-                yaml_ruamel = YAML()
-                yaml_ruamel.preserve_quotes = True
-                template_map = yaml_ruamel.load(rendered)
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(template_map, f)
-            else:
-                return default
-        yaml_ruamel = YAML()
-        yaml_ruamel.preserve_quotes = True
-        with open(local_file, 'r') as f:
-            try:
-                local_config = yaml_ruamel.load(f) or {}
-            except Exception:
-                return default
-        return local_config.get(key, default)
+        if key in self._pending_values:
+            return self._pending_values[key]
+        store = get_local_config_store()
+        if not self._ensure_local_config(store):
+            return default
+        # Served from the shared in-memory copy; local.yml is only parsed when it changed
+        return store.get(key, default)
 
     def _set_config_value(self, key, value):
+        """Write a value right away (together with any pending edits)"""
         if self.main_window.debug:
             print(f"ConfigTab: _set_config_value called with key='{key}', value='{value}'")
-        config_dir = Path.home() / ".config/com.crimson.cfg"
-        local_file = config_dir / "local.yml"
-        yaml_ruamel = YAML()
-        yaml_ruamel.preserve_quotes = True
-        # If the file doesn't exist, create it from the template using ruamel.yaml
-        if not local_file.exists():
-            if self.main_window.debug:
-                print(f"ConfigTab: Creating local.yml from template")
-            template_path = os.path.join(os.path.dirname(__file__), '../templates/local.yml.j2')
-            if os.path.exists(template_path):
-                from jinja2 import Template
-                with open(template_path, 'r') as f:
-                    template_content = f.read()
-                template = Template(template_content)
-                context = {
-                    "system_user": getpass.getuser(),
-                    "user_home": os.path.expanduser("~"),
-                    "git_username": os.environ.get("GIT_USERNAME", getpass.getuser()),
-                    "git_email": os.environ.get("GIT_EMAIL", "user@example.com"),
-                    "working_directory": "/opt/CrimsonCFG",
-                    "appimg_directory": f"/home/{getpass.getuser()}/AppImages",
-                    "app_directory": "/opt/CrimsonCFG/app"
-                }
-                rendered = template.render(**context)
-                template_map = yaml_ruamel.load(rendered)
-                with open(local_file, 'w') as f:
-                    yaml_ruamel.dump(template_map, f)
-            else:
-                local_config = yaml_ruamel.load('{}')
-        # Now always load as CommentedMap
-        with open(local_file, 'r') as f:
-            try:
-                local_config = yaml_ruamel.load(f) or yaml_ruamel.load('{}')
-            except Exception as e:
-                if self.main_window.debug:
-                    print(f"ConfigTab: Error loading local.yml: {e}")
-                local_config = yaml_ruamel.load('{}')
-        local_config[key] = value
-        if self.main_window.debug:
-            print(f"ConfigTab: Writing to {local_file}")
-        with open(local_file, 'w') as f:
-            yaml_ruamel.dump(local_config, f)
+        self._pending_values[key] = value
+        self.flush_config_values()
+
+    def _queue_config_value(self, key, value):
+        """Remember an edit and write it once typing has paused for WRITE_DELAY_MS"""
+        self._pending_values[key] = value
+        if self._write_source is not None:
+            GLib.source_remove(self._write_source)
+        self._write_source = GLib.timeout_add(self.WRITE_DELAY_MS, self.flush_config_values)
+
+    def flush_config_values(self):
+        """Write all pending edits to local.yml in one atomic write.
+
+        The store then notifies the subscribers of the keys that actually
+        changed (window style, playbook requirements, session config).
+        """
+        if self._write_source is not None:
+            GLib.source_remove(self._write_source)
+            self._write_source = None
+        if not self._pending_values:
+            return False
+        values, self._pending_values = self._pending_values, {}
+        store = get_local_config_store()
+        self._ensure_local_config(store)
         if self.main_window.debug:
-            print(f"ConfigTab: Successfully wrote to local.yml")
-        self._reload_main_config()
-        # Refresh playbook list to update requirement status
-        if hasattr(self.main_window, 'playbook_manager'):
-            self.main_window.playbook_manager.update_playbook_list()
+            print(f"ConfigTab: Writing {sorted(values)} to {store.path}")
+        store.update(values)
+        return False
 
     def _get_chromium_policies_content(self):
         """Load the current chromium policies template content"""
@@ -1349,12 +1302,11 @@ class ConfigTab(Gtk.Box):
             dialog.destroy()
 
     def _reload_main_config(self):
-        self.main_window.config = self.main_window.config_manager.load_config()
-        self.main_window.user = self.main_window.config.get("settings", {}).get("default_user", "user")
-        self.main_window.user_home = f"/home/{self.main_window.user}"
-        self.main_window.working_directory = self.main_window.config.get("settings", {}).get("working_directory", f"{self.main_window.user_home}/CrimsonCFG")
-        if "{{ user_home }}" in self.main_window.working_directory:
-            self.main_window.working_directory = self.main_window.working_directory.replace("{{ user_home }}", self.main_window.user_home)
+        self.main_window.session.reload()
+        settings = self.main_window.settings
+        self.main_window.user = settings.system_user
+        self.main_window.user_home = settings.user_home
+        self.main_window.working_directory = settings.working_directory
         self.main_window.inventory_file = f"{self.main_window.working_directory}/hosts.ini"
 
     def on_create_ssh_key_clicked(self, button):
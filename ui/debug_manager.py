@@ -36,16 +36,8 @@ class DebugManager:
     def _load_debug_from_file(self):
         """Load debug setting from local.yml file"""
         try:
-            import yaml
-            config_dir = Path.home() / ".config/com.crimson.cfg"
-            local_file = config_dir / "local.yml"
-            
-            if local_file.exists():
-                with open(local_file, 'r') as f:
-                    local_config = yaml.safe_load(f) or {}
-                    self.debug = local_config.get("debug", 0) == 1
-            else:
-                self.debug = False
+            from .local_config_store import get_local_config_store
+            self.debug = get_local_config_store().get("debug", 0) == 1
         except Exception:
             self.debug = False
     
@@ -225,10 +217,10 @@ class DebugManager:
                 print(f"App: DEBUG - GTK version check failed: {e}")
             
             try:
-                import yaml
-                print(f"App: DEBUG - PyYAML available: {yaml.__version__}")
+                from functions import yaml_io
+                print(f"App: DEBUG - YAML read backend: {yaml_io.fast_backend()}")
             except Exception as e:
-                print(f"App: DEBUG - PyYAML version check failed: {e}")
+                print(f"App: DEBUG - YAML backend check failed: {e}")
     
     def log_startup_sequence(self):
         """Log startup sequence if debug is enabled"""
@@ -2,36 +2,57 @@ import os
 import threading
 import subprocess
 import getpass
-from ruamel.yaml import YAML
+from .local_config_store import get_local_config_store
 
 CONFIG_DIR = os.path.expanduser(os.path.join(os.path.expanduser("~"), ".config/com.crimson.cfg"))
 LOCAL_YML_PATH = os.path.join(CONFIG_DIR, "local.yml")
 EXTERNAL_REPO_DIR = "/opt/CrimsonCFG/external_src"
 
+# Result of the most recent sync: None means "unknown, rescan everything",
+# otherwise a list of absolute playbook paths changed between the old and new HEAD
+_last_sync_changes = None
+
 def get_local_yml_path():
     return LOCAL_YML_PATH
 
 def get_external_repo_url():
     """Get the external playbook repo URL from local.yml."""
-    yaml = YAML()
     try:
-        with open(LOCAL_YML_PATH, 'r') as f:
-            config = yaml.load(f) or {}
-        return config.get('external_playbook_repo_url', None)
+        return get_local_config_store().get('external_playbook_repo_url', None)
     except Exception:
         return None
 
 def set_external_repo_url(url):
     """Set the external playbook repo URL in local.yml."""
-    yaml = YAML()
-    try:
-        with open(LOCAL_YML_PATH, 'r') as f:
-            config = yaml.load(f) or {}
-    except Exception:
-        config = {}
-    config['external_playbook_repo_url'] = url
-    with open(LOCAL_YML_PATH, 'w') as f:
-        yaml.dump(config, f)
+    get_local_config_store().set('external_playbook_repo_url', url)
+
+def get_last_sync_changes():
+    """Return playbook paths changed by the last sync, or None if a full rescan is needed."""
+    return _last_sync_changes
+
+def _repo_git_output(git_command, sudo_password=None):
+    """Run a git command inside the external repo and return its stdout."""
+    if sudo_password:
+        result = subprocess.run(['sudo', '-k', '-S', 'sh', '-c', f'cd {EXTERNAL_REPO_DIR} && git {git_command}'], 
+                              input=f"{sudo_password}\n", capture_output=True, text=True, check=True)
+    else:
+        result = subprocess.run(['sudo', 'sh', '-c', f'cd {EXTERNAL_REPO_DIR} && git {git_command}'], 
+                              capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def _changed_playbook_paths(old_head, new_head, sudo_password=None):
+    """List playbook files that differ between two commits as absolute paths."""
+    if old_head == new_head:
+        return []
+    # -z: paths with spaces, non-ASCII or special characters come back verbatim instead of quoted
+    output = _repo_git_output(f'diff -z --name-status --no-renames {old_head} {new_head} -- playbooks/', sudo_password)
+    fields = output.split('\0')
+    changes = []
+    # status\0path\0 pairs; --no-renames means every status has exactly one path
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status and path:
+            changes.append(os.path.join(EXTERNAL_REPO_DIR, path))
+    return changes
 
 def get_external_playbooks_path():
     """Return the local path where external playbooks are stored."""
@@ -66,6 +87,8 @@ def ensure_external_repo_dir(sudo_password=None):
     return True
 
 def _clone_or_pull_repo(repo_url, sudo_password=None, logger=None):
+    global _last_sync_changes
+    _last_sync_changes = None
     if not repo_url:
         return True
     if not ensure_external_repo_dir(sudo_password):
@@ -106,6 +129,12 @@ def _clone_or_pull_repo(repo_url, sudo_password=None, logger=None):
             if logger:
                 logger.log_message("Updating external repository...")
             
+            # Remember where we were so the catalog can be updated from the delta
+            try:
+                old_head = _repo_git_output('rev-parse HEAD', sudo_password)
+            except subprocess.CalledProcessError:
+                old_head = None
+            
             # First, fetch all changes
             if sudo_password:
                 fetch_result = subprocess.run(['sudo', '-k', '-S', 'sh', '-c', f'cd {EXTERNAL_REPO_DIR} && git fetch --all'], 
@@ -135,6 +164,16 @@ def _clone_or_pull_repo(repo_url, sudo_password=None, logger=None):
                 reset_result = subprocess.run(['sudo', 'sh', '-c', f'cd {EXTERNAL_REPO_DIR} && git reset --hard origin/{current_branch}'], 
                                             capture_output=True, text=True, check=True)
             
+            if old_head:
+                try:
+                    new_head = _repo_git_output('rev-parse HEAD', sudo_password)
+                    _last_sync_changes = _changed_playbook_paths(old_head, new_head, sudo_password)
+                    if logger:
+                        logger.log_message(f"External repository {old_head[:8]}..{new_head[:8]}: {len(_last_sync_changes)} playbook files changed")
+                except subprocess.CalledProcessError as e:
+                    print(f"Could not determine changed playbooks, falling back to full rescan: {e}")
+                    _last_sync_changes = None
+            
             success_msg = f"Successfully updated repository to latest changes (branch: {current_branch})"
             print(success_msg)
             if logger:
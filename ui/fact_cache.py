@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Fact Cache
+Ansible jsonfile fact cache shared by the playbooks of an installation
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Dict
+
+FACT_CACHE_DIRNAME = "facts_cache"
+FALLBACK_FACT_CACHE_DIR = Path.home() / ".cache/com.crimson.cfg/facts"
+FINGERPRINT_FILE = ".fingerprint"
+# Changes whenever apt/dpkg installs, removes or upgrades a package
+DPKG_STATUS = "/var/lib/dpkg/status"
+
+class FactCache:
+    """Facts gathered once are reused by every later playbook.
+
+    Ansible runs with `gathering: smart` and the jsonfile cache plugin, so
+    plays that gather facts implicitly only do so when the cache has no
+    (unexpired) entry for the host. The cache lives in
+    <working_directory>/facts_cache and is emptied when the kernel or the
+    installed packages changed since the facts were gathered, when its TTL
+    runs out (Ansible) or on request from the Admin tab. A ttl of 0 turns
+    caching off.
+    """
+
+    def __init__(self, working_directory: str, ttl: int = 3600, debug: bool = False):
+        self.working_directory = working_directory
+        self.ttl = ttl
+        self.debug = debug
+        self.path = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.path is not None
+
+    def provision(self) -> bool:
+        """Create the cache directory; falls back to ~/.cache if the working directory is not writable."""
+        if self.ttl <= 0:
+            return False
+        for path in (Path(self.working_directory) / FACT_CACHE_DIRNAME, FALLBACK_FACT_CACHE_DIR):
+            try:
+                # Facts include network and user details: readable by the user only
+                path.mkdir(mode=0o700, parents=True, exist_ok=True)
+                if os.access(path, os.W_OK):
+                    self.path = path
+                    if self.debug:
+                        print(f"FactCache: Using {path} (ttl {self.ttl}s)")
+                    return True
+            except OSError:
+                continue
+        print("FactCache: No writable fact cache directory, facts are gathered by every playbook")
+        return False
+
+    @staticmethod
+    def fingerprint() -> str:
+        """Running kernel plus the last package database change."""
+        try:
+            packages = str(os.stat(DPKG_STATUS).st_mtime_ns)
+        except OSError:
+            packages = "-"
+        return f"{os.uname().release} {packages}"
+
+    def prepare(self):
+        """Call at the start of a run: drops facts gathered before a kernel or package change."""
+        if not self.enabled:
+            return
+        marker = self.path / FINGERPRINT_FILE
+        current = self.fingerprint()
+        try:
+            recorded = marker.read_text(encoding="utf-8").strip()
+        except (OSError, ValueError):
+            # Missing or unreadable (e.g. not UTF-8): treat like an unknown fingerprint
+            recorded = None
+        if recorded != current:
+            if recorded is not None:
+                self.clear("kernel or packages changed")
+            try:
+                marker.write_text(current + "\n", encoding="utf-8")
+            except OSError as e:
+                print(f"FactCache: Could not record fingerprint: {e}")
+
+    def clear(self, reason: str = "requested") -> int:
+        """Remove all cached host facts; returns the number of hosts removed."""
+        if self.path is None or not self.path.exists():
+            return 0
+        removed = 0
+        for entry in self.path.iterdir():
+            if entry.name == FINGERPRINT_FILE:
+                continue
+            try:
+                if entry.is_dir():
+                    shutil.rmtree(entry)
+                else:
+                    entry.unlink()
+                removed += 1
+            except OSError as e:
+                print(f"FactCache: Could not remove {entry}: {e}")
+        if self.debug:
+            print(f"FactCache: Cleared {removed} cached host(s) ({reason})")
+        return removed
+
+    def environment(self) -> Dict[str, str]:
+        """ANSIBLE_* variables that enable the cache for an ansible-playbook run."""
+        if not self.enabled:
+            return {}
+        return {
+            "ANSIBLE_GATHERING": "smart",
+            "ANSIBLE_CACHE_PLUGIN": "jsonfile",
+            "ANSIBLE_CACHE_PLUGIN_CONNECTION": str(self.path),
+            "ANSIBLE_CACHE_PLUGIN_TIMEOUT": str(self.ttl),
+        }
@@ -7,16 +7,14 @@ Handles main interface construction and styling
 import gi
 import os
 import getpass
-import yaml
 from pathlib import Path
 import json
-# Add ruamel.yaml import
-from ruamel.yaml import YAML
 from .admin_tab import AdminTab
 from .logs_tab import LogsTab
 from .config_tab import ConfigTab
 from .main_tab import MainTab
 from .system_tab import SystemTab
+from .local_config_store import get_local_config_store
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GdkPixbuf, Gdk  # type: ignore
 
@@ -25,6 +23,11 @@ class GUIBuilder:
         self.main_window = main_window
         self.debug = main_window.debug
         self.notebook = None
+        # Only the style keys re-style the window; other edits leave it alone
+        get_local_config_store().subscribe(["background_color", "app_background_image"], self._on_style_changed)
+
+    def _on_style_changed(self, changes):
+        self.apply_css()
         
     def apply_css(self):
         """Apply custom CSS styling"""
@@ -32,19 +35,10 @@ class GUIBuilder:
             if self.debug:
                 print("GUIBuilder: Starting apply_css...")
             
-            # Load user config for background image and color
-            config_dir = Path.home() / ".config/com.crimson.cfg"
-            local_file = config_dir / "local.yml"
-            if not config_dir.exists():
-                config_dir.mkdir(parents=True, exist_ok=True)
-            if local_file.exists():
-                with open(local_file, 'r') as f:
-                    local_config = yaml.safe_load(f) or {}
-                    app_background_image = local_config.get("app_background_image", None)
-                    background_color = local_config.get("background_color", "#181a20")
-            else:
-                app_background_image = None
-                background_color = "#181a20"
+            # Background image and color from the validated settings
+            branding = self.main_window.settings.branding
+            app_background_image = branding.app_background_image
+            background_color = branding.background_color
                 
             if self.debug:
                 print(f"GUIBuilder: Background image: {app_background_image}")
@@ -278,42 +272,14 @@ class GUIBuilder:
         title_box.set_valign(Gtk.Align.CENTER)
         
         # Main title - CrimsonCFG
-        app_name = self.main_window.config.get('settings', {}).get('app_name')
-        if not app_name:
-            try:
-                # Load local.yml
-                local_config = {}
-                config_dir = Path.home() / ".config/com.crimson.cfg"
-                local_file = config_dir / "local.yml"
-                if local_file.exists():
-                    with open(local_file, 'r') as f:
-                        local_config = yaml.safe_load(f) or {}
-                
-                # Merge configurations (local overrides all)
-                merged_config = local_config
-                app_name = merged_config.get('app_name', 'CrimsonCFG')
-            except Exception:
-                app_name = 'CrimsonCFG'
+        branding = self.main_window.settings.branding
+        app_name = branding.app_name
         title_label = Gtk.Label()
         title_label.set_markup(f"<span size='x-large' weight='bold'>{app_name}</span>")
         title_label.set_halign(Gtk.Align.START)
         title_label.set_valign(Gtk.Align.CENTER)
         title_box.pack_start(title_label, False, False, 0)
-        app_subtitle = self.main_window.config.get('settings', {}).get('app_subtitle')
-        if not app_subtitle:
-            try:
-                # Load local.yml
-                local_config = {}
-                config_dir = Path.home() / ".config/com.crimson.cfg"
-                local_file = config_dir / "local.yml"
-                if local_file.exists():
-                    with open(local_file, 'r') as f:
-                        local_config = yaml.safe_load(f) or {}
-                # Merge configurations (local overrides all)
-                merged_config = local_config
-                app_subtitle = merged_config.get('app_subtitle', 'System Configuration Manager')
-            except Exception:
-                app_subtitle = 'System Configuration Manager'
+        app_subtitle = branding.app_subtitle
         subtitle_label = Gtk.Label()
         subtitle_label.set_markup(f"<span size='medium'>{app_subtitle}</span>")
         subtitle_label.set_halign(Gtk.Align.START)
@@ -329,20 +295,7 @@ class GUIBuilder:
         logo_box.set_halign(Gtk.Align.CENTER)
         
         # Try to load logo
-        try:
-            # Load local.yml
-            local_config = {}
-            config_dir = Path.home() / ".config/com.crimson.cfg"
-            local_file = config_dir / "local.yml"
-            if local_file.exists():
-                with open(local_file, 'r') as f:
-                    local_config = yaml.safe_load(f) or {}
-            
-            # Merge configurations (local overrides all)
-            merged_config = local_config
-            logo_path = merged_config.get('app_logo', os.path.join("files", "app", "com.crimson.cfg.icon.png"))
-        except Exception:
-            logo_path = os.path.join("files", "app", "com.crimson.cfg.icon.png")
+        logo_path = branding.app_logo or os.path.join("files", "app", "com.crimson.cfg.icon.png")
         if os.path.exists(logo_path):
             try:
                 # Resize logo to a smaller size (150px max width)
@@ -389,6 +342,7 @@ class GUIBuilder:
         
         # Main tab - Use MainTab class
         main_tab = MainTab(self.main_window)
+        self.main_window.main_tab = main_tab
         self.notebook.append_page(main_tab, Gtk.Label(label="Main"))
         
         # System tab - Use SystemTab class
@@ -427,6 +381,7 @@ class GUIBuilder:
         
         # Configuration tab - Use ConfigTab class
         config_tab = ConfigTab(self.main_window)
+        self.main_window.config_tab = config_tab
         self.notebook.append_page(config_tab, Gtk.Label(label="Configuration"))
         
         # Administration tab - Use AdminTab class
@@ -5,6 +5,8 @@ Handles Ansible installation and playbook execution
 """
 
 import os
+import shutil
+import tempfile
 import subprocess
 import threading
 from typing import Dict, List
@@ -13,10 +15,35 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from .local_config_store import get_local_config_store
+from .output_stream import StreamingExecutor
+from .fact_cache import FactCache
+from functions.playbook_scheduler import PlaybookPlan, PlaybookScheduler
+
+try:
+    from functions.playbook_validator import analyze_playbook
+    from functions.playbook_vars import playbook_variables, select_vars, template_names, write_vars_file
+except ImportError:
+    analyze_playbook = None
+    playbook_variables = None
+
+# Name prefix of the marker plays in a batched master playbook
+BATCH_MARKER = "CrimsonCFG finished"
+# Bundled notification callback that reports playbook progress as JSON events
+CALLBACK_PLUGINS_DIR = Path(__file__).resolve().parent.parent / "callback_plugins"
+EVENTS_CALLBACK = "crimsoncfg_events"
+
 class Installer:
     def __init__(self, main_window):
         self.main_window = main_window
         self.debug = main_window.debug
+        self.run_settings = None  # Settings snapshot of the running installation
+        self.run_config_version = None  # local.yml version the run started with
+        self.run_vars_dir = None  # Private temp dir holding the per-playbook extra-vars files of a run
+        self.run_log_dir = None  # Folder with the full output of each playbook of the current run
+        self.executor = StreamingExecutor()
+        self.fact_cache = None  # FactCache of the current working directory
+        self._run_lock = threading.Lock()  # Guards state files and per-run file names while playbooks run in parallel
         
     def setup_ansible_environment(self):
         """Setup Ansible directory and inventory file"""
@@ -39,11 +66,28 @@ localhost
                     f.write(inventory_content)
                 if self.debug:
                     print(f"Created inventory file: {self.main_window.inventory_file}")
+            
+            self._ensure_fact_cache(self.main_window.settings)
                     
         except Exception as e:
             if self.debug:
                 print(f"Error setting up Ansible environment: {e}")
                 
+    def _ensure_fact_cache(self, settings) -> FactCache:
+        """Return the fact cache for the settings' working directory and TTL, provisioning it on change"""
+        cache = self.fact_cache
+        if cache is None or cache.working_directory != settings.working_directory or cache.ttl != settings.fact_cache_ttl:
+            cache = FactCache(settings.working_directory, settings.fact_cache_ttl, self.debug)
+            cache.provision()
+            self.fact_cache = cache
+        return cache
+
+    def clear_fact_cache(self, reason: str = "requested") -> int:
+        """Drop cached facts so the next playbook gathers them again"""
+        if self.fact_cache is None:
+            return 0
+        return self.fact_cache.clear(reason)
+
     def install_ansible(self) -> bool:
         """Install Ansible if not present"""
         try:
@@ -66,111 +110,420 @@ localhost
         state_file = config_dir / "installed_playbooks.json"
         if not config_dir.exists():
             config_dir.mkdir(parents=True, exist_ok=True)
-        try:
-            if state_file.exists():
-                with open(state_file, 'r') as f:
-                    state = json.load(f)
-            else:
-                state = {}
-        except Exception:
-            state = {}
-        state[playbook_name] = datetime.now().isoformat()
-        with open(state_file, 'w') as f:
-            json.dump(state, f, indent=2)
-
-    def run_playbook(self, playbook: Dict) -> bool:
-        """Run a single playbook"""
-        try:
-            # Check if inventory file exists
-            if not os.path.exists(self.main_window.inventory_file):
-                GLib.idle_add(self.main_window.logger.log_message, f"Error: Inventory file not found at {self.main_window.inventory_file}")
-                return False
-                
-            # Check if playbook file exists (determine path based on source)
-            playbook_path = playbook['path']
-            source = playbook.get('source', 'Built-in')
-            
-            # Determine the correct playbook path based on source
-            if not os.path.isabs(playbook_path):
-                # Remove leading 'playbooks/' if present
-                if playbook_path.startswith('playbooks/'):
-                    playbook_path = playbook_path[len('playbooks/'):]
-                
-                if source == 'External':
-                    # External playbooks are in external_src/playbooks
-                    playbook_path = os.path.join(self.main_window.working_directory, 'external_src', 'playbooks', playbook_path)
+        with self._run_lock:
+            try:
+                if state_file.exists():
+                    with open(state_file, 'r') as f:
+                        state = json.load(f)
                 else:
-                    # Built-in playbooks are in playbooks
-                    playbook_path = os.path.join(self.main_window.working_directory, 'playbooks', playbook_path)
-            
-            # Expand Jinja2 variables if present
-            if "{{ working_directory }}" in playbook_path:
-                playbook_path = playbook_path.replace("{{ working_directory }}", self.main_window.working_directory)
+                    state = {}
+            except Exception:
+                state = {}
+            state[playbook_name] = datetime.now().isoformat()
+            with open(state_file, 'w') as f:
+                json.dump(state, f, indent=2)
+
+    def _locate_playbook(self, playbook: Dict, settings, report: bool = True):
+        """Return (playbook_path, templates_directory) for a selected playbook, or None if it is missing"""
+        working_directory = settings.working_directory
+        playbook_path = playbook['path']
+        source = playbook.get('source', 'Built-in')
+        
+        # Determine the correct playbook path based on source
+        if not os.path.isabs(playbook_path):
+            # Remove leading 'playbooks/' if present
+            if playbook_path.startswith('playbooks/'):
+                playbook_path = playbook_path[len('playbooks/'):]
             
-            if not os.path.exists(playbook_path):
+            if source == 'External':
+                # External playbooks are in external_src/playbooks
+                playbook_path = os.path.join(working_directory, 'external_src', 'playbooks', playbook_path)
+            else:
+                # Built-in playbooks are in playbooks
+                playbook_path = os.path.join(working_directory, 'playbooks', playbook_path)
+        
+        # Expand {{ variable }} references with the same values as local.yml
+        playbook_path = self.main_window.config_manager.resolver.resolve_value(playbook_path)
+        
+        if not os.path.exists(playbook_path):
+            if report:
                 GLib.idle_add(self.main_window.logger.log_message, f"Error: Playbook file not found at {playbook_path}")
                 GLib.idle_add(self.main_window.logger.log_message, f"Source: {source}")
+            return None
+            
+        # Set templates directory based on playbook source
+        if source == 'External':
+            templates_directory = os.path.join(working_directory, 'external_src', 'templates')
+        else:
+            templates_directory = os.path.join(working_directory, 'templates')
+        return playbook_path, templates_directory
+
+    def _ansible_command(self, inventory_file: str, vars_file, templates_directory: str, playbook_path: str) -> List[str]:
+        cmd = [
+            "ansible-playbook",
+            "-b",  # Add become for privilege escalation
+            "-i", inventory_file,
+        ]
+        if vars_file:
+            # Resolved values pinned at the start of the run; extra vars take precedence over vars_files
+            cmd += ["-e", f"@{vars_file}"]
+        cmd += [
+            "-e", f"templates_directory={templates_directory}",
+            playbook_path
+        ]
+        return cmd
+
+    def _ansible_env(self) -> Dict:
+        env = os.environ.copy()
+        env["ANSIBLE_BECOME"] = "true"
+        if self.fact_cache is not None:
+            env.update(self.fact_cache.environment())
+        if self.main_window.sudo_password:
+            env["ANSIBLE_BECOME_PASS"] = self.main_window.sudo_password
+        if CALLBACK_PLUGINS_DIR.is_dir():
+            # Added to, not replacing, the user's own callback settings
+            paths = [path for path in env.get("ANSIBLE_CALLBACK_PLUGINS", "").split(os.pathsep) if path]
+            env["ANSIBLE_CALLBACK_PLUGINS"] = os.pathsep.join([str(CALLBACK_PLUGINS_DIR)] + paths)
+            for key in ("ANSIBLE_CALLBACKS_ENABLED", "ANSIBLE_CALLBACK_WHITELIST"):  # the latter for ansible < 2.11
+                enabled = [name for name in env.get(key, "").split(",") if name.strip()]
+                env[key] = ",".join(enabled + [EVENTS_CALLBACK])
+        return env
+
+    def _stream(self, cmd: List[str], cwd: str, transcript_path, on_lines=None, prefix=None, on_event=None):
+        """Run ansible-playbook, streaming its output to the Logs tab; None if it could not start
+
+        With a prefix (playbooks running in parallel) every line is tagged
+        with it, so interleaved output stays readable; a callable prefix is
+        asked for the tag of each batch of lines.
+        """
+        GLib.idle_add(self.main_window.logger.log_message, f"Running command: {' '.join(cmd)}")
+        log_lines = self.main_window.logger.log_lines
+
+        def forward(lines):
+            tag = prefix() if callable(prefix) else prefix
+            log_lines([f"[{tag}] {line}" for line in lines] if tag else lines)
+            if on_lines is not None:
+                on_lines(lines)
+        try:
+            # Output reaches the Logs tab while the playbook runs; only a bounded tail stays in memory
+            return self.executor.run(cmd, forward, env=self._ansible_env(), cwd=cwd, transcript_path=transcript_path,
+                                     on_event=on_event if CALLBACK_PLUGINS_DIR.is_dir() else None)
+        except Exception as e:
+            GLib.idle_add(self.main_window.logger.log_message, f"Subprocess error: {e}")
+            return None
+
+    def _report_failure(self, stream):
+        errors = [line for line in stream.tail if line.startswith(("fatal:", "failed:", "ERROR!"))]
+        if errors:
+            GLib.idle_add(self.main_window.logger.log_message, "Last errors:\n" + "\n".join(errors[-5:]))
+        if stream.transcript_path:
+            GLib.idle_add(self.main_window.logger.log_message, f"Full output: {stream.transcript_path}")
+
+    def run_playbook(self, playbook: Dict, prefix=None, on_event=None) -> bool:
+        """Run a single playbook; on_event(playbook, event) receives its callback events"""
+        try:
+            settings = self.run_settings or self.main_window.settings
+            inventory_file = f"{settings.working_directory}/hosts.ini"
+            # Check if inventory file exists
+            if not os.path.exists(inventory_file):
+                GLib.idle_add(self.main_window.logger.log_message, f"Error: Inventory file not found at {inventory_file}")
                 return False
                 
-            # Set templates directory based on playbook source
-            if source == 'External':
-                templates_directory = os.path.join(self.main_window.working_directory, 'external_src', 'templates')
-            else:
-                templates_directory = os.path.join(self.main_window.working_directory, 'templates')
-            
-            cmd = [
-                "ansible-playbook",
-                "-b",  # Add become for privilege escalation
-                "-i", self.main_window.inventory_file,
-                "-e", f"templates_directory={templates_directory}",
-                playbook_path
-            ]
-            
-            GLib.idle_add(self.main_window.logger.log_message, f"Running command: {' '.join(cmd)}")
+            located = self._locate_playbook(playbook, settings)
+            if located is None:
+                return False
+            playbook_path, templates_directory = located
+            vars_file = self._write_run_vars(playbook['name'], [playbook_path], templates_directory, settings)
+            cmd = self._ansible_command(inventory_file, vars_file, templates_directory, playbook_path)
             
             # Determine the project root (directory containing the playbook)
             playbook_dir = os.path.dirname(os.path.abspath(playbook_path))
-
-            if self.main_window.sudo_password:
-                try:
-                    # Remove pexpect logic, use subprocess with ANSIBLE_BECOME_PASS
-                    env = os.environ.copy()
-                    env["ANSIBLE_BECOME"] = "true"
-                    env["ANSIBLE_BECOME_PASS"] = self.main_window.sudo_password
-                    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=playbook_dir)
-                    GLib.idle_add(self.main_window.logger.log_message, f"Subprocess stdout for {playbook['name']}:\n{proc.stdout}")
-                    GLib.idle_add(self.main_window.logger.log_message, f"Subprocess stderr for {playbook['name']}:\n{proc.stderr}")
-                    if proc.returncode == 0:
-                        GLib.idle_add(self.main_window.logger.log_message, f"Playbook {playbook['name']} completed successfully (env password)")
-                        result = True
-                    else:
-                        GLib.idle_add(self.main_window.logger.log_message, f"Playbook {playbook['name']} failed with return code: {proc.returncode}")
-                        result = False
-                except Exception as e:
-                    GLib.idle_add(self.main_window.logger.log_message, f"Subprocess error: {e}")
-                    result = False
-            else:
-                # Fallback to subprocess if no sudo password is provided
-                env = os.environ.copy()
-                env["ANSIBLE_BECOME"] = "true"
-                result = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True, cwd=playbook_dir)
-                GLib.idle_add(self.main_window.logger.log_message, f"Playbook {playbook['name']} completed successfully")
-                result = True
+            stream = self._stream(cmd, playbook_dir, self._transcript_path(playbook_path), prefix=prefix,
+                                  on_event=(lambda event: on_event(playbook, event)) if on_event else None)
+            if stream is None:
+                return False
             
-            if result:  # Only mark as installed if successful
+            if stream.returncode == 0:
+                GLib.idle_add(self.main_window.logger.log_message, f"Playbook {playbook['name']} completed successfully")
                 self._mark_playbook_installed(playbook['name'])
-            return result
+                return True
+            GLib.idle_add(self.main_window.logger.log_message, f"Playbook {playbook['name']} failed with return code: {stream.returncode}")
+            self._report_failure(stream)
+            return False
             
-        except subprocess.CalledProcessError as e:
+        except OSError as e:
             GLib.idle_add(self.main_window.logger.log_message, f"Playbook {playbook['name']} failed with error: {e}")
-            GLib.idle_add(self.main_window.logger.log_message, f"Return code: {e.returncode}")
-            GLib.idle_add(self.main_window.logger.log_message, f"Error output (stderr): {e.stderr}")
-            GLib.idle_add(self.main_window.logger.log_message, f"Output (stdout): {e.stdout}")
             return False
+
+    def run_batch(self, playbooks: List[Dict], on_finished=None, on_event=None, tagged: bool = False) -> int:
+        """Run several playbooks in one ansible-playbook process.
+
+        A temporary master playbook imports them in order, each followed by
+        an empty marker play. Its PLAY banner only appears once the playbook
+        before it has finished on every host (Ansible stops the run at the
+        first playbook that fails), so the markers tell which playbooks
+        succeeded (seen as a play_start event, or its banner in the text
+        output if the events callback is unavailable). on_finished(index) is
+        called as each one completes and it is marked installed individually;
+        on_event(playbook, event) receives the events of the playbook that is
+        running, and with tagged its output lines carry its name. Returns the
+        number of playbooks that completed.
+        """
+        settings = self.run_settings or self.main_window.settings
+        inventory_file = f"{settings.working_directory}/hosts.ini"
+        if not os.path.exists(inventory_file):
+            GLib.idle_add(self.main_window.logger.log_message, f"Error: Inventory file not found at {inventory_file}")
+            return 0
+        located = []
+        for playbook in playbooks:
+            result = self._locate_playbook(playbook, settings)
+            if result is None:
+                break
+            located.append(result)
+        if not located:
+            return 0
+        paths = [path for path, _ in located]
+        templates_directory = located[0][1]
+        with self._run_lock:
+            # Chains on other workers write their master playbooks into the same folder
+            batch_id = len([name for name in os.listdir(self.run_vars_dir) if name.startswith("batch-")]) + 1
+            master_path = os.path.join(self.run_vars_dir, f"batch-{batch_id}.yml")
+            entries = []
+            for index, path in enumerate(paths):
+                entries.append({"import_playbook": path})
+                entries.append({"name": f"{BATCH_MARKER} {batch_id} {index}", "hosts": "all",
+                                "gather_facts": False, "tasks": []})
+            with open(master_path, "w", encoding="utf-8") as f:
+                f.write("# Generated by CrimsonCFG for one installation run\n")
+                json.dump(entries, f, indent=2)  # JSON is valid YAML
+        vars_file = self._write_run_vars(f"batch of {len(paths)}", paths, templates_directory, settings)
+        cmd = self._ansible_command(inventory_file, vars_file, templates_directory, master_path)
+
+        completed = 0
+        events_seen = False
+        marker_play = f"{BATCH_MARKER} {batch_id} "
+        marker = f"PLAY [{marker_play}"
+
+        def reached(index):
+            nonlocal completed
+            if index == completed:
+                name = playbooks[index]['name']
+                GLib.idle_add(self.main_window.logger.log_message, f"Playbook {name} completed successfully")
+                self._mark_playbook_installed(name)
+                completed += 1
+                if on_finished is not None:
+                    on_finished(index)
+
+        def on_lines(lines):
+            if events_seen:
+                # Events are authoritative; the banner may overtake the previous task's events
+                return
+            for line in lines:
+                if line.startswith(marker):
+                    reached(int(line[len(marker):].split("]", 1)[0]))
+
+        def on_batch_event(event):
+            nonlocal events_seen
+            events_seen = True
+            play = event.get("play") or ""
+            if event.get("event") == "play_start" and play.startswith(marker_play):
+                reached(int(play[len(marker_play):]))
+            elif on_event is not None and completed < len(playbooks):
+                on_event(playbooks[completed], event)
+
+        def running_name():
+            return playbooks[min(completed, len(playbooks) - 1)]['name']
+
+        cwd = os.path.commonpath([os.path.dirname(path) for path in paths])
+        stream = self._stream(cmd, cwd, self._transcript_path(f"batch-{batch_id}.yml"), on_lines,
+                              prefix=running_name if tagged else None, on_event=on_batch_event)
+        if stream is None:
+            return completed
+        if completed < len(playbooks):
+            failed = playbooks[completed]['name']
+            GLib.idle_add(self.main_window.logger.log_message, f"Playbook {failed} failed with return code: {stream.returncode}")
+            self._report_failure(stream)
+        return completed
+
+    def _batches(self, playbooks: List[Dict], settings) -> List[List[Dict]]:
+        """Split the ordered selection into runs that can share one ansible-playbook process.
+
+        Consecutive playbooks from the same source share a templates
+        directory and are batched; playbooks using `playbook_dir` depend on
+        being the top-level playbook and run on their own. set_fact and
+        register values outlive their play within one process, so a
+        playbook starts a new batch when it (or a template it renders)
+        refers to a host fact an earlier playbook of the batch sets and it
+        doesn't set itself. The batch also shares one extra-vars file, which
+        outranks a member's own vars, set_fact and register, so a playbook
+        that defines a name another member reads from local.yml (or the
+        other way round) starts a new batch as well.
+        """
+        if not settings.batch_install:
+            return [[playbook] for playbook in playbooks]
+        batches = []
+        previous_batchable = False
+        facts = set()    # host facts set by the playbooks of the current batch
+        defined = set()  # names the playbooks of the current batch define themselves
+        pinned = set()   # local.yml names the batch's extra-vars file will hold
+        for playbook in playbooks:
+            analysis = self._analysis(playbook, settings)
+            batchable = analysis is not None and analysis["valid"] and not analysis["uses_playbook_dir"]
+            inputs, own_pinned, own_defined = set(), set(), set()
+            if batchable:
+                inputs = self._fact_inputs(playbook, analysis, settings)
+                own_defined = set(analysis["defined_vars"])
+                if analysis["loads_local_config"]:
+                    own_pinned = inputs & set(settings.local)
+            if (batchable and previous_batchable
+                    and batches[-1][-1].get('source', 'Built-in') == playbook.get('source', 'Built-in')
+                    and not facts & inputs
+                    and not own_defined & pinned and not own_pinned & defined):
+                batches[-1].append(playbook)
+            else:
+                batches.append([playbook])
+                facts, defined, pinned = set(), set(), set()
+            if analysis is not None:
+                facts.update(analysis.get("host_facts", []))
+            defined |= own_defined
+            pinned |= own_pinned
+            previous_batchable = batchable
+        return batches
+
+    def _analysis(self, playbook: Dict, settings):
+        """Content analysis of a playbook from the background validation, or analyzed here if it has none yet"""
+        analysis = self.main_window.playbook_manager.analysis(playbook)
+        if analysis is not None and "uses_playbook_dir" in analysis:
+            return analysis
+        located = self._locate_playbook(playbook, settings, report=False)
+        if located is None or analyze_playbook is None:
+            return None
+        try:
+            with open(located[0], 'r', encoding='utf-8') as f:
+                return analyze_playbook(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _fact_inputs(self, playbook: Dict, analysis: Dict, settings) -> set:
+        """Names a playbook and its templates read without setting them itself"""
+        located = self._locate_playbook(playbook, settings, report=False)
+        names = set(analysis["names"])
+        if located is not None:
+            names |= template_names(analysis["templates"], *located)
+        return names - set(analysis["defined_vars"])
+
+    def _transcript_path(self, playbook_path: str):
+        """Per-playbook transcript file inside this run's log folder, or None without one"""
+        if self.run_log_dir is None:
+            return None
+        with self._run_lock:
+            index = len(os.listdir(self.run_log_dir)) + 1
+            path = os.path.join(self.run_log_dir, f"{index:02d}-{os.path.splitext(os.path.basename(playbook_path))[0]}.log")
+            # Claim the name before another playbook counts the folder
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+        return path
+
+    def _create_run_log_dir(self, settings):
+        """Create the folder for this run's transcripts: <log_directory>/runs/<timestamp>
+
+        Falls back to ~/.config/com.crimson.cfg/logs when the log directory
+        is not writable (e.g. a root owned /opt/CrimsonCFG).
+        """
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        for base in (Path(settings.log_directory) / "runs", Path.home() / ".config/com.crimson.cfg/logs"):
+            try:
+                path = base / stamp
+                path.mkdir(parents=True, exist_ok=True)
+                return str(path)
+            except OSError:
+                continue
+        return None
             
-    def run_installation(self, selected_playbooks):
-        """Run the installation process"""
+    def _write_run_vars(self, label: str, playbook_paths: List[str], templates_directory: str, settings):
+        """Write the local.yml variables these playbooks reference to a JSON extra-vars file.
+
+        Returns the file path, or None if they reference none (or the scan
+        is unavailable); the playbooks then read local.yml as before.
+        """
+        if playbook_variables is None or self.run_vars_dir is None:
+            return None
+        try:
+            names = set()
+            for playbook_path in playbook_paths:
+                names |= playbook_variables(playbook_path, templates_directory)
+            data = select_vars(names, settings.local)
+            if not data:
+                return None
+            with self._run_lock:
+                path = os.path.join(self.run_vars_dir, f"{len(os.listdir(self.run_vars_dir)):03d}-{os.path.basename(playbook_paths[0])}.json")
+                write_vars_file(path, data)
+            if self.debug:
+                print(f"Installer: Extra vars for {label}: {sorted(data)}")
+            return path
+        except Exception as e:
+            if self.debug:
+                print(f"Installer: Could not prepare extra vars for {label}: {e}")
+            return None
+
+    def _plan_installation(self, playbooks: List[Dict], settings) -> PlaybookPlan:
+        """Build the dependency graph of the selection; playbook texts are read to infer undeclared resources"""
+        texts = {}
+        for index, playbook in enumerate(playbooks):
+            if "resources" in playbook:
+                continue
+            located = self._locate_playbook(playbook, settings, report=False)
+            if located is None:
+                continue
+            try:
+                with open(located[0], 'r', encoding='utf-8') as f:
+                    texts[index] = f.read()
+            except OSError:
+                continue
+        weights = [self.main_window.playbook_manager.task_count(playbook) or 1 for playbook in playbooks]
+        return PlaybookPlan(playbooks, texts, weights)
+
+    def _run_serial(self, playbooks: List[Dict], started, finished, on_event=None, tagged: bool = False) -> int:
+        """Run playbooks one after another, batching where possible; returns how many completed
+
+        With tagged (other playbooks run in parallel) output lines carry the
+        name of the playbook they belong to.
+        """
+        completed = 0
+        for batch in self._batches(playbooks, self.run_settings):
+            started(batch[0])
+            if len(batch) == 1:
+                ok = self.run_playbook(batch[0], prefix=batch[0]['name'] if tagged else None, on_event=on_event)
+                finished(batch[0], ok)
+                if not ok:
+                    return completed
+                completed += 1
+                continue
+
+            def on_finished(index, batch=batch):
+                finished(batch[index])
+                if index + 1 < len(batch):
+                    started(batch[index + 1])
+
+            GLib.idle_add(self.main_window.logger.log_message, f"Running {len(batch)} playbooks in one ansible-playbook process")
+            count = self.run_batch(batch, on_finished=on_finished, on_event=on_event, tagged=tagged)
+            completed += count
+            if count < len(batch):
+                finished(batch[count], False)
+                return completed
+        return completed
+
+    def run_installation(self, selected_playbooks, settings=None):
+        """Run the installation process with one settings snapshot for all playbooks"""
+        self.run_settings = settings or self.main_window.settings
+        store = get_local_config_store()
+        config_change_reported = False
         try:
+            # Inside the try, so a failure here still re-enables the Install button
+            self.run_config_version, _ = store.snapshot()
+            self.run_vars_dir = tempfile.mkdtemp(prefix="crimsoncfg-run-")  # mode 0700
+            self.run_log_dir = self._create_run_log_dir(self.run_settings)
+            # The first playbook gathers facts, the others reuse them
+            self._ensure_fact_cache(self.run_settings).prepare()
             GLib.idle_add(self.main_window.logger.log_message, "Starting installation process...")
             GLib.idle_add(self.main_window.status_label.set_text, "Installing Ansible...")
             GLib.idle_add(self.main_window.progress_bar.set_fraction, 0.1)
@@ -185,19 +538,100 @@ localhost
             GLib.idle_add(self.main_window.progress_bar.set_fraction, 0.2)
             GLib.idle_add(self.main_window.status_label.set_text, "Installing selected playbooks...")
             
-            # Run each playbook
-            total_playbooks = len(selected_playbooks)
-            for i, playbook in enumerate(selected_playbooks):
-                progress = 0.2 + (i / total_playbooks) * 0.7
+            # Order the playbooks as a dependency graph, weighting progress by validated task counts
+            plan = self._plan_installation(selected_playbooks, self.run_settings)
+            weights = {id(playbook): weight for playbook, weight in zip(plan.playbooks, plan.weights)}
+            total_weight = sum(plan.weights) or 1
+            progress_lock = threading.Lock()
+            running = []
+            done_weight = 0
+            tasks_done = {}  # id(playbook) -> tasks finished so far, capped at its weight
+            counts = {}  # id(playbook) -> host result counts from the events callback
+
+            def fraction():
+                return 0.2 + ((done_weight + sum(tasks_done.values())) / total_weight) * 0.7
+
+            def started(playbook):
+                with progress_lock:
+                    running.append(playbook['name'])
+                    names = ", ".join(running)
+                    progress = fraction()
                 GLib.idle_add(self.main_window.progress_bar.set_fraction, progress)
-                GLib.idle_add(self.main_window.status_label.set_text, f"Installing {playbook['name']}...")
+                GLib.idle_add(self.main_window.status_label.set_text, f"Installing {names}...")
                 GLib.idle_add(self.main_window.logger.log_message, f"Installing {playbook['name']}...")
-                
-                if not self.run_playbook(playbook):
-                    GLib.idle_add(self.main_window.logger.log_message, f"Failed to install {playbook['name']}")
-                    GLib.idle_add(self.main_window.status_label.set_text, f"Failed to install {playbook['name']}")
-                    GLib.idle_add(self.main_window.show_error_dialog, f"Failed to install {playbook['name']}")
-                    return
+
+            def on_event(playbook, event):
+                """Per-task progress from the crimsoncfg_events callback"""
+                kind = event.get("event")
+                if kind == "task_start":
+                    with progress_lock:
+                        single = len(running) == 1
+                    if single:
+                        GLib.idle_add(self.main_window.status_label.set_text, f"Installing {playbook['name']}: {event.get('task')}")
+                elif kind == "task_end":
+                    with progress_lock:
+                        key = id(playbook)
+                        tasks_done[key] = min(weights[key], tasks_done.get(key, 0) + 1)
+                        progress = fraction()
+                    GLib.idle_add(self.main_window.progress_bar.set_fraction, progress)
+                elif kind == "host_result":
+                    status = event.get("status")
+                    with progress_lock:
+                        playbook_counts = counts.setdefault(id(playbook), {"ok": 0, "changed": 0, "failed": 0, "skipped": 0})
+                        if status in ("failed", "unreachable"):
+                            playbook_counts["failed"] += 1
+                        elif status == "skipped":
+                            playbook_counts["skipped"] += 1
+                        else:
+                            playbook_counts["ok"] += 1
+                            if event.get("changed"):
+                                playbook_counts["changed"] += 1
+                    if status in ("failed", "unreachable"):
+                        message = f"{playbook['name']}: task '{event.get('task')}' {status} on {event.get('host')}"
+                        if event.get("msg"):
+                            message += f": {event['msg']}"
+                        GLib.idle_add(self.main_window.logger.log_message, message)
+
+            def finished(playbook, ok=True):
+                nonlocal done_weight, config_change_reported
+                with progress_lock:
+                    running.remove(playbook['name'])
+                    tasks_done.pop(id(playbook), None)
+                    if ok:
+                        done_weight += weights[id(playbook)]
+                    playbook_counts = counts.pop(id(playbook), None)
+                    report_change = not config_change_reported and store.version != self.run_config_version
+                    config_change_reported = config_change_reported or report_change
+                if playbook_counts:
+                    GLib.idle_add(self.main_window.logger.log_message,
+                                  f"{playbook['name']}: ok={playbook_counts['ok']} changed={playbook_counts['changed']} "
+                                  f"failed={playbook_counts['failed']} skipped={playbook_counts['skipped']}")
+                if report_change:
+                    # Edits are never lost; the run keeps the values pinned in its extra-vars files
+                    GLib.idle_add(self.main_window.logger.log_message, "Note: local.yml was changed during the installation; this run keeps the values it started with")
+
+            # Dependency chains run on one worker, so their playbooks can still share a process
+            chains = plan.chains() if self.run_settings.batch_install else None
+            workers = min(self.run_settings.install_workers, len(chains) if chains else len(plan.playbooks))
+            if workers > 1:
+                GLib.idle_add(self.main_window.logger.log_message,
+                              f"Running up to {workers} playbooks in parallel (critical path {plan.critical_path():.0f} of {total_weight:.0f} tasks)")
+                result = PlaybookScheduler(plan, workers, chains).run(
+                    lambda playbooks: self._run_serial(playbooks, started, finished, on_event, tagged=True))
+                failed_playbook = result.failed[0] if result.failed else None
+                if result.not_run:
+                    GLib.idle_add(self.main_window.logger.log_message,
+                                  "Not run: " + ", ".join(playbook['name'] for playbook in result.not_run))
+            else:
+                order = plan.serial_order()
+                completed = self._run_serial(order, started, finished, on_event)
+                failed_playbook = order[completed] if completed < len(order) else None
+
+            if failed_playbook is not None:
+                GLib.idle_add(self.main_window.logger.log_message, f"Failed to install {failed_playbook['name']}")
+                GLib.idle_add(self.main_window.status_label.set_text, f"Failed to install {failed_playbook['name']}")
+                GLib.idle_add(self.main_window.show_error_dialog, f"Failed to install {failed_playbook['name']}")
+                return
                     
             GLib.idle_add(self.main_window.progress_bar.set_fraction, 1.0)
             GLib.idle_add(self.main_window.status_label.set_text, "Installation completed successfully!")
@@ -209,5 +643,10 @@ localhost
             GLib.idle_add(self.main_window.status_label.set_text, f"Installation failed: {e}")
             GLib.idle_add(self.main_window.show_error_dialog, f"Installation failed: {e}")
         finally:
+            self.run_settings = None
+            self.run_log_dir = None
+            if self.run_vars_dir is not None:
+                shutil.rmtree(self.run_vars_dir, ignore_errors=True)
+                self.run_vars_dir = None
             GLib.idle_add(self.main_window.install_btn.set_sensitive, True)
-            GLib.idle_add(setattr, self.main_window, 'installation_running', False) 
\ No newline at end of file
+            GLib.idle_add(setattr, self.main_window, 'installation_running', False)
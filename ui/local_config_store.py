@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Local Config Store
+Process-wide cache of the user's local.yml, revalidated against the file's stat
+"""
+
+import os
+import fcntl
+import hashlib
+import fnmatch
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from functions import yaml_io
+
+LOCAL_CONFIG_PATH = Path.home() / ".config/com.crimson.cfg" / "local.yml"
+
+class LocalConfigConflict(Exception):
+    """local.yml changed since the version a compare-and-swap write expected."""
+
+    def __init__(self, expected: Optional[str], actual: Optional[str]):
+        super().__init__(f"local.yml changed (expected version {str(expected)[:12]}, found {str(actual)[:12]})")
+        self.expected = expected
+        self.actual = actual
+
+class LocalConfigStore:
+    """Parses local.yml once and serves reads from memory.
+
+    Every read compares the file's (mtime_ns, size, inode) with the values
+    the cached document was parsed from, so edits made outside the
+    application (text editor, setup scripts) are still picked up. Reads use
+    the fast libyaml loader and return plain dicts; treat them as read-only
+    and change values through set()/update(), which edit the file with
+    ruamel.yaml so comments and formatting survive.
+
+    Components interested in particular settings subscribe() to their keys
+    (exact names or patterns like `chromium_*`). After each write the store
+    compares the old and new documents and calls every subscriber once with
+    just the changed keys it asked for; callbacks run on the writing thread.
+
+    Writes are serialised across processes with an advisory fcntl lock on
+    `local.yml.lock` (the file itself is replaced on every write, so it
+    can't carry the lock). The sha256 of the content is its version:
+    update()/save_text() accept expected_version and raise
+    LocalConfigConflict instead of overwriting a newer file, and modify()
+    retries a read-modify-write until it applies to the current version.
+    """
+
+    def __init__(self, path: Path = LOCAL_CONFIG_PATH, debug: bool = False):
+        self.path = Path(path)
+        self.debug = debug
+        self.parse_count = 0  # Number of times the file was actually parsed
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.digest = None  # sha256 of the file content the cached document came from
+        self._data = None
+        self._stamp = None
+        self._lock = threading.RLock()
+        self._subscribers = {}  # token -> (key patterns, callback)
+        self._file_lock_depth = 0  # flock is per open file, so nested use must not lock again
+        self._next_token = 0
+
+    def _stat_stamp(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Hold the advisory lock shared by every CrimsonCFG process using this file.
+
+        Callers hold self._lock, so only one thread of this process is ever
+        inside; a nested call (e.g. load() during a write) reuses the outer lock.
+        """
+        if self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._file_lock_depth = 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth = 0
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version (content sha256) of the current local.yml, None if it doesn't exist."""
+        with self._lock:
+            self.load()
+            return self.digest
+
+    def snapshot(self) -> tuple:
+        """Return (version, document) read consistently under the shared file lock."""
+        with self._lock, self._file_lock(exclusive=False):
+            data = self.load()
+            return self.digest, data
+
+    def load(self) -> Dict:
+        """Return the parsed local.yml, re-reading it only if the file changed.
+
+        A missing or unparseable file yields an empty map.
+        """
+        with self._lock:
+            stamp = self._stat_stamp()
+            if self._data is not None and stamp == self._stamp:
+                return self._data
+            data, digest = {}, None
+            if stamp is not None:
+                try:
+                    with self._file_lock(exclusive=False):
+                        raw = self.path.read_bytes()
+                        stamp = self._stat_stamp()
+                    digest = hashlib.sha256(raw).hexdigest()
+                    data = yaml_io.load(raw) or {}
+                    self.parse_count += 1
+                    if self.debug:
+                        print(f"LocalConfigStore: Parsed {self.path} (parse #{self.parse_count})")
+                except Exception as e:
+                    print(f"LocalConfigStore: Error loading {self.path}: {e}")
+                    # Don't cache a failed parse; the next read tries again
+                    self._data, self._stamp, self.digest = None, None, None
+                    return data
+            self._data, self._stamp, self.digest = data, stamp, digest
+            return data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.load().get(key, default)
+
+    def set(self, key: str, value: Any):
+        """Set one value and write local.yml."""
+        self.update({key: value})
+
+    def update(self, values: Dict, expected_version: Optional[str] = None):
+        """Set several values and write local.yml once, keeping comments and formatting.
+
+        The values are merged into the file as it is on disk while holding
+        the write lock, so concurrent writers of other keys are not lost.
+        With expected_version, raises LocalConfigConflict if the file is no
+        longer that version.
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            current = self._read_current()
+            self._check_version(expected_version, current)
+            document = yaml_io.load_round_trip(current.decode('utf-8') if current is not None else '{}')
+            for key, value in values.items():
+                document[key] = value
+            changes = self._write_text(yaml_io.dumps_round_trip(document))
+        self._publish(changes)
+
+    def modify(self, func: Callable[[Dict], Optional[Dict]], retries: int = 3) -> bool:
+        """Compare-and-swap read-modify-write.
+
+        func gets the current document and returns the values to set (or
+        None to leave the file alone). If another writer got in between, func
+        is called again on the new version, up to `retries` times. Returns
+        True if values were written.
+        """
+        for attempt in range(retries + 1):
+            version, data = self.snapshot()
+            values = func(data)
+            if not values:
+                return False
+            try:
+                self.update(values, expected_version=version)
+                return True
+            except LocalConfigConflict:
+                if self.debug:
+                    print(f"LocalConfigStore: local.yml changed during update, retrying ({attempt + 1}/{retries})")
+        raise LocalConfigConflict(version, self.version)
+
+    def save_text(self, text: str, expected_version: Optional[str] = None):
+        """Replace local.yml with the given YAML text and cache its parsed content.
+
+        The file is replaced atomically (temp file, fsync, rename), so
+        readers and ansible-playbook never see a half-written local.yml.
+        """
+        with self._lock, self._file_lock(exclusive=True):
+            self._check_version(expected_version, self._read_current())
+            changes = self._write_text(text)
+        self._publish(changes)
+
+    def create(self, text: str) -> bool:
+        """Write local.yml only if it doesn't exist yet; False if another writer created it first."""
+        with self._lock, self._file_lock(exclusive=True):
+            if self.path.exists():
+                return False
+            changes = self._write_text(text)
+        self._publish(changes)
+        return True
+
+    def _read_current(self) -> Optional[bytes]:
+        try:
+            return self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _check_version(self, expected_version: Optional[str], current: Optional[bytes]):
+        if expected_version is None:
+            return
+        actual = hashlib.sha256(current).hexdigest() if current is not None else None
+        if actual != expected_version:
+            raise LocalConfigConflict(expected_version, actual)
+
+    def _write_text(self, text: str) -> Dict:
+        """Write local.yml (caller holds the write lock) and return the changed keys."""
+        old = self.load() if self._subscribers else {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        # It holds passwords: keep the existing file's permissions, owner-only for a new one,
+        # from the moment the temp file exists
+        try:
+            mode = os.stat(self.path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o600
+        try:
+            # Left over from an interrupted write; the write lock is held, so nobody else owns it
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                os.fchmod(f.fileno(), mode)  # the umask may have dropped bits of an existing mode
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+        self._data, self._stamp = yaml_io.load(text) or {}, self._stat_stamp()
+        self.digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if self.debug:
+            print(f"LocalConfigStore: Wrote {self.path}")
+        if not self._subscribers:
+            return {}
+        new = self._data
+        return {key: new.get(key) for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+    def subscribe(self, keys: Iterable[str], callback: Callable[[Dict], None]) -> int:
+        """Call callback(changes) after writes that change any of the given keys.
+
+        keys are top-level local.yml keys or fnmatch patterns (`ssh_*`, `*`).
+        changes maps each matching changed key to its new value (None if it
+        was removed). Returns a token for unsubscribe().
+        """
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (tuple(keys), callback)
+            return self._next_token
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def _publish(self, changes: Dict):
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for patterns, callback in subscribers:
+            matching = {
+                key: value for key, value in changes.items()
+                if any(fnmatch.fnmatchcase(str(key), pattern) for pattern in patterns)
+            }
+            if not matching:
+                continue
+            if self.debug:
+                print(f"LocalConfigStore: Notifying {getattr(callback, '__qualname__', callback)} of {sorted(matching)}")
+            try:
+                callback(matching)
+            except Exception as e:
+                print(f"LocalConfigStore: Error in change subscriber: {e}")
+
+    def invalidate(self):
+        """Forget the cached document; the next read parses the file again."""
+        with self._lock:
+            self._data, self._stamp, self.digest = None, None, None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_local_config_store() -> LocalConfigStore:
+    """Return the process-wide LocalConfigStore."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalConfigStore()
+        return _store
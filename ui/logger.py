@@ -8,6 +8,9 @@ import datetime
 from gi.repository import GLib  # type: ignore
 
 class Logger:
+    # The Logs tab keeps this many lines; older ones are dropped (full output goes to run transcripts)
+    MAX_LINES = 5000
+
     def __init__(self, main_window):
         self.main_window = main_window
         self.debug = main_window.debug
@@ -24,11 +27,25 @@ class Logger:
         if self.debug:
             print(f"LOG: {message}")
     
+    def log_lines(self, lines):
+        """Add a batch of output lines with a single widget update (safe from any thread)"""
+        if not lines:
+            return
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        GLib.idle_add(self._add_log_entry, "".join(f"[{timestamp}] {line}\n" for line in lines))
+        if self.debug:
+            for line in lines:
+                print(f"LOG: {line}")
+
     def _add_log_entry(self, log_entry):
         """Add a log entry to the text buffer (called on main thread)"""
         try:
             # Add to text buffer
-            self.main_window.logs_buffer.insert_at_cursor(log_entry)
+            buffer = self.main_window.logs_buffer
+            buffer.insert(buffer.get_end_iter(), log_entry)
+            excess = buffer.get_line_count() - self.MAX_LINES
+            if excess > 0:
+                buffer.delete(buffer.get_start_iter(), buffer.get_iter_at_line(excess))
             
             # Auto-scroll to bottom
             self.main_window.logs_textview.scroll_to_iter(self.main_window.logs_buffer.get_end_iter(), 0.0, False, 0.0, 0.0)
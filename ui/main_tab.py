@@ -4,7 +4,6 @@ MainTab: Handles the main playbook selection interface
 """
 from gi.repository import Gtk, Gdk
 import os
-import yaml
 from pathlib import Path
 
 class MainTab(Gtk.Box):
@@ -59,29 +58,16 @@ class MainTab(Gtk.Box):
         
         # Category buttons
         self.main_window.category_buttons = {}
+        self.category_box = left_box
+        self.radio_group = None
         categories = list(self.main_window.config["categories"].keys())
         if self.debug:
             print(f"MainTab: Found {len(categories)} categories: {categories}")
         if categories:
             self.main_window.current_category = categories[0]
             
-        # Create radio button group
-        radio_group = None
-        
         for category in categories:
-            cat_info = self.main_window.config["categories"][category]
-            
-            # Category button - first one sets the group, others join it
-            # Display category name in uppercase for better UI presentation
-            display_name = category.upper() if category.startswith("dep:") else category
-            btn = Gtk.RadioButton(label=display_name, group=radio_group)
-            if radio_group is None:
-                radio_group = btn
-            btn.connect("toggled", self.main_window.on_category_changed, category)
-            if category == self.main_window.current_category:
-                btn.set_active(True)
-            left_box.pack_start(btn, False, False, 0)
-            self.main_window.category_buttons[category] = btn
+            self.add_category_button(category)
             
         if self.debug:
             print("MainTab: Creating center panel...")
@@ -107,7 +93,7 @@ class MainTab(Gtk.Box):
         center_background.add(center_box)
         
         # Playbook tree
-        self.main_window.playbook_store = Gtk.ListStore(str, str, str, bool, bool, str, str)  # name, essential, description, selected, disabled, require_config_icon, source
+        self.main_window.playbook_store = Gtk.ListStore(str, str, str, bool, bool, str, str, str, str)  # name, essential, description, selected, disabled, require_config_icon, source, validation_icon, validation_tooltip
         self.main_window.playbook_tree = Gtk.TreeView(model=self.main_window.playbook_store)
         
         # Columns
@@ -144,6 +130,17 @@ class MainTab(Gtk.Box):
         col_icon.set_min_width(80)
         col_icon.set_fixed_width(100)
         self.main_window.playbook_tree.append_column(col_icon)
+
+        # Validation column (background YAML check), details in the row tooltip
+        renderer_valid = Gtk.CellRendererPixbuf()
+        col_valid = Gtk.TreeViewColumn("Check", renderer_valid)
+        col_valid.set_cell_data_func(renderer_valid, lambda col, cell, model, iter, data: cell.set_property('icon-name', model[iter][7] or None))
+        col_valid.set_expand(False)
+        col_valid.set_resizable(True)
+        col_valid.set_min_width(50)
+        col_valid.set_fixed_width(60)
+        self.main_window.playbook_tree.append_column(col_valid)
+        self.main_window.playbook_tree.set_tooltip_column(8)
         
         # Source column
         renderer4 = Gtk.CellRendererText()
@@ -305,4 +302,19 @@ class MainTab(Gtk.Box):
         right_box.pack_start(action_frame, False, False, 0)
         
         if self.debug:
-            print("MainTab: Main tab content built successfully") 
\ No newline at end of file
+            print("MainTab: Main tab content built successfully")
+            
+    def add_category_button(self, category):
+        """Add a radio button for a category (also used when categories appear while scanning)"""
+        # Category button - first one sets the group, others join it
+        # Display category name in uppercase for better UI presentation
+        display_name = category.upper() if category.startswith("dep:") else category
+        btn = Gtk.RadioButton(label=display_name, group=self.radio_group)
+        if self.radio_group is None:
+            self.radio_group = btn
+        btn.connect("toggled", self.main_window.on_category_changed, category)
+        if category == self.main_window.current_category:
+            btn.set_active(True)
+        self.category_box.pack_start(btn, False, False, 0)
+        btn.show()
+        self.main_window.category_buttons[category] = btn 
\ No newline at end of file
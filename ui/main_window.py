@@ -12,36 +12,24 @@ import threading
 from typing import Dict, List
 
 from .auth_manager import AuthManager
-from .config_manager import ConfigManager
 from .gui_builder import GUIBuilder
 from .installer import Installer
 from .logger import Logger
 from .playbook_manager import PlaybookManager
+from .playbook_watcher import PlaybookWatcher
 from . import external_repo_manager
 from .debug_manager import DebugManager
+from .config_session import ConfigSession
+from .settings import Settings
+from .local_config_store import get_local_config_store
+from functions.playbook_scheduler import essential_sort_key
 
 class CrimsonCFGGUI:
-    def __init__(self, application, initial_config=None):
-        # Load debug setting early from user's local.yml and command line arguments
-        self.debug = False
-        try:
-            import yaml
-            from pathlib import Path
-            config_dir = Path.home() / ".config/com.crimson.cfg"
-            local_file = config_dir / "local.yml"
-            if local_file.exists():
-                with open(local_file, 'r') as f:
-                    local_config = yaml.safe_load(f) or {}
-                    self.debug = local_config.get("debug", 0) == 1
-            
-            # Override with command line debug setting if present
-            if initial_config and 'settings' in initial_config:
-                cmdline_debug = initial_config['settings'].get('debug', 0)
-                if cmdline_debug == 1:
-                    self.debug = True
-        except Exception as e:
-            # We'll use DebugManager later when it's available
-            self.debug = False
+    def __init__(self, application, session=None):
+        # The startup config session (local.yml debug setting plus --debug)
+        self.session = session if session is not None else ConfigSession()
+        initial_config = self.session.config
+        self.debug = self.session.debug
             
         # Create debug manager
         self.debug_manager = DebugManager()
@@ -86,20 +74,13 @@ class CrimsonCFGGUI:
         style_context = self.window.get_style_context()
         style_context.add_class("main-window")
         
-        # Initialize managers first
-        self.config_manager = ConfigManager()
+        # Initialize managers first; config and ConfigManager come from the session
+        self.config_manager = self.session.config_manager
+        # Subscribed before the other managers so they see the reloaded config when notified
+        get_local_config_store().subscribe(["*"], self._on_local_config_changed)
         self.config_manager.debug = self.debug  # Set debug in config manager
-        
-        # Load config
-        if self.debug:
-            self.debug_manager.print("Loading config...")
-        self.config = self.config_manager.load_config()
         if self.debug:
-            self.debug_manager.print(f"Config loaded: {len(self.config.get('categories', {}))} categories")
-            self.debug_manager.print("Config loading completed")
-        
-        # Keep debug setting from early load (don't override it)
-        self.config_manager.debug = self.debug  # Ensure debug flag is consistent
+            self.debug_manager.print(f"Config from session: {len(self.config.get('categories', {}))} categories")
         
         # Initialize remaining managers (after debug is set)
         self.auth_manager = AuthManager(self, on_success=self.on_auth_success)
@@ -112,14 +93,17 @@ class CrimsonCFGGUI:
         if self.debug:
             self.debug_manager.print("All managers initialized")
         # Variables (after config is loaded)
-        self.user = self.config.get("settings", {}).get("default_user", "user")
-        self.user_home = f"/home/{self.user}"
-        self.working_directory = self.config.get("settings", {}).get("working_directory", "/opt/CrimsonCFG")
-        if "{{ user_home }}" in self.working_directory:
-            self.working_directory = self.working_directory.replace("{{ user_home }}", self.user_home)
+        self.user = self.settings.system_user
+        self.user_home = self.settings.user_home
+        self.working_directory = self.settings.working_directory
         self.inventory_file = f"{self.working_directory}/hosts.ini"
         self.selected_playbooks = set()
         self.installation_running = False
+        self.playbook_watcher = None
+        self.config_tab = None
+        self.current_category = None
+        # Set by AuthManager on first run (no gui_config.json yet): the catalog is streamed in after the UI is shown
+        self.stream_catalog_on_start = False
         
         if self.debug:
             self.debug_manager.print("About to show main interface")
@@ -144,16 +128,11 @@ class CrimsonCFGGUI:
         if self.debug:
             self.debug_manager.print("Setting application icon...")
         
-        # Get app name and subtitle from initial config
-        app_name = 'CrimsonCFG'
-        app_subtitle = 'System Configuration Manager'
-        app_logo = None
-        
-        if self.initial_config and 'local_config' in self.initial_config:
-            local_config = self.initial_config['local_config']
-            app_name = local_config.get('app_name', 'CrimsonCFG')
-            app_subtitle = local_config.get('app_subtitle', 'System Configuration Manager')
-            app_logo = local_config.get('app_logo', None)
+        # Get app name and subtitle from the startup settings
+        branding = self.settings.branding
+        app_name = branding.app_name
+        app_subtitle = branding.app_subtitle
+        app_logo = branding.app_logo
         
         self.window.set_title(f"{app_name} - {app_subtitle}")
         
@@ -168,9 +147,7 @@ class CrimsonCFGGUI:
             icon_set = True
         else:
             # Get working directory from template config
-            working_dir = "/opt/CrimsonCFG"  # Default fallback
-            if self.initial_config and 'settings' in self.initial_config:
-                working_dir = self.initial_config['settings'].get('working_directory', '/opt/CrimsonCFG')
+            working_dir = self.settings.working_directory
             
             if self.debug:
                 self.debug_manager.print(f"Using working directory from template: {working_dir}")
@@ -218,9 +195,35 @@ class CrimsonCFGGUI:
         """Handle window destroy event"""
         if self.debug:
             self.debug_manager.print("Window destroy event received")
+        if self.playbook_watcher is not None:
+            self.playbook_watcher.stop()
+        # Don't lose edits still waiting for the write-behind timer
+        if self.config_tab is not None:
+            self.config_tab.flush_config_values()
         # Signal the application to quit
         self.application.quit()
         
+    def _on_local_config_changed(self, changes: Dict):
+        """local.yml was written: the session config is rebuilt on its next use"""
+        self.session.invalidate()
+        if "working_directory" in changes:
+            self.working_directory = self.settings.working_directory
+            self.inventory_file = f"{self.working_directory}/hosts.ini"
+
+    @property
+    def settings(self) -> Settings:
+        """Typed, immutable settings of the session config"""
+        return self.session.settings
+
+    @property
+    def config(self) -> Dict:
+        """The session config; assigning a freshly loaded config makes it the session config"""
+        return self.session.config
+
+    @config.setter
+    def config(self, value: Dict):
+        self.session.adopt(value)
+
     def run(self):
         """Show the window and start the main loop"""
         # The window is already shown in __init__, and the application manages the main loop
@@ -303,17 +306,9 @@ class CrimsonCFGGUI:
             warning_dialog.destroy()
             return
 
-        # --- ENFORCE BASICS ORDER ---
-        def playbook_sort_key(pb):
-            # Basics essential playbooks: sort by essential_order (as int, fallback to 999)
-            if pb["category"].lower() == "basics" and pb.get("essential", False):
-                try:
-                    return (0, int(pb.get("essential_order", 999)))
-                except Exception:
-                    return (0, 999)
-            # All others after
-            return (1, 0)
-        selected_sorted = sorted(selected, key=playbook_sort_key)
+        # --- ENFORCE ESSENTIALS ORDER ---
+        # Essentials first by essential_order; the installer schedules the rest by their headers
+        selected_sorted = sorted(selected, key=essential_sort_key)
 
         # Switch to logs tab to show installation progress
         if self.gui_builder.notebook is not None:
@@ -329,10 +324,15 @@ class CrimsonCFGGUI:
             self.logger.log_message(f"  • {display_category}: {playbook['name']}{essential_mark}")
         self.logger.log_message("=== BEGINNING INSTALLATION ===")
         
+        # Playbooks read local.yml, so write any edits still being debounced first
+        if self.config_tab is not None:
+            self.config_tab.flush_config_values()
+        
         # Start installation in a separate thread
         self.installation_running = True
         self.install_btn.set_sensitive(False)  # type: ignore
-        thread = threading.Thread(target=self.installer.run_installation, args=(selected_sorted,))
+        # The installer thread works from an immutable settings snapshot taken here
+        thread = threading.Thread(target=self.installer.run_installation, args=(selected_sorted, self.settings))
         thread.daemon = True
         thread.start()
         
@@ -396,10 +396,20 @@ class CrimsonCFGGUI:
                     self.debug_manager.print("Failed to update external repository")
                 return
             
-            # Regenerate config and update playbook list
-            self.config_manager.regenerate_gui_config()
-            self.config = self.config_manager.load_config()
+            # Update config from the repo delta and refresh playbook list
+            config = self.config_manager.regenerate_gui_config(
+                external_changes=external_repo_manager.get_last_sync_changes())
+            if config is not None:
+                self.config = config
+            # The sync may have added or removed required templates and files
+            self.playbook_manager.refresh_requirement_files(update_list=False)
+            if not self.config_manager.catalog_changed():
+                # gui_config.json is unchanged, only re-render the requirement icons
+                self.update_playbook_list()
+                self.status_label.set_text("Playbooks are already up to date.")
+                return
             self.update_playbook_list()
+            self.playbook_manager.start_validation()
             
             # Show success message
             self.status_label.set_text("Playbooks updated successfully!")
@@ -415,6 +425,14 @@ class CrimsonCFGGUI:
 
  
 
+    def _on_catalog_streamed(self):
+        """Write gui_config.json once the first-run playbook stream has finished"""
+        config = self.config_manager.regenerate_gui_config()
+        if config is not None:
+            self.config = config
+        self.select_essential_playbooks()
+        self.playbook_manager.start_validation()
+
     def on_auth_success(self):
         # Check and create admin password if needed
         self.auth_manager.check_and_create_admin_password()
@@ -426,12 +444,31 @@ class CrimsonCFGGUI:
             external_repo_manager.update_external_repo_sync(self.sudo_password, self.logger)
             if self.debug:
                 self.debug_manager.print("[DEBUG] External repository updated successfully")
+            # The catalog was built before the sync, so apply whatever it changed
+            changes = external_repo_manager.get_last_sync_changes()
+            self.playbook_manager.refresh_requirement_files(update_list=False)
+            if changes and not self.stream_catalog_on_start:
+                config = self.config_manager.regenerate_gui_config(external_changes=changes)
+                if config is not None:
+                    self.config = config
         except Exception as e:
             if self.debug:
                 self.debug_manager.print(f"[DEBUG] Error updating external repository: {e}")
         
         self.gui_builder.show_main_interface()
         
+        if self.stream_catalog_on_start:
+            self.stream_catalog_on_start = False
+            self.playbook_manager.stream_playbooks(self.config_manager.iter_playbooks(), on_done=self._on_catalog_streamed)
+        else:
+            # Full YAML check of every playbook in the background
+            self.playbook_manager.start_validation()
+        
+        # Hot-update the playbook list when playbook files change on disk
+        if self.playbook_watcher is None:
+            self.playbook_watcher = PlaybookWatcher(self)
+            self.playbook_watcher.start()
+        
         # Refresh System tab button states after authentication
         if hasattr(self, 'system_tab'):
             self.system_tab.refresh_button_states() 
\ No newline at end of file
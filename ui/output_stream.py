@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Output Stream
+Runs a command and streams its output in batches, keeping only a bounded tail in memory
+"""
+
+import os
+import json
+import time
+import selectors
+import subprocess
+from collections import deque, namedtuple
+from typing import Callable, List, Optional
+
+StreamResult = namedtuple("StreamResult", ["returncode", "tail", "transcript_path"])
+
+# Environment variable telling the child which file descriptor to write JSON events to
+EVENTS_FD_ENV = "CRIMSONCFG_EVENTS_FD"
+
+class StreamingExecutor:
+    """Streams a child process' combined stdout/stderr line by line.
+
+    The pipe is read without blocking the batch timer (selectors), lines are
+    handed to on_lines in batches of at most batch_lines or every
+    batch_interval seconds, the complete output goes to a transcript file and
+    only the last tail_lines lines are kept in memory for error reporting.
+    Call run() from a worker thread; on_lines runs on that thread too.
+    """
+
+    def __init__(self, tail_lines: int = 200, batch_lines: int = 50, batch_interval: float = 0.25):
+        self.tail_lines = tail_lines
+        self.batch_lines = batch_lines
+        self.batch_interval = batch_interval
+
+    def run(self, cmd: List[str], on_lines: Callable[[List[str]], None], env: Optional[dict] = None,
+            cwd: Optional[str] = None, transcript_path: Optional[str] = None,
+            on_event: Optional[Callable[[dict], None]] = None) -> StreamResult:
+        """Run cmd to completion; with on_event, also read JSON events from a pipe.
+
+        The write end of the event pipe is passed to the child and its number
+        exported as CRIMSONCFG_EVENTS_FD; every line written to it is parsed
+        as JSON and handed to on_event as soon as it arrives.
+        """
+        env = dict(env if env is not None else os.environ)
+        # Python (and so Ansible) block-buffers a pipe; ask it to flush every line
+        env.setdefault("PYTHONUNBUFFERED", "1")
+        tail = deque(maxlen=self.tail_lines)
+        batch = []
+        transcript = None
+        event_read = event_write = None
+        if transcript_path:
+            # Playbook output can contain secrets: readable by the user only
+            transcript = os.fdopen(os.open(transcript_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+                                   "w", encoding="utf-8")
+        try:
+            pass_fds = ()
+            if on_event is not None:
+                event_read, event_write = os.pipe()
+                env[EVENTS_FD_ENV] = str(event_write)
+                pass_fds = (event_write,)
+            try:
+                proc = subprocess.Popen(cmd, env=env, cwd=cwd, stdin=subprocess.DEVNULL, pass_fds=pass_fds,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            finally:
+                if event_write is not None:
+                    # Only the child writes; EOF arrives when it exits
+                    os.close(event_write)
+            fd = proc.stdout.fileno()
+            selector = selectors.DefaultSelector()
+            pending = {}
+            for stream_fd in (fd, event_read):
+                if stream_fd is not None:
+                    os.set_blocking(stream_fd, False)
+                    selector.register(stream_fd, selectors.EVENT_READ)
+                    pending[stream_fd] = b""
+            last_flush = time.monotonic()
+
+            def flush():
+                nonlocal batch, last_flush
+                if batch:
+                    on_lines(batch)
+                    batch = []
+                last_flush = time.monotonic()
+
+            def take(raw: bytes):
+                line = raw.decode("utf-8", errors="replace").rstrip("\r")
+                tail.append(line)
+                batch.append(line)
+                if transcript:
+                    transcript.write(line + "\n")
+
+            def take_event(raw: bytes):
+                if not raw.strip():
+                    return
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    return
+                if isinstance(event, dict):
+                    # Text written before the event belongs before it in the Logs tab
+                    flush()
+                    on_event(event)
+
+            try:
+                while pending:
+                    for key, _ in selector.select(timeout=self.batch_interval):
+                        stream_fd = key.fd
+                        handle = take if stream_fd == fd else take_event
+                        try:
+                            chunk = os.read(stream_fd, 65536)
+                        except BlockingIOError:
+                            continue
+                        if chunk == b"":
+                            # EOF
+                            if pending[stream_fd]:
+                                handle(pending[stream_fd])
+                            selector.unregister(stream_fd)
+                            del pending[stream_fd]
+                            continue
+                        *lines, pending[stream_fd] = (pending[stream_fd] + chunk).split(b"\n")
+                        for raw in lines:
+                            handle(raw)
+                            if len(batch) >= self.batch_lines:
+                                flush()
+                    if batch and time.monotonic() - last_flush >= self.batch_interval:
+                        flush()
+                flush()
+            finally:
+                selector.close()
+                proc.stdout.close()
+                if event_read is not None:
+                    os.close(event_read)
+                returncode = proc.wait()
+        finally:
+            if transcript:
+                transcript.close()
+        return StreamResult(returncode, list(tail), transcript_path)
@@ -6,57 +6,47 @@ Handles playbook selection and management logic
 
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk  # type: ignore
-from typing import Dict, List
+from gi.repository import Gtk, Gdk, GLib  # type: ignore
+from typing import Dict, List, Optional
+import os
 import json
+import threading
 from pathlib import Path
 
+from . import external_repo_manager
+from .local_config_store import get_local_config_store
+from .requirement_evaluator import RequirementEvaluator
+
+try:
+    from functions.playbook_validator import PlaybookValidator, VALIDATION_FILENAME, VERDICT_INVALID, VERDICT_WARNING, describe
+    from functions.playbook_catalog import PlaybookCatalog
+except ImportError:
+    PlaybookValidator = None
+
 class PlaybookManager:
     def __init__(self, main_window):
         self.main_window = main_window
         self.debug = main_window.debug
-        
-    def _check_playbook_requirements(self, playbook_name: str, local_config: Dict) -> tuple[bool, str]:
-        """
-        Check if a playbook's requirements are met.
-        Returns (requirements_met, icon_name)
-        """
-        # Define requirements for each playbook
-        requirements_map = {
-            "SSH Key": {
-                "variables": ["ssh_private_key_content", "ssh_public_key_content"],
-                "check": lambda config: (config.get("ssh_private_key_content", "") and 
-                                       config.get("ssh_public_key_content", ""))
-            },
-            "Set GNOME Wallpaper": {
-                "variables": ["gnome_background_image"],
-                "check": lambda config: config.get("gnome_background_image", "")
-            },
-            "Set GNOME Theme": {
-                "variables": ["theme_mode"],
-                "check": lambda config: config.get("theme_mode", "") in ["light", "dark"]
-            },
-            "Chromium": {
-                "variables": ["chromium_homepage_url", "chromium_profile1_name"],
-                "check": lambda config: (
-                    config.get("chromium_homepage_url", "") and 
-                    config.get("chromium_profile1_name", "") and
-                    self._check_chromium_files_exist()
-                )
-            }
-        }
-        
-        if playbook_name not in requirements_map:
-            return True, 'emblem-ok-symbolic'  # No requirements, always available
-            
-        requirement = requirements_map[playbook_name]
-        requirements_met = requirement["check"](local_config)
-        
-        if requirements_met:
-            return True, 'emblem-ok-symbolic'
-        else:
-            return False, 'process-stop-symbolic'
-        
+        self.requirements = RequirementEvaluator(self.debug)
+        self.validation = {}  # (source, path) -> PlaybookValidator result
+        self._validation_thread = None
+        self._validation_pending = False
+        get_local_config_store().subscribe(["*"], self._on_local_config_changed)
+
+    def _on_local_config_changed(self, changes: Dict):
+        """Rebuild the list only if a variable some playbook requires changed"""
+        watched = self.requirements.watched_vars()
+        if watched.intersection(changes):
+            if self.debug:
+                print(f"PlaybookManager: Requirement vars changed: {sorted(watched.intersection(changes))}")
+            self.update_playbook_list()
+
+    def refresh_requirement_files(self, update_list: bool = True):
+        """Re-check CrimsonCFG-Requires-Files after a sync, refresh or watched change"""
+        self.requirements.invalidate_files()
+        if update_list:
+            self.update_playbook_list()
+
     def on_category_changed(self, button, category):
         """Handle category selection change"""
         if button.get_active():
@@ -68,68 +58,291 @@ class PlaybookManager:
         # Clear existing items
         self.main_window.playbook_store.clear()
         
-        if self.main_window.current_category not in self.main_window.config["categories"]:
+        if self.main_window.current_category is None or self.main_window.current_category not in self.main_window.config["categories"]:
             return
             
         cat_info = self.main_window.config["categories"][self.main_window.current_category]
         # Load local.yml config for checking required vars
-        from ruamel.yaml import YAML
-        from pathlib import Path
-        config_dir = Path.home() / ".config/com.crimson.cfg"
-        local_file = config_dir / "local.yml"
-        local_config = {}
-        if local_file.exists():
-            with open(local_file, 'r') as f:
-                local_config = YAML().load(f) or {}
+        local_config = self._load_local_config()
         
         # Sort playbooks alphabetically by name
         sorted_playbooks = sorted(cat_info["playbooks"], key=lambda x: x["name"].lower())
+        # Evaluate requirements once; only entries whose vars changed are re-checked
+        self.requirements.evaluate(sorted_playbooks, local_config)
         
         for playbook in sorted_playbooks:
-            # Parse CrimsonCFG-RequiredVars from playbook YAML header if not already set
-            if "required_vars" not in playbook:
-                playbook_path = playbook.get("path")
-                if playbook_path:
-                    try:
-                        with open(playbook_path, "r") as f:
-                            for _ in range(10):  # Only check first 10 lines
-                                line = f.readline()
-                                if not line or line.strip() == "---":
-                                    break
-                                if line.strip().startswith("# CrimsonCFG-RequiredVars:"):
-                                    value = line.split(":", 1)[1].strip().lower()
-                                    playbook["required_vars"] = value == "true"
-                                    break
-                    except Exception:
-                        pass
-            essential = "✓" if playbook.get("essential", False) else ""
-            description = playbook.get("description", "")
-            playbook_key = f"{self.main_window.current_category}:{playbook['name']}"
-            selected = playbook_key in self.main_window.selected_playbooks
-            # Check if playbook should be disabled
-            disabled = False
-            require_config_icon = ''
-            if playbook.get("required_vars", False):
-                # Check specific requirements for this playbook
-                requirements_met, icon = self._check_playbook_requirements(playbook['name'], local_config)
-                if not requirements_met:
-                    disabled = True
-                    selected = False
-                    require_config_icon = icon
-                else:
-                    require_config_icon = icon
-            # Get source information (default to "Built-in" if not specified)
-            source = playbook.get("source", "Built-in")
+            self.main_window.playbook_store.append(self._build_playbook_row(playbook, local_config))
             
-            self.main_window.playbook_store.append([
-                playbook["name"],
-                essential,
-                description,
-                selected,
-                disabled,
-                require_config_icon,
-                source
-            ])
+    def _build_playbook_row(self, playbook: Dict, local_config: Dict) -> list:
+        """Build the playbook_store row for one playbook of the current category"""
+        # Parse CrimsonCFG-RequiredVars from playbook YAML header if not already set
+        if "required_vars" not in playbook:
+            playbook_path = playbook.get("path")
+            if playbook_path:
+                try:
+                    with open(playbook_path, "r") as f:
+                        for _ in range(10):  # Only check first 10 lines
+                            line = f.readline()
+                            if not line or line.strip() == "---":
+                                break
+                            if line.strip().startswith("# CrimsonCFG-RequiredVars:"):
+                                value = line.split(":", 1)[1].strip().lower()
+                                playbook["required_vars"] = value == "true"
+                                break
+                except Exception:
+                    pass
+        essential = "✓" if playbook.get("essential", False) else ""
+        description = playbook.get("description", "")
+        playbook_key = f"{self.main_window.current_category}:{playbook['name']}"
+        selected = playbook_key in self.main_window.selected_playbooks
+        # Check if playbook should be disabled
+        disabled = False
+        require_config_icon = ''
+        status = self.requirements.status(playbook, local_config)
+        if status is not None:
+            requirements_met, require_config_icon = status
+            if not requirements_met:
+                disabled = True
+                selected = False
+        # Flag playbooks the background validator found broken
+        validation_icon, validation_tooltip = self._validation_status(playbook)
+        if validation_icon == 'dialog-error-symbolic':
+            disabled = True
+            selected = False
+        # Get source information (default to "Built-in" if not specified)
+        source = playbook.get("source", "Built-in")
+        
+        return [
+            playbook["name"],
+            essential,
+            description,
+            selected,
+            disabled,
+            require_config_icon,
+            source,
+            validation_icon,
+            validation_tooltip
+        ]
+
+    def _validation_status(self, playbook: Dict):
+        """Return (icon_name, tooltip) for a playbook's validation result"""
+        result = self.validation.get((playbook.get("source", "Built-in"), playbook.get("path")))
+        if result is None:
+            return '', None
+        # The tooltip column is rendered as Pango markup
+        tooltip = GLib.markup_escape_text(describe(result))
+        if result["verdict"] == VERDICT_INVALID:
+            return 'dialog-error-symbolic', tooltip
+        if result["verdict"] == VERDICT_WARNING:
+            return 'dialog-warning-symbolic', tooltip
+        return '', tooltip
+
+    def _playbook_files(self, playbook: Dict):
+        """Return (absolute playbook path, templates directory) of a catalog entry"""
+        if playbook.get("source") == "External":
+            root = external_repo_manager.get_external_playbooks_path()
+        else:
+            root = "."
+        path = playbook["path"]
+        if not os.path.isabs(path):
+            path = os.path.join(root, path)
+        return os.path.abspath(path), os.path.join(root, "templates")
+
+    @staticmethod
+    def _catalog_paths(categories):
+        """(source, path) of every catalog playbook.
+
+        The SQLite catalog is queried on its own connection, so the lazy
+        category mapping of the GUI stays limited to the categories shown.
+        """
+        if hasattr(categories, "catalog"):
+            catalog = PlaybookCatalog(str(categories.catalog.path))
+            try:
+                return catalog.playbook_paths()
+            finally:
+                catalog.close()
+        return [(playbook.get("source", "Built-in"), playbook.get("path"))
+                for category in list(categories) for playbook in categories[category]["playbooks"]]
+
+    def catalog_files(self) -> List[str]:
+        """Absolute paths of every catalog playbook"""
+        return [self._playbook_files({"source": source, "path": path})[0]
+                for source, path in self._catalog_paths(self.main_window.config["categories"]) if path]
+
+    def start_validation(self):
+        """Validate every catalog playbook in the background and flag the results in the list.
+
+        Full YAML parsing runs in a process pool; unchanged playbooks are
+        answered from the content hash cache. A request while a run is in
+        progress is queued and runs once the current one has finished.
+        """
+        if PlaybookValidator is None:
+            return
+        if self._validation_thread is not None and self._validation_thread.is_alive():
+            self._validation_pending = True
+            return
+        self._validation_pending = False
+        categories = self.main_window.config["categories"]
+        cache_path = Path.home() / ".config/com.crimson.cfg" / VALIDATION_FILENAME
+
+        def run():
+            try:
+                playbooks = {}
+                for source, path in self._catalog_paths(categories):
+                    if path:
+                        playbooks[(source, path)] = self._playbook_files({"source": source, "path": path})
+                validator = PlaybookValidator(str(cache_path), self.debug)
+                results = validator.validate(playbooks.values())
+                validation = {key: results[files[0]] for key, files in playbooks.items() if files[0] in results}
+            except Exception as e:
+                print(f"PlaybookManager: Playbook validation failed: {e}")
+                validation = None
+            GLib.idle_add(self._apply_validation, validation)
+
+        self._validation_thread = threading.Thread(target=run, daemon=True)
+        self._validation_thread.start()
+
+    def _apply_validation(self, validation: Optional[Dict]):
+        """Store validation results and update the affected rows in place"""
+        if validation is not None:
+            self.validation = validation
+            invalid = [key for key, result in validation.items() if result["verdict"] == VERDICT_INVALID]
+            if invalid:
+                self.main_window.logger.log_message(f"Playbook validation: {len(invalid)} invalid playbook(s)")
+                for source, path in invalid:
+                    self.main_window.logger.log_message(f"  {path} ({source}): {validation[(source, path)]['error']}")
+            store = self.main_window.playbook_store
+            category = self.main_window.current_category
+            selection_changed = False
+            treeiter = store.get_iter_first()
+            while treeiter is not None:
+                playbook = self._find_playbook(category, store[treeiter][0])
+                if playbook is not None:
+                    icon, tooltip = self._validation_status(playbook)
+                    store[treeiter][7] = icon
+                    store[treeiter][8] = tooltip
+                    if icon == 'dialog-error-symbolic':
+                        store[treeiter][4] = True
+                        store[treeiter][3] = False
+                        selection_changed |= f"{category}:{playbook['name']}" in self.main_window.selected_playbooks
+                        self.main_window.selected_playbooks.discard(f"{category}:{playbook['name']}")
+                treeiter = store.iter_next(treeiter)
+            if selection_changed:
+                self.update_selected_display()
+        if self._validation_pending:
+            self.start_validation()
+        return False
+
+    def analysis(self, playbook: Dict) -> Optional[Dict]:
+        """Return the background validation result of a playbook, or None if it is not known yet"""
+        return self.validation.get((playbook.get("source", "Built-in"), playbook.get("path")))
+
+    def task_count(self, playbook: Dict) -> Optional[int]:
+        """Return the validated task count of a playbook, or None if it is not known yet"""
+        result = self.analysis(playbook)
+        return result["task_count"] if result and result["valid"] else None
+        
+    def apply_catalog_changes(self, changes):
+        """Apply incremental catalog changes to playbook_store row by row.
+
+        `changes` is a list of CatalogChange(old_category, old, new_category, new)
+        from the scanner. Only rows of the current category are touched; a
+        full update_playbook_list() is not needed.
+        """
+        store = self.main_window.playbook_store
+        current = getattr(self.main_window, 'current_category', None)
+        local_config = None
+        selection_changed = False
+        for change in changes:
+            if change.old is not None and change.old_category == current:
+                treeiter = self._find_playbook_row(change.old["name"], change.old.get("source", "Built-in"))
+                if treeiter is not None:
+                    store.remove(treeiter)
+            if change.old is not None and (change.new is None or change.new["name"] != change.old["name"]
+                                           or change.new_category != change.old_category):
+                # Entry is gone under its old key, so it can't stay selected
+                old_key = f"{change.old_category}:{change.old['name']}"
+                if old_key in self.main_window.selected_playbooks:
+                    self.main_window.selected_playbooks.discard(old_key)
+                    selection_changed = True
+            if change.new is not None and change.new_category == current:
+                if local_config is None:
+                    local_config = self._load_local_config()
+                self._insert_playbook_row(self._build_playbook_row(change.new, local_config))
+            if self.debug:
+                name = (change.new or change.old)["name"]
+                print(f"PlaybookManager: Applied catalog change for {name}")
+        if selection_changed:
+            self.update_selected_display()
+
+    def _insert_playbook_row(self, row: list):
+        """Insert a row keeping the list sorted alphabetically by name"""
+        store = self.main_window.playbook_store
+        treeiter = store.get_iter_first()
+        while treeiter is not None and store[treeiter][0].lower() <= row[0].lower():
+            treeiter = store.iter_next(treeiter)
+        if treeiter is None:
+            store.append(row)
+        else:
+            store.insert_before(treeiter, row)
+
+    def stream_playbooks(self, records, on_done=None, batch_size=25):
+        """Fill the catalog and playbook list from a PlaybookRecord iterator while it is scanned.
+
+        Records are consumed in small batches from the GTK main loop, so the
+        first category is usable before the whole tree has been walked. The
+        streamed categories are kept on the session, so a config reload
+        (any local.yml write) while streaming keeps them.
+        """
+        from functions.playbook_scanner import category_description  # type: ignore
+        session = self.main_window.session
+        categories = self.main_window.config["categories"]
+        session.streamed_categories = categories
+        local_config = self._load_local_config()
+
+        def consume():
+            for _ in range(batch_size):
+                record = next(records, None)
+                if record is None:
+                    if self.debug:
+                        print("PlaybookManager: Playbook stream finished")
+                    # The regenerated catalog takes over from here
+                    session.streamed_categories = None
+                    if on_done:
+                        on_done()
+                    return False
+                if record.category not in categories:
+                    categories[record.category] = {
+                        "description": category_description(record.category, record.department),
+                        "playbooks": []
+                    }
+                    if self.main_window.current_category is None:
+                        self.main_window.current_category = record.category
+                    self.main_window.main_tab.add_category_button(record.category)
+                categories[record.category]["playbooks"].append(record.meta)
+                if record.category == self.main_window.current_category:
+                    self._insert_playbook_row(self._build_playbook_row(record.meta, local_config))
+            return True
+
+        GLib.idle_add(consume)
+
+    def _find_playbook_row(self, name: str, source: str):
+        """Return the playbook_store iter for a playbook name from a source, or None
+
+        Built-in and external playbooks may share a display name, so the
+        source column must match as well.
+        """
+        store = self.main_window.playbook_store
+        treeiter = store.get_iter_first()
+        while treeiter is not None:
+            if store[treeiter][0] == name and store[treeiter][6] == source:
+                return treeiter
+            treeiter = store.iter_next(treeiter)
+        return None
+
+    def _load_local_config(self) -> Dict:
+        """Load local.yml for checking required vars"""
+        return get_local_config_store().load()
             
     def on_playbook_selection_changed(self, selection):
         """Handle playbook selection change (single click - just highlight)"""
@@ -196,11 +409,10 @@ class PlaybookManager:
     def select_essential_playbooks(self):
         """Automatically select all essential playbooks across all categories that are not already installed."""
         installed = self._get_installed_playbooks()
-        for category, cat_info in self.main_window.config["categories"].items():
-            for playbook in cat_info["playbooks"]:
-                if playbook.get("essential", False) and playbook["name"] not in installed:
-                    playbook_key = f"{category}:{playbook['name']}"
-                    self.main_window.selected_playbooks.add(playbook_key)
+        for category, playbook in self._essential_playbooks():
+            if playbook["name"] not in installed:
+                playbook_key = f"{category}:{playbook['name']}"
+                self.main_window.selected_playbooks.add(playbook_key)
         self.update_playbook_list()
         self.update_selected_display()
         
@@ -221,11 +433,9 @@ class PlaybookManager:
         
         if response == Gtk.ResponseType.YES:
             # Remove all essential playbooks
-            for category, cat_info in self.main_window.config["categories"].items():
-                for playbook in cat_info["playbooks"]:
-                    if playbook.get("essential", False):
-                        playbook_key = f"{category}:{playbook['name']}"
-                        self.main_window.selected_playbooks.discard(playbook_key)
+            for category, playbook in self._essential_playbooks():
+                playbook_key = f"{category}:{playbook['name']}"
+                self.main_window.selected_playbooks.discard(playbook_key)
                         
             self.update_playbook_list()
             self.update_selected_display()
@@ -233,11 +443,10 @@ class PlaybookManager:
     def select_essential(self, button):
         """Select all essential playbooks across all categories that are not already installed."""
         installed = self._get_installed_playbooks()
-        for category, cat_info in self.main_window.config["categories"].items():
-            for playbook in cat_info["playbooks"]:
-                if playbook.get("essential", False) and playbook["name"] not in installed:
-                    playbook_key = f"{category}:{playbook['name']}"
-                    self.main_window.selected_playbooks.add(playbook_key)
+        for category, playbook in self._essential_playbooks():
+            if playbook["name"] not in installed:
+                playbook_key = f"{category}:{playbook['name']}"
+                self.main_window.selected_playbooks.add(playbook_key)
         self.update_playbook_list()
         self.update_selected_display()
         
@@ -247,11 +456,9 @@ class PlaybookManager:
         playbooks_to_remove = set()
         for playbook_key in self.main_window.selected_playbooks:
             category, name = playbook_key.split(":", 1)
-            if category in self.main_window.config["categories"]:
-                for playbook in self.main_window.config["categories"][category]["playbooks"]:
-                    if playbook["name"] == name and not playbook.get("essential", False):
-                        playbooks_to_remove.add(playbook_key)
-                        break
+            playbook = self._find_playbook(category, name)
+            if playbook is not None and not playbook.get("essential", False):
+                playbooks_to_remove.add(playbook_key)
         
         # Remove non-essential playbooks
         for playbook_key in playbooks_to_remove:
@@ -288,12 +495,8 @@ class PlaybookManager:
             playbook_key = f"{category}:{name}"
             
             # Check if this is an essential playbook
-            is_essential = False
-            if category in self.main_window.config["categories"]:
-                for playbook in self.main_window.config["categories"][category]["playbooks"]:
-                    if playbook["name"] == name and playbook.get("essential", False):
-                        is_essential = True
-                        break
+            playbook = self._find_playbook(category, name)
+            is_essential = playbook is not None and playbook.get("essential", False)
             
             # Only allow removal of non-essential playbooks
             if not is_essential:
@@ -306,48 +509,48 @@ class PlaybookManager:
         selected = []
         for playbook_key in self.main_window.selected_playbooks:
             category, name = playbook_key.split(":", 1)
-            if category in self.main_window.config["categories"]:
-                for playbook in self.main_window.config["categories"][category]["playbooks"]:
-                    if playbook["name"] == name:
-                        # Try to get essential_order from playbook metadata, default to None
-                        essential_order = playbook.get("essential_order")
-                        # Also support YAML comment key if present
-                        if essential_order is None:
-                            # Try alternate keys for compatibility
-                            essential_order = playbook.get("essential-order") or playbook.get("order")
-                        selected.append({
-                            "category": category,
-                            "name": playbook["name"],
-                            "path": playbook["path"],
-                            "description": playbook.get("description", ""),
-                            "essential": playbook.get("essential", False),
-                            "essential_order": essential_order,
-                            "source": playbook.get("source", "Built-in")
-                        })
-                        break
+            playbook = self._find_playbook(category, name)
+            if playbook is not None:
+                # Try to get essential_order from playbook metadata, default to None
+                essential_order = playbook.get("essential_order")
+                # Also support YAML comment key if present
+                if essential_order is None:
+                    # Try alternate keys for compatibility
+                    essential_order = playbook.get("essential-order") or playbook.get("order")
+                entry = {
+                    "category": category,
+                    "name": playbook["name"],
+                    "path": playbook["path"],
+                    "description": playbook.get("description", ""),
+                    "essential": playbook.get("essential", False),
+                    "essential_order": essential_order,
+                    "source": playbook.get("source", "Built-in")
+                }
+                # Scheduling headers; absent keys mean "not declared"
+                for key in ("after", "conflicts", "resources"):
+                    if key in playbook:
+                        entry[key] = playbook[key]
+                selected.append(entry)
         return selected
 
-    def _check_chromium_files_exist(self) -> bool:
-        """Check if the required Chromium template files exist"""
-        try:
-            from pathlib import Path
-            import os
-            
-            # Check if templates directory exists
-            templates_dir = Path("templates")
-            if not templates_dir.exists():
-                return False
-            
-            # Check if chromium_policies.j2 exists
-            policies_file = templates_dir / "chromium_policies.j2"
-            if not policies_file.exists():
-                return False
-            
-            # Check if master_preferences exists
-            master_prefs_file = templates_dir / "master_preferences"
-            if not master_prefs_file.exists():
-                return False
-            
-            return True
-        except Exception:
-            return False 
\ No newline at end of file
+    def _find_playbook(self, category: str, name: str):
+        """Return the playbook dict for category/name, or None"""
+        categories = self.main_window.config["categories"]
+        if hasattr(categories, "find"):
+            # SQLite catalog: indexed lookup without loading the category
+            return categories.find(category, name)
+        if category in categories:
+            for playbook in categories[category]["playbooks"]:
+                if playbook["name"] == name:
+                    return playbook
+        return None
+
+    def _essential_playbooks(self):
+        """Return (category, playbook) pairs for all essential playbooks"""
+        categories = self.main_window.config["categories"]
+        if hasattr(categories, "essential_playbooks"):
+            return categories.essential_playbooks()
+        return [(category, playbook)
+                for category, cat_info in categories.items()
+                for playbook in cat_info["playbooks"]
+                if playbook.get("essential", False)]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Playbook Watcher
+Watches playbook folders and hot-updates the catalog and the playbook list;
+also watches templates/ and files/ so CrimsonCFG-Requires-Files are re-checked
+"""
+
+import os
+from pathlib import Path
+from gi.repository import Gio, GLib  # type: ignore
+
+from . import external_repo_manager
+
+class PlaybookWatcher:
+    # Quiet period used to coalesce bursts of events (editors write in several steps)
+    DEBOUNCE_MS = 250
+    # Folders (per source tree) that required files usually live in
+    ASSET_DIRS = ("templates", "files")
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.debug = main_window.debug
+        self.monitors = {}
+        self.pending = set()
+        self.asset_roots = []
+        self.assets_changed = False
+        self.flush_source = None
+
+    def start(self):
+        """Watch built-in, external and department playbook folders and their asset folders."""
+        sources = [Path(os.path.abspath("."))]
+        if external_repo_manager.get_external_repo_url():
+            sources.append(Path(external_repo_manager.get_external_playbooks_path()))
+        for source in sources:
+            if (source / "playbooks").is_dir():
+                self._watch_tree(source / "playbooks")
+            for name in self.ASSET_DIRS:
+                if (source / name).is_dir():
+                    self.asset_roots.append(str(source / name) + os.sep)
+                    self._watch_tree(source / name)
+        if self.debug:
+            print(f"PlaybookWatcher: Watching {len(self.monitors)} directories")
+
+    def stop(self):
+        """Cancel all monitors and any pending flush."""
+        for monitor in self.monitors.values():
+            monitor.cancel()
+        self.monitors.clear()
+        if self.flush_source is not None:
+            GLib.source_remove(self.flush_source)
+            self.flush_source = None
+        self.pending.clear()
+        self.asset_roots = []
+        self.assets_changed = False
+
+    def _is_asset(self, path: str) -> bool:
+        return any(path.startswith(root) for root in self.asset_roots)
+
+    def _watch_tree(self, directory: Path):
+        """Monitor a folder and all nested folders (categories, departments, subfolders)."""
+        for current, dirnames, _ in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            self._watch(Path(current))
+
+    def _watch(self, directory: Path):
+        key = str(directory)
+        if key in self.monitors:
+            return
+        try:
+            monitor = Gio.File.new_for_path(key).monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+        except GLib.Error as e:
+            print(f"PlaybookWatcher: Cannot watch {key}: {e}")
+            return
+        monitor.connect("changed", self._on_changed)
+        self.monitors[key] = monitor
+
+    def _on_changed(self, monitor, file, other_file, event_type):
+        """Queue changed playbook paths and (re)arm the debounce timer."""
+        path = file.get_path() if file is not None else None
+        if not path:
+            return
+        if event_type in (Gio.FileMonitorEvent.DELETED, Gio.FileMonitorEvent.MOVED_OUT, Gio.FileMonitorEvent.RENAMED):
+            self._removed(path)
+            new_path = other_file.get_path() if other_file is not None else None
+            if event_type == Gio.FileMonitorEvent.RENAMED and new_path:
+                self._added(new_path)
+        else:
+            self._added(path)
+        if self.pending or self.assets_changed:
+            if self.flush_source is not None:
+                GLib.source_remove(self.flush_source)
+            self.flush_source = GLib.timeout_add(self.DEBOUNCE_MS, self._flush)
+
+    def _added(self, path: str):
+        if self._is_asset(path):
+            # A required file may have appeared
+            self.assets_changed = True
+        if os.path.isdir(path):
+            # New category, department or nested folder: watch it and pick up its playbooks
+            self._watch_tree(Path(path))
+            if not self._is_asset(path):
+                self.pending.update(str(p) for p in Path(path).rglob("*.yml"))
+        elif path.endswith(".yml") and not self._is_asset(path):
+            self.pending.add(path)
+
+    def _removed(self, path: str):
+        """A file or folder went away: drop its monitors and queue the playbooks it held."""
+        if self._is_asset(path):
+            self.assets_changed = True
+        prefix = path + os.sep
+        folders = [key for key in self.monitors if key == path or key.startswith(prefix)]
+        for key in folders:
+            self.monitors.pop(key).cancel()
+        if self._is_asset(path):
+            return
+        if path.endswith(".yml"):
+            self.pending.add(path)
+        if folders:
+            # The files are gone, so the catalog is the only record of what was inside
+            self.pending.update(known for known in self.main_window.playbook_manager.catalog_files()
+                                if known.startswith(prefix))
+
+    def _flush(self):
+        """Apply the coalesced changes to gui_config.json and the playbook list."""
+        self.flush_source = None
+        paths = sorted(self.pending)
+        self.pending.clear()
+        if not (paths or self.assets_changed):
+            return False
+        if self.main_window.installation_running:
+            # Don't reshuffle the catalog under a running installation; retry later
+            self.pending.update(paths)
+            self.flush_source = GLib.timeout_add(self.DEBOUNCE_MS * 4, self._flush)
+            return False
+        # A changed playbook may declare other required files, so re-check them either way
+        manager = self.main_window.playbook_manager
+        manager.refresh_requirement_files(update_list=False)
+        assets_changed, self.assets_changed = self.assets_changed, False
+        changes = None
+        if paths:
+            if self.debug:
+                print(f"PlaybookWatcher: Applying {len(paths)} changed paths")
+            changes = self.main_window.config_manager.update_gui_config(paths)
+        if changes:
+            self.main_window.config["categories"] = self.main_window.config_manager.load_categories_from_yaml()
+            manager.apply_catalog_changes(changes)
+            manager.start_validation()
+        if assets_changed:
+            # Requirement icons of unchanged rows may be stale too
+            manager.update_playbook_list()
+        return False
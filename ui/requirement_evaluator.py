@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Requirement Evaluator
+Evaluates declared playbook requirements (vars and files) against local.yml
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+from . import external_repo_manager
+
+# Requirements of playbooks that predate the CrimsonCFG-Requires-* headers,
+# keyed by display name and expressed in the same declarative form
+LEGACY_REQUIREMENTS = {
+    "SSH Key": {
+        "requires_vars": ["ssh_private_key_content", "ssh_public_key_content"],
+    },
+    "Set GNOME Wallpaper": {
+        "requires_vars": ["gnome_background_image"],
+    },
+    "Set GNOME Theme": {
+        "requires_vars": ["theme_mode=light|dark"],
+    },
+    "Chromium": {
+        "requires_vars": ["chromium_homepage_url", "chromium_profile1_name"],
+        "requires_files": ["templates/chromium_policies.j2", "templates/master_preferences"],
+    },
+}
+
+ICON_MET = 'emblem-ok-symbolic'
+ICON_UNMET = 'process-stop-symbolic'
+
+class RequirementEvaluator:
+    """Caches requirement results and only re-checks playbooks whose inputs changed.
+
+    A requirement is either a variable that must be set in local.yml
+    (`name`, or `name=a|b` to restrict the allowed values) or a file that must
+    exist (relative paths are resolved against the playbook's source tree).
+    """
+
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self._results = {}      # playbook key -> bool
+        self._var_values = {}   # var name -> value the cached results were computed with
+        self._file_exists = {}  # resolved path -> bool
+
+    def requirements(self, playbook: Dict) -> Optional[Dict]:
+        """Return the declared requirements of a playbook, or None if it has none."""
+        if playbook.get("requires_vars") or playbook.get("requires_files"):
+            return {
+                "requires_vars": playbook.get("requires_vars", []),
+                "requires_files": playbook.get("requires_files", []),
+            }
+        if playbook.get("required_vars", False):
+            # Flagged but undeclared: legacy map, or no requirements (always available)
+            legacy = LEGACY_REQUIREMENTS.get(playbook.get("name"), {})
+            return {
+                "requires_vars": legacy.get("requires_vars", []),
+                "requires_files": legacy.get("requires_files", []),
+            }
+        return None
+
+    def update_config(self, local_config: Dict):
+        """Drop cached results that depend on a variable whose value changed."""
+        changed = {var for var, value in self._var_values.items() if local_config.get(var) != value}
+        if not changed:
+            return
+        if self.debug:
+            print(f"RequirementEvaluator: Re-evaluating for changed vars: {sorted(changed)}")
+        for var in changed:
+            self._var_values[var] = local_config.get(var)
+        self._results = {
+            key: met for key, met in self._results.items()
+            if not changed.intersection(self._vars_of_key(key))
+        }
+
+    def watched_vars(self) -> set:
+        """Names of the local.yml variables the cached results depend on."""
+        return set(self._var_values)
+
+    def invalidate_files(self):
+        """Forget cached file checks (e.g. after templates were updated)."""
+        self._file_exists.clear()
+        self._results.clear()
+
+    def evaluate(self, playbooks: Iterable[Dict], local_config: Dict):
+        """Compute availability for all given playbooks in one pass."""
+        self.update_config(local_config)
+        for playbook in playbooks:
+            self.status(playbook, local_config)
+
+    def status(self, playbook: Dict, local_config: Dict):
+        """Return (requirements_met, icon_name), or None if the playbook has no requirements."""
+        requirements = self.requirements(playbook)
+        if requirements is None:
+            return None
+        key = self._key(playbook, requirements)
+        if key not in self._results:
+            for var in requirements["requires_vars"]:
+                self._var_values.setdefault(self._var_name(var), local_config.get(self._var_name(var)))
+            self._results[key] = (
+                all(self._var_met(var, local_config) for var in requirements["requires_vars"])
+                and all(self._file_met(path, playbook) for path in requirements["requires_files"])
+            )
+        return (True, ICON_MET) if self._results[key] else (False, ICON_UNMET)
+
+    def _key(self, playbook: Dict, requirements: Dict) -> tuple:
+        # Include the var names so update_config can find dependent entries without the playbook
+        return (playbook.get("source", "Built-in"), playbook.get("path"), playbook.get("name"),
+                tuple(self._var_name(var) for var in requirements["requires_vars"]),
+                tuple(requirements["requires_files"]))
+
+    @staticmethod
+    def _vars_of_key(key: tuple) -> tuple:
+        return key[3]
+
+    @staticmethod
+    def _var_name(var: str) -> str:
+        return var.split("=", 1)[0].strip()
+
+    def _var_met(self, var: str, local_config: Dict) -> bool:
+        name, _, allowed = var.partition("=")
+        value = local_config.get(name.strip(), "")
+        if allowed:
+            return str(value) in [option.strip() for option in allowed.split("|")]
+        return bool(value)
+
+    def _file_met(self, path: str, playbook: Dict) -> bool:
+        if not os.path.isabs(path):
+            root = external_repo_manager.get_external_playbooks_path() if playbook.get("source") == "External" else "."
+            path = os.path.join(root, path)
+        if path not in self._file_exists:
+            self._file_exists[path] = os.path.exists(path)
+        return self._file_exists[path]
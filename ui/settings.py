@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Settings
+Typed, read-only view of local.yml with all defaults and validation in one place
+"""
+
+import re
+import getpass
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+from functions.playbook_scheduler import DEFAULT_INSTALL_WORKERS
+
+DEFAULT_WORKING_DIRECTORY = "/opt/CrimsonCFG"
+DEFAULT_BACKGROUND_COLOR = "#181a20"
+CATALOG_BACKENDS = ("json", "sqlite")
+
+_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+def freeze(value: Any) -> Any:
+    """Return a read-only copy: dicts become mappingproxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(child) for key, child in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(child) for child in value)
+    return value
+
+@dataclass(frozen=True, slots=True)
+class BrandingSettings:
+    """Corporate identity and window style."""
+    app_name: str = "CrimsonCFG"
+    app_subtitle: str = "System Configuration Manager"
+    app_logo: str = ""
+    background_color: str = DEFAULT_BACKGROUND_COLOR
+    app_background_image: str = ""
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Validated settings, built once per local.yml version.
+
+    Instances are immutable (the raw document is kept as a frozen `local`
+    mapping), so the same object can be handed to installer and validation
+    threads without copying. Use with_debug() etc. to derive a changed copy.
+    """
+    system_user: str
+    user_home: str
+    working_directory: str = DEFAULT_WORKING_DIRECTORY
+    inventory_file: str = f"{DEFAULT_WORKING_DIRECTORY}/hosts.ini"
+    log_directory: str = f"{DEFAULT_WORKING_DIRECTORY}/log"
+    debug: bool = False
+    git_username: str = ""
+    git_email: str = ""
+    catalog_backend: str = "json"
+    external_playbook_repo_url: str = ""
+    admin_password: str = field(default="", repr=False)
+    apt_packages: Tuple[str, ...] = ()
+    batch_install: bool = True
+    fact_cache_ttl: int = 3600
+    install_workers: int = DEFAULT_INSTALL_WORKERS
+    landscape_registration_key: str = ""
+    landscape_account_name: str = "standalone"
+    landscape_ping_url: str = "https://landscape.canonical.com/ping"
+    branding: BrandingSettings = field(default_factory=BrandingSettings)
+    local: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}), repr=False)
+
+    @classmethod
+    def from_local_config(cls, local_config: Dict, system_user: str = None) -> "Settings":
+        """Validate a (resolved) local.yml document and fill in defaults.
+
+        Invalid values are replaced by their default with a warning instead
+        of failing, so a hand-edited local.yml never keeps the app from
+        starting.
+        """
+        system_user = system_user or getpass.getuser()
+
+        def text(key: str, default: str = "") -> str:
+            value = local_config.get(key)
+            if value is None:
+                return default
+            if isinstance(value, (dict, list)):
+                print(f"Settings: Ignoring non-text value for '{key}' in local.yml")
+                return default
+            return str(value)
+
+        working_directory = text("working_directory").rstrip("/") or DEFAULT_WORKING_DIRECTORY
+
+        backend = text("catalog_backend", "json")
+        if backend not in CATALOG_BACKENDS:
+            print(f"Settings: Unknown catalog_backend '{backend}', using json")
+            backend = "json"
+
+        color = text("background_color", DEFAULT_BACKGROUND_COLOR)
+        if not _COLOR.match(color):
+            print(f"Settings: Invalid background_color '{color}', using {DEFAULT_BACKGROUND_COLOR}")
+            color = DEFAULT_BACKGROUND_COLOR
+
+        fact_cache_ttl = local_config.get("fact_cache_ttl", 3600)
+        try:
+            fact_cache_ttl = max(0, int(fact_cache_ttl))
+        except (TypeError, ValueError):
+            print(f"Settings: Invalid fact_cache_ttl '{fact_cache_ttl}', using 3600")
+            fact_cache_ttl = 3600
+
+        install_workers = local_config.get("install_workers", DEFAULT_INSTALL_WORKERS)
+        try:
+            install_workers = max(1, int(install_workers))
+        except (TypeError, ValueError):
+            print(f"Settings: Invalid install_workers '{install_workers}', using {DEFAULT_INSTALL_WORKERS}")
+            install_workers = DEFAULT_INSTALL_WORKERS
+
+        packages = local_config.get("apt_packages") or []
+        if not isinstance(packages, list):
+            print("Settings: apt_packages must be a list, ignoring it")
+            packages = []
+
+        return cls(
+            system_user=system_user,
+            user_home=text("user_home", f"/home/{system_user}"),
+            working_directory=working_directory,
+            inventory_file=text("inventory_file", f"{working_directory}/hosts.ini"),
+            log_directory=text("log_directory", f"{working_directory}/log"),
+            debug=cls._flag(local_config.get("debug", 0)),
+            git_username=text("git_username", system_user),
+            git_email=text("git_email", f"{system_user}@example.com"),
+            catalog_backend=backend,
+            external_playbook_repo_url=text("external_playbook_repo_url"),
+            admin_password=text("admin_password"),
+            apt_packages=tuple(str(package).strip() for package in packages if package is not None and str(package).strip()),
+            batch_install=cls._flag(local_config.get("batch_install", True)),
+            fact_cache_ttl=fact_cache_ttl,
+            install_workers=install_workers,
+            landscape_registration_key=text("landscape_registration_key"),
+            landscape_account_name=text("landscape_account_name", "standalone"),
+            landscape_ping_url=text("landscape_ping_url", "https://landscape.canonical.com/ping"),
+            branding=BrandingSettings(
+                app_name=text("app_name", "CrimsonCFG"),
+                app_subtitle=text("app_subtitle", "System Configuration Manager"),
+                app_logo=text("app_logo"),
+                background_color=color,
+                app_background_image=text("app_background_image"),
+            ),
+            local=freeze(local_config),
+        )
+
+    @staticmethod
+    def _flag(value: Any) -> bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def with_debug(self, debug: bool = True) -> "Settings":
+        return replace(self, debug=debug)
+
+    def legacy_dict(self) -> Dict:
+        """The `config['settings']` dict older call sites and DebugManager read."""
+        return {
+            "default_user": self.system_user,
+            "working_directory": self.working_directory,
+            "inventory_file": self.inventory_file,
+            "log_directory": self.log_directory,
+            "debug": 1 if self.debug else 0,
+            "git_username": self.git_username,
+            "git_email": self.git_email,
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+CrimsonCFG Template Resolver
+Resolves {{ variable }} references in config values in a single pass
+"""
+
+import os
+import re
+import getpass
+from typing import Any, Dict, Optional
+
+class TemplateResolver:
+    """Substitutes `{{ name }}` references in config values.
+
+    Variables are the built-in defaults below, overridden by the top-level
+    string values of local.yml itself, so `templates_directory:
+    "{{ working_directory }}/templates"` follows the user's
+    working_directory. Variables referencing other variables are resolved
+    once through their dependency graph; the config tree is then rewritten
+    in one walk with a single compiled regex. Resolved trees are memoised by
+    the content hash of local.yml.
+    """
+
+    _REFERENCE = re.compile(r"{{\s*([A-Za-z_][A-Za-z0-9_]*)\s*}}")
+
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self.variables = {}  # Fully resolved variable values of the last compile()
+        self._pattern = None
+        self._cache_key = None
+        self._cache_value = None
+
+    @staticmethod
+    def default_variables() -> Dict[str, str]:
+        """Values used when local.yml does not define a variable itself."""
+        system_user = getpass.getuser()
+        return {
+            "system_user": system_user,
+            "user_home": os.path.expanduser("~"),
+            "working_directory": os.environ.get("CRIMSON_WORKING_DIR", "/opt/CrimsonCFG"),
+            "appimg_directory": "{{ user_home }}/AppImages",
+            "app_directory": os.environ.get("CRIMSON_APP_DIR", "{{ working_directory }}/app"),
+            "git_username": os.environ.get("GIT_USERNAME", system_user),
+            "git_email": os.environ.get("GIT_EMAIL", f"{system_user}@example.com"),
+        }
+
+    def compile(self, local_config: Dict):
+        """Resolve the variable set of a local config and build the substitution regex."""
+        raw = self.default_variables()
+        for key, value in local_config.items():
+            if isinstance(key, str) and isinstance(value, str):
+                raw[key] = value
+        resolved = {}
+        in_progress = set()
+
+        def resolve(name: str) -> Optional[str]:
+            # Depth-first over the reference graph; cycles stay unresolved
+            if name in resolved:
+                return resolved[name]
+            if name not in raw or name in in_progress:
+                return None
+            in_progress.add(name)
+
+            def substitute(match):
+                value = resolve(match.group(1))
+                return match.group(0) if value is None else value
+
+            resolved[name] = self._REFERENCE.sub(substitute, raw[name])
+            in_progress.discard(name)
+            return resolved[name]
+
+        for name in raw:
+            resolve(name)
+        self.variables = resolved
+        names = sorted(resolved, key=len, reverse=True)
+        self._pattern = re.compile(r"{{\s*(" + "|".join(re.escape(name) for name in names) + r")\s*}}")
+
+    def resolve_value(self, value: Any) -> Any:
+        """Substitute known variables in a value (strings, lists and dicts, recursively)."""
+        if self._pattern is None:
+            self.compile({})
+        pattern, variables = self._pattern, self.variables
+
+        def walk(item):
+            if isinstance(item, str):
+                if "{{" not in item:
+                    return item
+                return pattern.sub(lambda match: variables[match.group(1)], item)
+            if isinstance(item, dict):
+                return {key: walk(child) for key, child in item.items()}
+            if isinstance(item, list):
+                return [walk(child) for child in item]
+            return item
+
+        return walk(value)
+
+    def resolve(self, local_config: Dict, digest: Optional[str] = None) -> Dict:
+        """Return local_config with all references resolved.
+
+        With a digest (sha256 of local.yml) the result is reused until the
+        file content changes. The returned tree is shared; don't modify it.
+        """
+        if digest is not None and digest == self._cache_key:
+            return self._cache_value
+        self.compile(local_config)
+        result = self.resolve_value(local_config)
+        if self.debug:
+            print(f"TemplateResolver: Resolved config with {len(self.variables)} variables")
+        if digest is not None:
+            self._cache_key, self._cache_value = digest, result
+        return result
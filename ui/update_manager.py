@@ -22,7 +22,8 @@ class UpdateManager:
         # Application paths
         self.app_dir = "/opt/CrimsonCFG"
         # Use the actual app directory for updates (requires sudo)
-        self.working_dir = self.config.get('settings', {}).get('working_directory', self.app_dir)
+        model = self.config.get('model')
+        self.working_dir = model.working_directory if model is not None else self.app_dir
         
         # Get current version from version manager
         from . import version_manager